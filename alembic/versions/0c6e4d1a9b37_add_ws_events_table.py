@@ -0,0 +1,39 @@
+"""Add ws_events table
+
+Revision ID: 0c6e4d1a9b37
+Revises: d7f3a9b2c615
+Create Date: 2026-10-18 12:41:55.120376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6e4d1a9b37'
+down_revision: Union[str, None] = 'd7f3a9b2c615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('ws_events_id_seq')))
+    op.create_table('ws_events',
+    sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('ws_events_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ws_events_user_id_id', 'ws_events', ['user_id', 'id'], unique=False)
+    op.create_index('ix_ws_events_created_at', 'ws_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ws_events_created_at', table_name='ws_events')
+    op.drop_index('ix_ws_events_user_id_id', table_name='ws_events')
+    op.drop_table('ws_events')
+    op.execute(sa.schema.DropSequence(sa.Sequence('ws_events_id_seq')))
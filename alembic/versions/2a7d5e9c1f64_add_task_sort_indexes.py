@@ -0,0 +1,38 @@
+"""Add task sort indexes
+
+Revision ID: 2a7d5e9c1f64
+Revises: 6d3b8f2a7c41
+Create Date: 2026-10-18 22:37:51.604129
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a7d5e9c1f64'
+down_revision: Union[str, None] = '6d3b8f2a7c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_date_id', 'tasks',
+            ['task_date', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_deadline_id', 'tasks',
+            ['task_deadline', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_deadline_id', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tasks_date_id', table_name='tasks', postgresql_concurrently=True, if_exists=True)
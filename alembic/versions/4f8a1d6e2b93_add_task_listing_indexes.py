@@ -0,0 +1,38 @@
+"""Add task listing indexes
+
+Revision ID: 4f8a1d6e2b93
+Revises: 9e2b7c41f0a8
+Create Date: 2026-10-18 16:48:22.590417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8a1d6e2b93'
+down_revision: Union[str, None] = '9e2b7c41f0a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_executor_status_deadline', 'tasks',
+            ['task_executor', 'task_status', 'task_deadline'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_director_date', 'tasks',
+            ['task_director', 'task_date'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_director_date', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tasks_executor_status_deadline', table_name='tasks', postgresql_concurrently=True, if_exists=True)
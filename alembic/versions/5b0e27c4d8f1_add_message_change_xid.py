@@ -0,0 +1,44 @@
+"""Add message change_xid for delta sync
+
+Revision ID: 5b0e27c4d8f1
+Revises: a3c91f5e7d24
+Create Date: 2026-10-18 10:04:17.552930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e27c4d8f1'
+down_revision: Union[str, None] = 'a3c91f5e7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Постоянное значение по умолчанию не требует перезаписи таблицы: существующие сообщения
+    # получают change_xid = 0 и попадают в первую синхронизацию с нулевого курсора.
+    op.add_column('messages', sa.Column('change_xid', sa.BigInteger(), nullable=False, server_default='0'))
+    op.alter_column('messages', 'change_xid', server_default=sa.text('(pg_current_xact_id()::text::bigint)'))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_receiver_change_xid', 'messages',
+            ['message_receiver', 'change_xid', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_messages_sender_change_xid', 'messages',
+            ['message_sender', 'change_xid', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_sender_change_xid', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_receiver_change_xid', table_name='messages', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('messages', 'change_xid')
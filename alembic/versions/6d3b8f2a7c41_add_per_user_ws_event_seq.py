@@ -0,0 +1,58 @@
+"""Add per-user ws event seq
+
+Revision ID: 6d3b8f2a7c41
+Revises: 4f8a1d6e2b93
+Create Date: 2026-10-18 21:14:37.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d3b8f2a7c41'
+down_revision: Union[str, None] = '4f8a1d6e2b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ws_event_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_seq', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.add_column('ws_events', sa.Column('seq', sa.BigInteger(), nullable=True))
+    # Нумеруем сохранённые события каждого пользователя в порядке прежних глобальных номеров
+    op.execute(
+        """
+        UPDATE ws_events
+        SET seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY id) AS seq
+            FROM ws_events
+        ) AS numbered
+        WHERE ws_events.id = numbered.id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO ws_event_counters (user_id, last_seq)
+        SELECT user_id, max(seq)
+        FROM ws_events
+        GROUP BY user_id
+        """
+    )
+    op.alter_column('ws_events', 'seq', nullable=False)
+    op.drop_index('ix_ws_events_user_id_id', table_name='ws_events')
+    op.create_index('ix_ws_events_user_id_seq', 'ws_events', ['user_id', 'seq'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ws_events_user_id_seq', table_name='ws_events')
+    op.create_index('ix_ws_events_user_id_id', 'ws_events', ['user_id', 'id'], unique=False)
+    op.drop_column('ws_events', 'seq')
+    op.drop_table('ws_event_counters')
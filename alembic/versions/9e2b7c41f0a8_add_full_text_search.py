@@ -0,0 +1,54 @@
+"""Add full-text search vectors to messages and tasks
+
+Revision ID: 9e2b7c41f0a8
+Revises: 0c6e4d1a9b37
+Create Date: 2026-10-18 15:27:03.846120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2b7c41f0a8'
+down_revision: Union[str, None] = '0c6e4d1a9b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Добавление вычисляемого столбца перезаписывает таблицу под эксклюзивной блокировкой:
+    # на большой таблице messages миграцию нужно выполнять в окно обслуживания.
+    op.add_column('messages', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian', message)", persisted=True),
+    ))
+    op.add_column('tasks', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('russian', task_name), 'A') || "
+            "setweight(to_tsvector('russian', task_content), 'B')",
+            persisted=True,
+        ),
+    ))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_search_vector', 'messages', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_search_vector', 'tasks', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_search_vector', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_search_vector', table_name='messages', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('tasks', 'search_vector')
+    op.drop_column('messages', 'search_vector')
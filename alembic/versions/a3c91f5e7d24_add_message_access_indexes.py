@@ -0,0 +1,46 @@
+"""Add message access indexes
+
+Revision ID: a3c91f5e7d24
+Revises: 8bdae1eb3b22
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91f5e7d24'
+down_revision: Union[str, None] = '8bdae1eb3b22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_sender_receiver_id', 'messages',
+            ['message_sender', 'message_receiver', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_messages_receiver_sender_id', 'messages',
+            ['message_receiver', 'message_sender', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_messages_receiver_sender_unread', 'messages',
+            ['message_receiver', 'message_sender'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+            postgresql_where=sa.text("message_status = 'unread'"),
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_receiver_sender_unread', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_receiver_sender_id', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_sender_receiver_id', table_name='messages', postgresql_concurrently=True, if_exists=True)
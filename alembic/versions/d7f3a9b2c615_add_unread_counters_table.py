@@ -0,0 +1,44 @@
+"""Add unread_counters table
+
+Revision ID: d7f3a9b2c615
+Revises: 5b0e27c4d8f1
+Create Date: 2026-10-18 11:26:03.907412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a9b2c615'
+down_revision: Union[str, None] = '5b0e27c4d8f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('unread_counters',
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('receiver_id', 'sender_id')
+    )
+    # Заполняем счётчики по уже существующим непрочитанным сообщениям
+    op.execute(
+        """
+        INSERT INTO unread_counters (receiver_id, sender_id, count, last_message_id)
+        SELECT message_receiver, message_sender, count(*), max(id)
+        FROM messages
+        WHERE message_status = 'unread'
+        GROUP BY message_receiver, message_sender
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('unread_counters')
@@ -1,10 +1,12 @@
 from typing import Any, Union
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
-from app.crud import pwd_context
+from app.hashing import password_hasher
 from app.database import get_db
 from app import crud
+from app.last_login import last_login_buffer
+from app.user_cache import user_cache
 from datetime import datetime, timedelta
 import os
 from fastapi.security import OAuth2PasswordBearer
@@ -17,39 +19,43 @@ REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 432
 # Определяем схему авторизации через токен
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def authenticate_user(db: Session, login: str, password: str) -> Union[None, Any]:
+async def authenticate_user(db: AsyncSession, login: str, password: str) -> Union[None, Any]:
     """
     Проверяет учетные данные пользователя.
 
+    Время входа не записывается сразу: оно передаётся в last_login_buffer и сохраняется
+    пакетно вместе со входами других пользователей.
+
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         login (str): Логин пользователя.
         password (str): Пароль пользователя.
 
     Возвращает:
         Union[None, Any]: Объект пользователя, если аутентификация успешна, иначе None.
+
+    Исключения:
+        ServiceUnavailableException: Если пул хэширования паролей перегружен.
     """
-    user = crud.get_user_by_login(db, login)
-    if not user or not pwd_context.verify(password, user.pas):
+    user = await crud.get_user_by_login(db, login)
+    if not user or not await password_hasher.verify(password, user.pas):
         return None
-    user.last_login = datetime.now()
-    db.commit()
-    db.refresh(user)
+    last_login_buffer.record(user.id, datetime.now())
     return user
 
-def check_user_session_token(db: Session, id: int, token: str) -> bool:
+async def check_user_session_token(db: AsyncSession, id: int, token: str) -> bool:
     """
     Проверяет соответствие токена пользователя.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         id (int): ID пользователя.
         token (str): Токен для проверки.
 
     Возвращает:
         bool: True, если токен соответствует, иначе False.
     """
-    user = crud.get_user(db, id)
+    user = await crud.get_user(db, id)
     return user and token == user.token
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
@@ -68,16 +74,34 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Any:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Any:
     """
     Извлекает текущего пользователя на основе токена.
 
     Аргументы:
         token (str): Токен доступа пользователя.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
 
     Возвращает:
-        Any: Объект пользователя, если аутентификация успешна.
+        UserSnapshot: Неизменяемый снимок пользователя, если аутентификация успешна.
+
+    Исключения:
+        HTTPException: Если токен недействителен или пользователь не найден.
+    """
+    return await get_user_from_token(token, db)
+
+async def get_user_from_token(token: str, db: AsyncSession) -> Any:
+    """
+    Проверяет JWT токен и загружает пользователя. Используется HTTP-эндпоинтами и WebSocket-рукопожатием.
+
+    Пользователь берётся из кэша user_cache; запрос к базе данных выполняется только при промахе.
+
+    Аргументы:
+        token (str): Токен доступа пользователя.
+        db (AsyncSession): Сессия базы данных.
+
+    Возвращает:
+        UserSnapshot: Неизменяемый снимок пользователя, если аутентификация успешна.
 
     Исключения:
         HTTPException: Если токен недействителен или пользователь не найден.
@@ -92,11 +116,16 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise InvalidCredentialsException
 
-    user = crud.get_user_by_login(db, login=login)
+    cached = user_cache.get(login)
+    if cached is not None:
+        return cached
+
+    generation = user_cache.generation
+    user = await crud.get_user_by_login(db, login=login)
     if user is None:
         raise InvalidCredentialsException
 
-    return user
+    return user_cache.put(user, generation)
 
 def is_admin(user: Any) -> None:
     """
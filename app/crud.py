@@ -1,51 +1,55 @@
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, Integer, cast, column, delete, func, literal_column, or_, select, text, true, tuple_, union_all, update, values
+from sqlalchemy.dialects.postgresql import REAL, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from app import models, schemas
-from passlib.context import CryptContext
-from datetime import datetime
-from app.websocket_manager import manager
-
-# Контекст для хэширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from datetime import datetime, timedelta
+from app.user_cache import user_cache
+from app.websocket_manager import manager, serialize_event
+from app.hashing import password_hasher
 
 # Пользователи
-def get_user(db: Session, user_id: int):
+async def get_user(db: AsyncSession, user_id: int):
     """
     Извлекает пользователя из базы данных по его ID.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         user_id (int): ID пользователя.
 
     Возвращает:
         User: Объект пользователя или None, если пользователь не найден.
     """
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
 
-def get_user_by_login(db: Session, login: str) -> models.User:
+async def get_user_by_login(db: AsyncSession, login: str) -> models.User:
     """
     Извлекает пользователя из базы данных по логину.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         login (str): Логин пользователя.
 
     Возвращает:
         User: Объект пользователя или None, если пользователь не найден.
     """
-    return db.query(models.User).filter(models.User.login == login).first()
+    result = await db.execute(select(models.User).filter(models.User.login == login))
+    return result.scalars().first()
 
-def create_user(db: Session, user: schemas.UserCreate):
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
     """
     Создает нового пользователя в базе данных.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         user (UserCreate): Данные нового пользователя.
 
     Возвращает:
         User: Созданный объект пользователя.
     """
-    hashed_password = pwd_context.hash(user.pas)  # Хэширование пароля
+    hashed_password = await password_hasher.hash(user.pas)  # Хэширование пароля в пуле
     db_user = models.User(
         name=user.name,
         login=user.login,
@@ -56,97 +60,1001 @@ def create_user(db: Session, user: schemas.UserCreate):
         last_login=datetime.now(),
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int) -> bool:
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
     """
-    Удаляет пользователя из базы данных по его ID.
+    Удаляет пользователя из базы данных по его ID и сбрасывает его запись в кэше пользователей.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         user_id (int): ID пользователя.
 
     Возвращает:
         bool: True, если пользователь был успешно удалён, иначе False.
     """
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await get_user(db, user_id)
     if not user:
         return False
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    user_cache.invalidate(user.login)
     return True
 
-def get_unread_messages_with_sender_name(db: Session, user_id: int):
+async def update_last_logins(db: AsyncSession, last_logins: Dict[int, datetime]) -> int:
+    """
+    Обновляет время последнего входа нескольких пользователей одним запросом
+    UPDATE ... FROM (VALUES ...). Более раннее время не перезаписывает более позднее.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        last_logins (Dict[int, datetime]): Время последнего входа по ID пользователя.
+
+    Возвращает:
+        int: Количество обновлённых пользователей.
+    """
+    if not last_logins:
+        return 0
+    logins = values(
+        column("id", Integer),
+        column("last_login", DateTime),
+        name="logins",
+    ).data(list(last_logins.items()))
+    result = await db.execute(
+        update(models.User)
+        .filter(models.User.id == logins.c.id, models.User.last_login < logins.c.last_login)
+        .values(last_login=logins.c.last_login)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def get_unread_messages_with_sender_name(db: AsyncSession, user_id: int):
     """
     Получает список непрочитанных сообщений для пользователя с именами отправителей.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         user_id (int): ID пользователя.
 
     Возвращает:
         list[dict]: Список непрочитанных сообщений с именами отправителей.
     """
-    messages = (
-        db.query(models.Message, models.User.name.label("sender_name"))
+    result = await db.execute(
+        select(models.Message, models.User.name.label("sender_name"))
         .join(models.User, models.Message.message_sender == models.User.id)
         .filter(models.Message.message_receiver == user_id, models.Message.message_status == "unread")
-        .all()
     )
+    messages = result.all()
 
     return [
         {
             "message_id": message.Message.id,
             "message_sender": message.Message.message_sender,
             "name": message.sender_name,
-            "message_time": message.Message.message_time.strftime('%d-%m-%Y %H:%M:%S'),
+            "message_time": format_timestamp(message.Message.message_time),
             "message": message.Message.message,
         }
         for message in messages
     ]
 
+# Отформатированные даты "ДД-ММ-ГГГГ " по порядковому номеру дня
+_DATE_PREFIXES: Dict[int, str] = {}
+_DATE_PREFIXES_MAX = 4096
+
+def format_timestamp(value: datetime) -> str:
+    """
+    Форматирует дату и время для ответа API.
+
+    Результат совпадает с value.strftime('%d-%m-%Y %H:%M:%S'), но дата форматируется один раз
+    на день и кэшируется, а время собирается через isoformat: в длинных списках сообщений
+    большинство отметок времени приходится на немногие дни.
+
+    Аргументы:
+        value (datetime): Дата и время.
+
+    Возвращает:
+        str: Строка вида ДД-ММ-ГГГГ ЧЧ:ММ:СС.
+    """
+    day = value.toordinal()
+    prefix = _DATE_PREFIXES.get(day)
+    if prefix is None:
+        if len(_DATE_PREFIXES) >= _DATE_PREFIXES_MAX:
+            _DATE_PREFIXES.clear()
+        prefix = _DATE_PREFIXES[day] = value.strftime('%d-%m-%Y ')
+    return prefix + value.time().isoformat("seconds")
+
+def format_message(msg: models.Message) -> dict:
+    """
+    Преобразует сообщение в словарь для ответа API.
+
+    Аргументы:
+        msg (Message): Объект сообщения.
+
+    Возвращает:
+        dict: Данные сообщения.
+    """
+    return {
+        "message_id": msg.id,
+        "message_sender": msg.message_sender,
+        "message_receiver": msg.message_receiver,
+        "message_time": format_timestamp(msg.message_time),
+        "message": msg.message,
+        "message_status": msg.message_status,
+    }
+
+def _last_messages_per_user(user_id: int, limit: int):
+    """
+    Строит запрос последних сообщений с каждым собеседником.
+
+    Для каждого пользователя выполняется LATERAL-подзапрос из двух обратных проходов по индексам
+    (отправленные и полученные сообщения), поэтому время запроса зависит от количества
+    пользователей и limit, но не от длины истории переписки.
+
+    Аргументы:
+        user_id (int): ID текущего пользователя.
+        limit (int): Количество последних сообщений на собеседника.
+
+    Возвращает:
+        Select: Запрос сообщений, отсортированных по id.
+    """
+    sent = (
+        select(models.Message)
+        .filter(models.Message.message_sender == user_id, models.Message.message_receiver == models.User.id)
+        .order_by(models.Message.id.desc())
+        .limit(limit)
+        .correlate(models.User)
+    )
+    received = (
+        select(models.Message)
+        .filter(models.Message.message_sender == models.User.id, models.Message.message_receiver == user_id)
+        .order_by(models.Message.id.desc())
+        .limit(limit)
+        .correlate(models.User)
+    )
+    both = union_all(sent, received).subquery()
+    last = select(both).order_by(both.c.id.desc()).limit(limit).lateral("last_messages")
+    last_message = aliased(models.Message, last)
+    return (
+        select(last_message)
+        .select_from(models.User)
+        .join(last, true())
+        .filter(models.User.id != user_id)
+        .order_by(last_message.id)
+    )
+
+async def get_users_with_messages(db: AsyncSession, user_id: int, last: Optional[int] = None):
+    """
+    Получает всех пользователей, кроме текущего, вместе с перепиской между ними и текущим пользователем.
+
+    Вместо отдельного запроса на каждого пользователя выполняются два запроса: выборка справочника
+    пользователей и одна выборка сообщений, где текущий пользователь является отправителем
+    или получателем. Сообщения группируются по собеседнику на стороне приложения.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID текущего пользователя.
+        last (Optional[int]): Если указан, для каждого собеседника возвращаются только последние last сообщений.
+
+    Возвращает:
+        list[dict]: Список пользователей с их сообщениями.
+    """
+    other_users = (
+        await db.execute(
+            select(models.User)
+            .filter(models.User.id != user_id)
+            .order_by(models.User.id)
+        )
+    ).scalars().all()
+
+    if last is None:
+        messages_query = (
+            select(models.Message)
+            .filter(or_(models.Message.message_sender == user_id, models.Message.message_receiver == user_id))
+            .order_by(models.Message.id)
+        )
+    else:
+        messages_query = _last_messages_per_user(user_id, last)
+    messages = (await db.execute(messages_query)).scalars().all()
+
+    # Группируем сообщения по собеседнику
+    messages_by_user = {}
+    for msg in messages:
+        counterpart = msg.message_receiver if msg.message_sender == user_id else msg.message_sender
+        messages_by_user.setdefault(counterpart, []).append(format_message(msg))
+
+    return [
+        {
+            "id": user.id,
+            "name": user.name,
+            "office": user.office,
+            "last_login": format_timestamp(user.last_login) if user.last_login else None,
+            "last_messages": messages_by_user.get(user.id, []),
+        }
+        for user in other_users
+    ]
+
+async def get_conversation_messages(
+    db: AsyncSession,
+    user_id: int,
+    other_user_id: int,
+    before: Optional[int] = None,
+    limit: int = 50,
+):
+    """
+    Получает страницу переписки между двумя пользователями с keyset-пагинацией по id сообщения.
+
+    Сообщения отправленные и полученные выбираются двумя обратными проходами по составным
+    индексам (отправитель, получатель, id), поэтому стоимость страницы не зависит от её глубины.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID текущего пользователя.
+        other_user_id (int): ID собеседника.
+        before (Optional[int]): Курсор: возвращаются только сообщения с id меньше указанного.
+        limit (int): Максимальное количество сообщений на странице.
+
+    Возвращает:
+        dict: Сообщения страницы в хронологическом порядке и курсор следующей (более старой) страницы.
+    """
+    def side(sender: int, receiver: int):
+        query = select(models.Message).filter(
+            models.Message.message_sender == sender,
+            models.Message.message_receiver == receiver,
+        )
+        if before is not None:
+            query = query.filter(models.Message.id < before)
+        # Запрашиваем на одну запись больше, чтобы понять, есть ли следующая страница
+        return query.order_by(models.Message.id.desc()).limit(limit + 1)
+
+    if other_user_id == user_id:
+        page_query = side(user_id, user_id)
+    else:
+        both = union_all(side(user_id, other_user_id), side(other_user_id, user_id)).subquery()
+        page_message = aliased(models.Message, both)
+        page_query = select(page_message).order_by(page_message.id.desc()).limit(limit + 1)
+    messages = (await db.execute(page_query)).scalars().all()
+
+    has_more = len(messages) > limit
+    messages = list(reversed(messages[:limit]))
+    return {
+        "messages": [format_message(msg) for msg in messages],
+        "next_before": messages[0].id if has_more else None,
+    }
+
+def _search(model, participant_filter, query: str, cursor: Optional[Tuple[float, int]], limit: int):
+    """
+    Строит запрос полнотекстового поиска с ранжированием и keyset-пагинацией по (ранг, id).
+
+    Аргументы:
+        model: Модель с вычисляемым столбцом search_vector.
+        participant_filter: Условие доступа текущего пользователя к строкам.
+        query (str): Поисковый запрос в синтаксисе websearch_to_tsquery.
+        cursor (Optional[Tuple[float, int]]): Ранг и id последней строки предыдущей страницы.
+        limit (int): Максимальное количество строк на странице.
+
+    Возвращает:
+        Select: Запрос, возвращающий объекты модели и их ранг (на одну строку больше limit).
+    """
+    ts_query = func.websearch_to_tsquery(literal_column(f"'{models.SEARCH_CONFIG}'::regconfig"), query)
+    matches = (
+        select(model, func.ts_rank(model.search_vector, ts_query).label("rank"))
+        .filter(model.search_vector.op("@@")(ts_query), participant_filter)
+        .subquery()
+    )
+    found = aliased(model, matches)
+    page_query = select(found, matches.c.rank)
+    if cursor is not None:
+        cursor_rank, cursor_id = cursor
+        page_query = page_query.filter(
+            tuple_(matches.c.rank, matches.c.id) < tuple_(cast(cursor_rank, REAL), cursor_id)
+        )
+    return page_query.order_by(matches.c.rank.desc(), matches.c.id.desc()).limit(limit + 1)
+
+def _search_page(rows, limit: int, format_row) -> dict:
+    """
+    Формирует страницу результатов поиска и курсор следующей страницы.
+
+    Аргументы:
+        rows: Строки (объект, ранг), на одну больше limit при наличии следующей страницы.
+        limit (int): Максимальное количество строк на странице.
+        format_row: Функция преобразования объекта в словарь ответа.
+
+    Возвращает:
+        dict: Результаты в порядке убывания ранга и курсор вида "<ранг>:<id>" или None.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "results": [{**format_row(obj), "rank": rank} for obj, rank in rows],
+        "next_cursor": f"{rows[-1][1]!r}:{rows[-1][0].id}" if has_more else None,
+    }
+
+async def search_messages(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    cursor: Optional[Tuple[float, int]] = None,
+    limit: int = 20,
+) -> dict:
+    """
+    Ищет сообщения по тексту среди переписок, в которых участвует пользователь.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID текущего пользователя.
+        query (str): Поисковый запрос.
+        cursor (Optional[Tuple[float, int]]): Курсор предыдущей страницы.
+        limit (int): Максимальное количество сообщений на странице.
+
+    Возвращает:
+        dict: Найденные сообщения с рангом и курсор следующей страницы.
+    """
+    participant = or_(models.Message.message_sender == user_id, models.Message.message_receiver == user_id)
+    rows = (await db.execute(_search(models.Message, participant, query, cursor, limit))).all()
+    return _search_page(rows, limit, format_message)
+
+async def search_tasks(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    cursor: Optional[Tuple[float, int]] = None,
+    limit: int = 20,
+) -> dict:
+    """
+    Ищет задачи по названию и содержимому среди задач, где пользователь исполнитель или постановщик.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID текущего пользователя.
+        query (str): Поисковый запрос.
+        cursor (Optional[Tuple[float, int]]): Курсор предыдущей страницы.
+        limit (int): Максимальное количество задач на странице.
+
+    Возвращает:
+        dict: Найденные задачи с рангом и курсор следующей страницы.
+    """
+    participant = or_(models.Task.task_executor == user_id, models.Task.task_director == user_id)
+    rows = (await db.execute(_search(models.Task, participant, query, cursor, limit))).all()
+    return _search_page(rows, limit, lambda task: schemas.TaskResponse.model_validate(task).model_dump(mode="json"))
+
+# Поля сортировки списка задач
+TASK_SORT_COLUMNS = {
+    "date": models.Task.task_date,
+    "deadline": models.Task.task_deadline,
+}
+
+async def get_tasks(
+    db: AsyncSession,
+    user_id: Optional[int],
+    executor: Optional[int] = None,
+    director: Optional[int] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    sort: str = "-date",
+    cursor: Optional[Tuple[Optional[datetime], int]] = None,
+    limit: int = 50,
+) -> dict:
+    """
+    Получает страницу задач с фильтрами, сортировкой и keyset-пагинацией по (поле сортировки, id).
+
+    Пустые дедлайны сортируются как в PostgreSQL по умолчанию (последними по возрастанию и
+    первыми по убыванию), поэтому страница читается проходом по составному индексу в любом направлении.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (Optional[int]): ID пользователя, задачи которого доступны (исполнитель или постановщик);
+            None - без ограничения (для администратора).
+        executor (Optional[int]): ID исполнителя.
+        director (Optional[int]): ID постановщика.
+        status (Optional[str]): Статус задачи.
+        priority (Optional[str]): Приоритет задачи.
+        deadline_from (Optional[datetime]): Дедлайн не раньше указанного.
+        deadline_to (Optional[datetime]): Дедлайн не позже указанного.
+        sort (str): Поле сортировки из TASK_SORT_COLUMNS, с префиксом "-" - по убыванию.
+        cursor (Optional[Tuple[Optional[datetime], int]]): Значение поля сортировки и id последней задачи предыдущей страницы.
+        limit (int): Максимальное количество задач на странице.
+
+    Возвращает:
+        dict: Задачи страницы и курсор следующей страницы вида "<значение>:<id>" или None.
+    """
+    descending = sort.startswith("-")
+    sort_name = sort.lstrip("-")
+    sort_column = TASK_SORT_COLUMNS[sort_name]
+
+    query = select(models.Task)
+    if user_id is not None:
+        query = query.filter(or_(models.Task.task_executor == user_id, models.Task.task_director == user_id))
+    if executor is not None:
+        query = query.filter(models.Task.task_executor == executor)
+    if director is not None:
+        query = query.filter(models.Task.task_director == director)
+    if status is not None:
+        query = query.filter(models.Task.task_status == status)
+    if priority is not None:
+        query = query.filter(models.Task.task_priority == priority)
+    if deadline_from is not None:
+        query = query.filter(models.Task.task_deadline >= deadline_from)
+    if deadline_to is not None:
+        query = query.filter(models.Task.task_deadline <= deadline_to)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), models.Task.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), models.Task.id.asc())
+
+    # Продолжение после курсора разбивается на части без OR, каждая из которых читается
+    # диапазоном индекса; следующая часть запрашивается, только если страница не заполнена
+    if cursor is None:
+        segments = [true()]
+    else:
+        value, last_id = cursor
+        if descending:
+            # Порядок: NULL, затем значения по убыванию
+            if value is None:
+                segments = [sort_column.is_(None) & (models.Task.id < last_id), sort_column.is_not(None)]
+            else:
+                segments = [tuple_(sort_column, models.Task.id) < tuple_(value, last_id)]
+        else:
+            # Порядок: значения по возрастанию, затем NULL
+            if value is None:
+                segments = [sort_column.is_(None) & (models.Task.id > last_id)]
+            else:
+                segments = [tuple_(sort_column, models.Task.id) > tuple_(value, last_id), sort_column.is_(None)]
+
+    tasks = []
+    for condition in segments:
+        # Запрашиваем на одну запись больше, чтобы понять, есть ли следующая страница
+        tasks += (await db.execute(query.filter(condition).limit(limit + 1 - len(tasks)))).scalars().all()
+        if len(tasks) > limit:
+            break
+
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    next_cursor = None
+    if has_more:
+        last_value = getattr(tasks[-1], sort_column.key)
+        next_cursor = f"{last_value.isoformat() if last_value is not None else ''}:{tasks[-1].id}"
+    return {
+        "tasks": [schemas.TaskResponse.model_validate(task).model_dump(mode="json") for task in tasks],
+        "next_cursor": next_cursor,
+    }
+
+async def get_task(db: AsyncSession, task_id: int) -> Optional[models.Task]:
+    """
+    Получает задачу по её ID.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        task_id (int): ID задачи.
+
+    Возвращает:
+        Optional[Task]: Задача или None, если она не найдена.
+    """
+    return await db.get(models.Task, task_id)
+
+async def get_upcoming_deadlines(db: AsyncSession, after: datetime) -> List[Tuple[int, datetime]]:
+    """
+    Получает дедлайны задач позже указанного момента. Выполняется один раз при запуске планировщика.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        after (datetime): Нижняя граница дедлайна.
+
+    Возвращает:
+        List[Tuple[int, datetime]]: Пары (ID задачи, дедлайн).
+    """
+    result = await db.execute(
+        select(models.Task.id, models.Task.task_deadline).filter(models.Task.task_deadline > after)
+    )
+    return [tuple(row) for row in result.all()]
+
+async def get_message_changes(db: AsyncSession, user_id: int, cursor_xid: int = 0, cursor_id: int = 0, limit: int = 500):
+    """
+    Получает новые и изменённые сообщения пользователя после указанного курсора.
+
+    Курсором служит пара (change_xid, id). Возвращаются только изменения транзакций с ID меньше
+    xmin текущего снимка: все такие транзакции уже завершены, поэтому ни одно изменение не
+    появится позже за уже выданным курсором.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID пользователя.
+        cursor_xid (int): ID транзакции из курсора.
+        cursor_id (int): ID последнего полученного сообщения внутри транзакции cursor_xid.
+        limit (int): Максимальное количество сообщений в ответе.
+
+    Возвращает:
+        dict: Изменённые сообщения, следующий курсор и признак наличия ещё не полученных изменений.
+    """
+    horizon = (await db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))).scalar_one()
+
+    result = await db.execute(
+        select(models.Message)
+        .filter(
+            or_(models.Message.message_sender == user_id, models.Message.message_receiver == user_id),
+            models.Message.change_xid >= cursor_xid,
+            tuple_(models.Message.change_xid, models.Message.id) > tuple_(cursor_xid, cursor_id),
+            models.Message.change_xid < horizon,
+        )
+        .order_by(models.Message.change_xid, models.Message.id)
+        .limit(limit + 1)
+    )
+    messages = result.scalars().all()
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if has_more:
+        next_cursor = (messages[-1].change_xid, messages[-1].id)
+    else:
+        next_cursor = max((horizon, 0), (cursor_xid, cursor_id))
+
+    return {
+        "messages": [format_message(msg) for msg in messages],
+        "cursor": f"{next_cursor[0]}:{next_cursor[1]}",
+        "has_more": has_more,
+    }
+
+# Максимальное количество параметров строк VALUES в одном запросе: лимит протокола PostgreSQL - 32767,
+# остаток оставлен для прочих параметров запроса
+MAX_QUERY_PARAMETERS = 32000
+
+def _chunks(rows: list, columns: int):
+    """
+    Делит строки VALUES на части, каждая из которых укладывается в MAX_QUERY_PARAMETERS параметров.
+
+    Аргументы:
+        rows (list): Строки значений.
+        columns (int): Количество параметров в одной строке.
+
+    Возвращает:
+        Iterator[list]: Части списка строк.
+    """
+    size = MAX_QUERY_PARAMETERS // columns
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+async def increment_unread_counter(db: AsyncSession, receiver_id: int, sender_id: int, message_id: int) -> None:
+    """
+    Увеличивает счётчик непрочитанных сообщений от отправителя. Не фиксирует транзакцию.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        receiver_id (int): ID получателя.
+        sender_id (int): ID отправителя.
+        message_id (int): ID нового сообщения.
+    """
+    await increment_unread_counters(db, {(receiver_id, sender_id): (1, message_id)})
+
+async def increment_unread_counters(db: AsyncSession, counters: Dict[Tuple[int, int], Tuple[int, int]]) -> None:
+    """
+    Увеличивает несколько счётчиков непрочитанных сообщений одним запросом. Не фиксирует транзакцию.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        counters (Dict[Tuple[int, int], Tuple[int, int]]): Для пары (ID получателя, ID отправителя) -
+            количество новых сообщений и ID последнего из них.
+    """
+    if not counters:
+        return
+    # Строки упорядочены по ключу, чтобы параллельные пакетные вставки блокировали их в одном порядке
+    statement = insert(models.UnreadCounter).values([
+        {"receiver_id": receiver_id, "sender_id": sender_id, "count": count, "last_message_id": last_message_id}
+        for (receiver_id, sender_id), (count, last_message_id) in sorted(counters.items())
+    ])
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[models.UnreadCounter.receiver_id, models.UnreadCounter.sender_id],
+            set_={
+                "count": models.UnreadCounter.count + statement.excluded.count,
+                "last_message_id": func.greatest(models.UnreadCounter.last_message_id, statement.excluded.last_message_id),
+            },
+        )
+    )
+
+async def decrement_unread_counter(db: AsyncSession, receiver_id: int, sender_id: int, amount: int) -> None:
+    """
+    Уменьшает счётчик непрочитанных сообщений от отправителя. Не фиксирует транзакцию.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        receiver_id (int): ID получателя.
+        sender_id (int): ID отправителя.
+        amount (int): Количество сообщений, ставших прочитанными.
+    """
+    await decrement_unread_counters(db, {(receiver_id, sender_id): amount})
+
+async def decrement_unread_counters(db: AsyncSession, amounts: Dict[Tuple[int, int], int]) -> None:
+    """
+    Уменьшает несколько счётчиков непрочитанных сообщений одним запросом. Не фиксирует транзакцию.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        amounts (Dict[Tuple[int, int], int]): Количество прочитанных сообщений для пары (ID получателя, ID отправителя).
+    """
+    rows = sorted((receiver_id, sender_id, amount) for (receiver_id, sender_id), amount in amounts.items() if amount > 0)
+    for chunk in _chunks(rows, 3):
+        decrements = values(
+            column("receiver_id", Integer),
+            column("sender_id", Integer),
+            column("amount", Integer),
+            name="decrements",
+        ).data(chunk)
+        await db.execute(
+            update(models.UnreadCounter)
+            .filter(
+                models.UnreadCounter.receiver_id == decrements.c.receiver_id,
+                models.UnreadCounter.sender_id == decrements.c.sender_id,
+            )
+            .values(count=func.greatest(models.UnreadCounter.count - decrements.c.amount, 0))
+        )
+
+async def update_messages_status(db: AsyncSession, receiver_id: int, sender_id: int, message_status: str) -> int:
+    """
+    Меняет статус всех непрочитанных сообщений от отправителя и обновляет счётчик в той же транзакции.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        receiver_id (int): ID получателя (текущего пользователя).
+        sender_id (int): ID отправителя.
+        message_status (str): Новый статус сообщений.
+
+    Возвращает:
+        int: Количество обновлённых сообщений.
+    """
+    result = await db.execute(
+        update(models.Message)
+        .filter(
+            models.Message.message_receiver == receiver_id,
+            models.Message.message_sender == sender_id,
+            models.Message.message_status == "unread"
+        )
+        .values(message_status=message_status, change_xid=models.CURRENT_XID)
+    )
+    updated_rows = result.rowcount
+    if message_status != "unread":
+        await decrement_unread_counter(db, receiver_id, sender_id, updated_rows)
+
+    await db.commit()
+    return updated_rows
+
+async def mark_messages_read(
+    db: AsyncSession,
+    ranges: List[Tuple[int, int, int, int]],
+) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, str]]]:
+    """
+    Отмечает прочитанными непрочитанные сообщения из нескольких переписок одним UPDATE ... FROM (VALUES ...)
+    (большой пакет - несколькими UPDATE в пределах MAX_QUERY_PARAMETERS) и уменьшает счётчики
+    непрочитанных в той же транзакции.
+
+    Каждый диапазон задаёт переписку и интервал ID сообщений: отдельное сообщение передаётся
+    диапазоном из одного ID, отметка "прочитано до" - диапазоном от 0. Отправителям прочитанных
+    сообщений создаются события message.read; вызывающий код публикует их через manager.broadcast_many.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        ranges (List[Tuple[int, int, int, int]]): Четвёрки (ID получателя, ID отправителя, первый ID, последний ID).
+
+    Возвращает:
+        Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, str]]]: Прочитанные сообщения
+            (ID сообщения, ID получателя, ID отправителя) и события для публикации.
+    """
+    if not ranges:
+        return [], []
+    read = []
+    # Большой пакет делится на несколько UPDATE, чтобы не превысить лимит параметров запроса
+    for chunk in _chunks(sorted(set(ranges)), 4):
+        read_ranges = values(
+            column("receiver_id", Integer),
+            column("sender_id", Integer),
+            column("first_id", Integer),
+            column("last_id", Integer),
+            name="read_ranges",
+        ).data(chunk)
+        # Каждый диапазон ищется отдельным проходом по индексу (получатель, отправитель, id):
+        # при соединении хэшированием по переписке все диапазоны одной переписки сравнивались бы
+        # со всеми её сообщениями. OFFSET 0 не даёт планировщику развернуть LATERAL-подзапрос
+        # в такое соединение.
+        range_message = aliased(models.Message)
+        matched = (
+            select(range_message.id)
+            .filter(
+                range_message.message_receiver == read_ranges.c.receiver_id,
+                range_message.message_sender == read_ranges.c.sender_id,
+                range_message.id.between(read_ranges.c.first_id, read_ranges.c.last_id),
+                range_message.message_status == "unread",
+            )
+            .offset(0)
+            .lateral("matched")
+        )
+        unread = select(matched.c.id).select_from(read_ranges).join(matched, true()).subquery("unread")
+        result = await db.execute(
+            update(models.Message)
+            # Статус проверяется и здесь: параллельная транзакция могла уже отметить сообщение прочитанным
+            .filter(models.Message.id == unread.c.id, models.Message.message_status == "unread")
+            .values(message_status="read", change_xid=models.CURRENT_XID)
+            .returning(models.Message.id, models.Message.message_receiver, models.Message.message_sender)
+        )
+        read += result.all()
+    read.sort()
+    if not read:
+        await db.commit()
+        return [], []
+
+    conversations = {}
+    for message_id, receiver_id, sender_id in read:
+        conversations.setdefault((receiver_id, sender_id), []).append(message_id)
+    await decrement_unread_counters(db, {key: len(ids) for key, ids in conversations.items()})
+
+    events = await create_events(db, [
+        (sender_id, schemas.MessagesReadEvent(reader_id=receiver_id, message_ids=message_ids))
+        for (receiver_id, sender_id), message_ids in conversations.items()
+    ])
+    await db.commit()
+    return [tuple(row) for row in read], events
+
+async def get_unread_summary(db: AsyncSession, user_id: int):
+    """
+    Получает количество непрочитанных сообщений по каждому отправителю из таблицы счётчиков.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID получателя.
+
+    Возвращает:
+        list[dict]: Отправители с количеством непрочитанных сообщений, начиная с самых свежих.
+    """
+    result = await db.execute(
+        select(models.UnreadCounter, models.User.name.label("sender_name"))
+        .join(models.User, models.UnreadCounter.sender_id == models.User.id)
+        .filter(models.UnreadCounter.receiver_id == user_id, models.UnreadCounter.count > 0)
+        .order_by(models.UnreadCounter.last_message_id.desc())
+    )
+
+    return [
+        {
+            "sender_id": row.UnreadCounter.sender_id,
+            "name": row.sender_name,
+            "count": row.UnreadCounter.count,
+            "last_message_id": row.UnreadCounter.last_message_id,
+        }
+        for row in result.all()
+    ]
+
+# События WebSocket
+async def create_events(db: AsyncSession, events: List[Tuple[int, schemas.EventBase]]) -> List[Tuple[int, int, str]]:
+    """
+    Присваивает событиям порядковые номера и сохраняет их для повторной доставки. Не фиксирует транзакцию.
+
+    Номера выделяются одним запросом из счётчиков получателей (ws_event_counters). Строки счётчиков
+    остаются заблокированными до конца транзакции, поэтому параллельная транзакция для того же
+    получателя получит следующий номер только после фиксации этой: номера событий пользователя
+    идут без пропусков и в порядке фиксации, и событие с меньшим номером никогда не становится
+    видимым позже события с большим. Каждое событие сериализуется один раз; эта же строка
+    сохраняется в БД и отправляется всем устройствам.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        events (List[Tuple[int, EventBase]]): Пары (ID пользователя-получателя, событие).
+
+    Возвращает:
+        List[Tuple[int, int, str]]: Тройки (ID пользователя, seq, сериализованное событие).
+    """
+    if not events:
+        return []
+    counts: Dict[int, int] = {}
+    for user_id, _ in events:
+        counts[user_id] = counts.get(user_id, 0) + 1
+    # Строки упорядочены по ключу, чтобы параллельные транзакции блокировали их в одном порядке
+    next_seqs = {}
+    for chunk in _chunks(sorted(counts.items()), 2):
+        statement = insert(models.WsEventCounter).values([
+            {"user_id": user_id, "last_seq": count} for user_id, count in chunk
+        ])
+        result = await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.WsEventCounter.user_id],
+                set_={"last_seq": models.WsEventCounter.last_seq + statement.excluded.last_seq},
+            ).returning(models.WsEventCounter.user_id, models.WsEventCounter.last_seq)
+        )
+        # Первый номер, выделенный каждому получателю в этой транзакции
+        next_seqs.update({user_id: last_seq - counts[user_id] + 1 for user_id, last_seq in result.all()})
+
+    created = []
+    for user_id, event in events:
+        seq = next_seqs[user_id]
+        next_seqs[user_id] += 1
+        event.seq = seq
+        created.append((user_id, seq, serialize_event(event)))
+    await db.execute(
+        insert(models.WsEvent),
+        [{"user_id": user_id, "seq": seq, "payload": frame} for user_id, seq, frame in created],
+    )
+    return created
+
+async def get_events_after(
+    db: AsyncSession,
+    user_id: int,
+    last_seq: int,
+    limit: int,
+    before: Optional[int] = None,
+) -> Optional[List[Tuple[int, str]]]:
+    """
+    Получает события пользователя с номером больше last_seq для повторной доставки.
+
+    Номера событий пользователя идут без пропусков, поэтому неполный диапазон означает,
+    что события удалены по сроку хранения.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID пользователя.
+        last_seq (int): Номер последнего полученного клиентом события.
+        limit (int): Максимальное количество событий для повторной доставки.
+        before (Optional[int]): Если указан, возвращаются только события с номером меньше before.
+
+    Возвращает:
+        Optional[List[Tuple[int, str]]]: Пары (seq, событие) по возрастанию seq или None, если пропущенные
+        события уже удалены, их больше limit или last_seq больше номера последнего события пользователя,
+        и клиенту нужно загрузить историю заново.
+    """
+    query = (
+        select(models.WsEvent.seq, models.WsEvent.payload)
+        .filter(models.WsEvent.user_id == user_id, models.WsEvent.seq > last_seq)
+        .order_by(models.WsEvent.seq)
+        .limit(limit + 1)
+    )
+    if before is not None:
+        query = query.filter(models.WsEvent.seq < before)
+    events = [(row.seq, row.payload) for row in (await db.execute(query)).all()]
+    if len(events) > limit:
+        return None
+    last_expected = before - 1 if before is not None else None
+    if events:
+        complete = events[0][0] == last_seq + 1 and events[-1][0] == last_seq + len(events)
+        return events if complete and last_expected in (None, events[-1][0]) else None
+    if last_expected is not None:
+        return events if last_expected == last_seq else None
+
+    # Новых событий нет: номер клиента должен совпадать с номером последнего события пользователя
+    return events if await get_last_event_seq(db, user_id) == last_seq else None
+
+async def get_last_event_seq(db: AsyncSession, user_id: int) -> int:
+    """
+    Получает номер последнего зафиксированного события пользователя.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID пользователя.
+
+    Возвращает:
+        int: Номер последнего события или 0, если событий ещё не было.
+    """
+    result = await db.execute(
+        select(models.WsEventCounter.last_seq).filter(models.WsEventCounter.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+async def get_event(db: AsyncSession, user_id: int, seq: int) -> Optional[models.WsEvent]:
+    """
+    Получает событие пользователя по номеру.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        user_id (int): ID пользователя-получателя.
+        seq (int): Номер события.
+
+    Возвращает:
+        WsEvent: Объект события или None, если событие не найдено.
+    """
+    result = await db.execute(
+        select(models.WsEvent).filter(models.WsEvent.user_id == user_id, models.WsEvent.seq == seq)
+    )
+    return result.scalars().first()
+
+async def prune_events(db: AsyncSession, retention: timedelta) -> int:
+    """
+    Удаляет события старше срока хранения.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        retention (timedelta): Срок хранения событий.
+
+    Возвращает:
+        int: Количество удалённых событий.
+    """
+    result = await db.execute(delete(models.WsEvent).filter(models.WsEvent.created_at < func.now() - retention))
+    await db.commit()
+    return result.rowcount
+
+async def save_messages(
+    db: AsyncSession,
+    message_sender: int,
+    messages: List[Tuple[int, str]],
+    message_status: str = "unread",
+) -> Tuple[List[int], List[Tuple[int, int, str]]]:
+    """
+    Сохраняет несколько сообщений от одного отправителя в одной транзакции.
+
+    Сообщения вставляются одним многострочным INSERT ... RETURNING, счётчики непрочитанных
+    и события для повторной доставки обновляются пакетно. Уведомления не отправляются:
+    вызывающий код публикует возвращённые события через manager.broadcast_many
+    после фиксации транзакции.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        message_sender (int): ID отправителя сообщений.
+        messages (List[Tuple[int, str]]): Пары (ID получателя, текст сообщения).
+        message_status (str): Статус сообщений (по умолчанию "unread").
+
+    Возвращает:
+        Tuple[List[int], List[Tuple[int, int, str]]]: ID сохранённых сообщений в порядке входных
+            данных и события (ID получателя, номер события, сериализованное событие).
+    """
+    if not messages:
+        return [], []
+    message_time = datetime.now()
+    result = await db.execute(
+        insert(models.Message).returning(models.Message.id, sort_by_parameter_order=True),
+        [
+            {
+                "message_time": message_time,
+                "message": message,
+                "message_sender": message_sender,
+                "message_receiver": message_receiver,
+                "message_status": message_status,
+            }
+            for message_receiver, message in messages
+        ],
+    )
+    message_ids = result.scalars().all()
+
+    if message_status == "unread":
+        counters = {}
+        for message_id, (message_receiver, _) in zip(message_ids, messages):
+            count, _ = counters.get((message_receiver, message_sender), (0, 0))
+            counters[(message_receiver, message_sender)] = (count + 1, message_id)
+        await increment_unread_counters(db, counters)
+
+    events = await create_events(db, [
+        (
+            message_receiver,
+            schemas.NewMessageEvent(
+                message_id=message_id,
+                sender_id=message_sender,
+                receiver_id=message_receiver,
+                message=message,
+                time=message_time,
+            ),
+        )
+        for message_id, (message_receiver, message) in zip(message_ids, messages)
+    ])
+    await db.commit()
+    return message_ids, events
+
 async def save_message(
-    db: Session,
+    db: AsyncSession,
     message_sender: int,
     message_receiver: int,
     message: str,
     message_status: str = "unread",
-) -> models.Message:
+) -> Tuple[int, List[Tuple[int, int, str]]]:
     """
-    Сохраняет сообщение в базе данных и отправляет уведомление через WebSocket.
+    Сохраняет одно сообщение: INSERT ... RETURNING без повторного чтения строки.
 
     Аргументы:
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         message_sender (int): ID отправителя сообщения.
         message_receiver (int): ID получателя сообщения.
         message (str): Текст сообщения.
         message_status (str): Статус сообщения (по умолчанию "unread").
 
     Возвращает:
-        Message: Объект сохранённого сообщения.
+        Tuple[int, List[Tuple[int, int, str]]]: ID сохранённого сообщения и события для публикации
+            через manager.broadcast_many.
     """
-    db_message = models.Message(
-        message_time=datetime.now(),
-        message=message,
-        message_sender=message_sender,
-        message_receiver=message_receiver,
-        message_status=message_status,
-    )
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-
-    notification_data = {
-        "detail": "New message",
-        "message_id": db_message.id,
-        "sender_id": message_sender,
-        "receiver_id": message_receiver,
-        "message": message,
-        "time": db_message.message_time.isoformat(),
-    }
-    await manager.broadcast(str(notification_data), item_id=message_receiver)
-
-    return db_message
+    [message_id], events = await save_messages(db, message_sender, [(message_receiver, message)], message_status)
+    return message_id, events
@@ -0,0 +1,285 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import asyncpg
+
+from app import crud, schemas
+from app.database import AsyncSessionLocal
+from app.pubsub import PUBSUB_DATABASE_URL, InProcessBackend, _to_asyncpg_dsn
+from app.websocket_manager import manager
+
+# Настройки напоминаний о дедлайнах задач
+TASK_REMINDER_LEAD_MINUTES = [int(m) for m in os.getenv("TASK_REMINDER_LEAD_MINUTES", "1440,60").split(",") if m.strip()]  # За сколько минут до дедлайна напоминать.
+TASK_REMINDER_SKIP_STATUSES = {s.strip() for s in os.getenv("TASK_REMINDER_SKIP_STATUSES", "done,closed").split(",") if s.strip()}  # Статусы задач без напоминаний.
+TASK_SCHEDULER_CHANNEL = os.getenv("TASK_SCHEDULER_CHANNEL", "task_deadlines")  # Канал pub/sub для изменений дедлайнов.
+TASK_SCHEDULER_LOCK_KEY = int(os.getenv("TASK_SCHEDULER_LOCK_KEY", 7310240))  # Ключ advisory lock для выбора ведущего воркера.
+TASK_SCHEDULER_ELECTION_SECONDS = float(os.getenv("TASK_SCHEDULER_ELECTION_SECONDS", 10))  # Интервал попыток стать ведущим и проверки блокировки.
+TASK_SCHEDULER_DATABASE_URL = os.getenv("TASK_SCHEDULER_DATABASE_URL", PUBSUB_DATABASE_URL)  # Прямое подключение к PostgreSQL для advisory lock.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))  # Количество воркеров приложения (как у uvicorn/gunicorn); при нескольких нужен PUBSUB_BACKEND=postgres.
+
+# Запись кучи: (время напоминания, ID задачи, дедлайн, минут до дедлайна)
+HeapEntry = Tuple[datetime, int, datetime, int]
+
+
+class DeadlineScheduler:
+    """
+    Планировщик напоминаний о дедлайнах задач.
+
+    Напоминания выполняет только один ведущий воркер: он удерживает сессионный advisory lock
+    PostgreSQL на отдельном соединении, остальные воркеры периодически пытаются его захватить.
+    Став ведущим, воркер один раз загружает будущие дедлайны в кучу (min-heap) и затем
+    обновляет её по событиям об изменении задач из канала pub/sub, не сканируя таблицу tasks.
+    Перед отправкой задача перечитывается по ID: удалённые, перенесённые и завершённые задачи
+    пропускаются.
+
+    Изменения задач доходят до ведущего воркера только через общий бэкенд pub/sub, поэтому при
+    нескольких воркерах нужен PUBSUB_BACKEND=postgres: с бэкендом "memory" задачи, созданные
+    на других воркерах, не попадут в расписание. С бэкендом "memory" планировщик не запускается
+    при WEB_CONCURRENCY больше 1 и предупреждает об ограничении при одном воркере.
+
+    Атрибуты:
+        leads (List[int]): За сколько минут до дедлайна отправлять напоминания.
+        dsn (str): Строка подключения для advisory lock (не через пулер в режиме транзакций).
+        lock_key (int): Ключ advisory lock.
+        election_interval (float): Интервал попыток захвата блокировки и проверки соединения.
+    """
+
+    def __init__(self, leads: List[int], dsn: str, lock_key: int, election_interval: float):
+        self.leads = sorted(set(leads), reverse=True)
+        self.dsn = dsn
+        self.lock_key = lock_key
+        self.election_interval = election_interval
+        self.is_leader = False
+        self.reminders_sent = 0
+        self._heap: List[HeapEntry] = []
+        # Актуальный дедлайн запланированных задач; записи кучи с другим дедлайном устарели
+        self._deadlines: Dict[int, datetime] = {}
+        self._loading = False
+        self._changed_during_load: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def task_changed(self, task_id: int, deadline: Optional[datetime]):
+        """
+        Сообщает ведущему воркеру о создании или изменении задачи.
+        Вызывается после фиксации транзакции.
+
+        Аргументы:
+            task_id (int): ID задачи.
+            deadline (Optional[datetime]): Новый дедлайн задачи.
+        """
+        manager.pubsub.publish(TASK_SCHEDULER_CHANNEL, f"{task_id} {deadline.isoformat() if deadline else '-'}")
+
+    def _on_task_changed(self, payload: str):
+        """
+        Обрабатывает изменение задачи из канала pub/sub (только на ведущем воркере).
+
+        Аргументы:
+            payload (str): ID задачи и дедлайн в формате ISO ("-", если дедлайна нет).
+        """
+        if not self.is_leader:
+            return
+        task_id, deadline = payload.split(" ", 1)
+        task_id = int(task_id)
+        if self._loading:
+            self._changed_during_load.add(task_id)
+        self._schedule(task_id, None if deadline == "-" else datetime.fromisoformat(deadline), catch_up=True)
+
+    def _schedule(self, task_id: int, deadline: Optional[datetime], catch_up: bool):
+        """
+        Добавляет напоминания о задаче в кучу, заменяя ранее запланированные.
+
+        Аргументы:
+            task_id (int): ID задачи.
+            deadline (Optional[datetime]): Дедлайн задачи (None - напоминания не нужны).
+            catch_up (bool): Если время одного или нескольких напоминаний уже прошло, а дедлайн
+                ещё нет, сразу отправить ближайшее к дедлайну из них.
+        """
+        if deadline is not None and self._deadlines.get(task_id) == deadline:
+            # Дедлайн не изменился: напоминания уже запланированы
+            return
+        self._deadlines.pop(task_id, None)
+        now = datetime.now()
+        if deadline is None or deadline <= now:
+            return
+        missed = None
+        for lead in self.leads:
+            fire_at = deadline - timedelta(minutes=lead)
+            if fire_at > now:
+                heapq.heappush(self._heap, (fire_at, task_id, deadline, lead))
+            else:
+                missed = lead
+        if catch_up and missed is not None:
+            heapq.heappush(self._heap, (now, task_id, deadline, missed))
+        elif missed == self.leads[-1]:
+            return
+        self._deadlines[task_id] = deadline
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _fire(self, task_id: int, deadline: datetime, lead: int):
+        """
+        Отправляет напоминание исполнителю и постановщику задачи, если она не изменилась.
+
+        Аргументы:
+            task_id (int): ID задачи.
+            deadline (datetime): Дедлайн, для которого запланировано напоминание.
+            lead (int): За сколько минут до дедлайна отправляется напоминание.
+        """
+        async with AsyncSessionLocal() as db:
+            task = await crud.get_task(db, task_id)
+            if task is None or task.task_deadline != deadline or task.task_status in TASK_REMINDER_SKIP_STATUSES:
+                return
+            reminder = schemas.TaskReminderEvent(
+                task_id=task.id,
+                task_name=task.task_name,
+                task_deadline=task.task_deadline,
+                lead_minutes=lead,
+            )
+            recipients = {task.task_executor, task.task_director} - {None}
+            events = await crud.create_events(db, [(user_id, reminder.model_copy()) for user_id in sorted(recipients)])
+            await db.commit()
+        manager.broadcast_many(events)
+        self.reminders_sent += 1
+
+    async def _lead(self, connection):
+        """
+        Выполняет напоминания, пока воркер удерживает блокировку.
+
+        Аргументы:
+            connection: Соединение asyncpg, на котором удерживается advisory lock.
+        """
+        self.is_leader = True
+        self._loading = True
+        self._changed_during_load = set()
+        try:
+            async with AsyncSessionLocal() as db:
+                deadlines = await crud.get_upcoming_deadlines(db, datetime.now())
+        finally:
+            self._loading = False
+        for task_id, deadline in deadlines:
+            if task_id not in self._changed_during_load:
+                self._schedule(task_id, deadline, catch_up=False)
+        print(f"Планировщик дедлайнов запущен: {len(self._deadlines)} задач")
+
+        while True:
+            timeout = self.election_interval
+            if self._heap:
+                timeout = min(timeout, max((self._heap[0][0] - datetime.now()).total_seconds(), 0))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Соединение с блокировкой должно быть живо, иначе ведущим может стать другой воркер
+            await connection.execute("SELECT 1")
+
+            now = datetime.now()
+            while self._heap and self._heap[0][0] <= now:
+                _, task_id, deadline, lead = heapq.heappop(self._heap)
+                if self._deadlines.get(task_id) != deadline:
+                    continue
+                if lead == self.leads[-1]:
+                    # Последнее напоминание для этого дедлайна
+                    del self._deadlines[task_id]
+                try:
+                    await self._fire(task_id, deadline, lead)
+                except Exception as e:
+                    print(f"Ошибка отправки напоминания по задаче {task_id}: {e}")
+
+    async def _run(self):
+        """
+        Пытается стать ведущим воркером и выполняет напоминания, пока удерживает блокировку.
+        """
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                while not await connection.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_key):
+                    await asyncio.sleep(self.election_interval)
+                await self._lead(connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка планировщика дедлайнов: {e}")
+            finally:
+                self.is_leader = False
+                self._heap.clear()
+                self._deadlines.clear()
+                if connection is not None and not connection.is_closed():
+                    # Закрытие соединения освобождает advisory lock
+                    await connection.close()
+            await asyncio.sleep(self.election_interval)
+
+    @staticmethod
+    def _check_pubsub(workers: int = WEB_CONCURRENCY):
+        """
+        Проверяет, что изменения задач с любого воркера доходят до ведущего.
+
+        Аргументы:
+            workers (int): Количество воркеров приложения.
+
+        Исключения:
+            RuntimeError: Если воркеров несколько, а бэкенд pub/sub работает внутри процесса.
+        """
+        if not isinstance(manager.pubsub, InProcessBackend):
+            return
+        if workers > 1:
+            raise RuntimeError(
+                f"Планировщик дедлайнов не работает с PUBSUB_BACKEND=memory при {workers} воркерах: "
+                "задачи, созданные на других воркерах, не попадут в расписание. Используйте PUBSUB_BACKEND=postgres."
+            )
+        print(
+            "ВНИМАНИЕ: планировщик дедлайнов запущен с PUBSUB_BACKEND=memory. Изменения задач доходят "
+            "до него только из этого процесса; при нескольких воркерах используйте PUBSUB_BACKEND=postgres."
+        )
+
+    async def start(self):
+        """
+        Запускает выбор ведущего воркера. Вызывается один раз при старте воркера.
+        """
+        if not self.leads:
+            return
+        self._check_pubsub()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Останавливает планировщик и освобождает блокировку.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+        Возвращает метрики планировщика.
+
+        Возвращает:
+            dict: Признак ведущего воркера, количество запланированных задач и отправленных напоминаний.
+        """
+        return {
+            "is_leader": self.is_leader,
+            "lead_minutes": self.leads,
+            "scheduled_tasks": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "reminders_sent": self.reminders_sent,
+        }
+
+
+# Экземпляр DeadlineScheduler для напоминаний о дедлайнах
+deadline_scheduler = DeadlineScheduler(
+    TASK_REMINDER_LEAD_MINUTES,
+    _to_asyncpg_dsn(TASK_SCHEDULER_DATABASE_URL),
+    TASK_SCHEDULER_LOCK_KEY,
+    TASK_SCHEDULER_ELECTION_SECONDS,
+)
+manager.pubsub.subscribe(TASK_SCHEDULER_CHANNEL, deadline_scheduler._on_task_changed)
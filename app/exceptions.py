@@ -57,3 +57,18 @@ class InternalServerErrorException(CustomHTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal Server Error"
         )
+
+class ServiceUnavailableException(CustomHTTPException):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service temporarily unavailable",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class QueryBudgetExceededException(CustomHTTPException):
+    def __init__(self, violation: str):
+        super().__init__(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query budget exceeded: {violation}"
+        )
@@ -0,0 +1,205 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.exceptions import ServiceUnavailableException
+
+# Контекст для хэширования паролей
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Настройки пула хэширования паролей
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" или "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))  # Количество воркеров пула.
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 64))  # Максимум задач, ожидающих свободного воркера.
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1))  # Значение Retry-After (в секундах) при переполнении.
+
+
+def _hash(password: str) -> str:
+    """
+    Хэширует пароль. Выполняется внутри воркера пула.
+
+    Аргументы:
+        password (str): Пароль в открытом виде.
+
+    Возвращает:
+        str: Хэш пароля.
+    """
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    """
+    Проверяет пароль по хэшу. Выполняется внутри воркера пула.
+
+    Аргументы:
+        password (str): Пароль в открытом виде.
+        hashed (str): Сохранённый хэш пароля.
+
+    Возвращает:
+        bool: True, если пароль совпадает с хэшем.
+    """
+    return pwd_context.verify(password, hashed)
+
+
+def _timed(func, *args):
+    """
+    Выполняет функцию и измеряет время её выполнения. Выполняется внутри воркера пула,
+    поэтому время ожидания свободного воркера в задержку не входит.
+
+    Аргументы:
+        func: Функция (_hash или _verify).
+        *args: Аргументы функции.
+
+    Возвращает:
+        Tuple[Any, float]: Результат функции и время выполнения в секундах.
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Ограниченный пул для хэширования и проверки паролей вне цикла событий.
+
+    bcrypt освобождает GIL, поэтому по умолчанию используется пул потоков; пул процессов
+    включается через PASSWORD_HASH_EXECUTOR=process. Если все воркеры заняты и очередь
+    ожидания заполнена, новые запросы отклоняются с кодом 503 и заголовком Retry-After.
+
+    Атрибуты:
+        executor_type (str): Тип пула ("thread" или "process").
+        workers (int): Количество воркеров.
+        queue_limit (int): Максимальное количество задач, ожидающих свободного воркера.
+    """
+
+    def __init__(self, executor_type: str, workers: int, queue_limit: int):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип пула хэширования: {executor_type}")
+        self.executor_type = executor_type
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_jobs = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        """
+        Лениво создаёт пул при первом обращении.
+
+        Возвращает:
+            Executor: Пул потоков или процессов.
+        """
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func, *args):
+        """
+        Выполняет функцию в пуле с учётом лимита очереди и сбором метрик.
+
+        Исключения:
+            ServiceUnavailableException: Если очередь пула переполнена.
+        """
+        if self._pending >= self.workers + self.queue_limit:
+            self._rejected += 1
+            raise ServiceUnavailableException(retry_after=PASSWORD_HASH_RETRY_AFTER)
+
+        loop = asyncio.get_running_loop()
+        job = self._get_executor().submit(_timed, func, *args)
+        self._pending += 1
+
+        def on_done(job):
+            # Задача занимает воркер до завершения, даже если ожидавший её запрос отменён
+            # (клиент отключился), поэтому счётчик уменьшается только по завершении задачи
+            try:
+                loop.call_soon_threadsafe(self._job_done, job)
+            except RuntimeError:
+                pass  # Цикл событий уже остановлен
+
+        job.add_done_callback(on_done)
+        result, _ = await asyncio.wrap_future(job)
+        return result
+
+    def _job_done(self, job) -> None:
+        """
+        Учитывает завершение задачи пула. Вызывается в цикле событий.
+
+        Аргументы:
+            job (concurrent.futures.Future): Завершённая задача.
+        """
+        self._pending -= 1
+        if job.cancelled():
+            return
+        self._completed += 1
+        if job.exception() is None:
+            _, elapsed = job.result()
+            self._timed_jobs += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """
+        Хэширует пароль в пуле.
+
+        Аргументы:
+            password (str): Пароль в открытом виде.
+
+        Возвращает:
+            str: Хэш пароля.
+        """
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """
+        Проверяет пароль по хэшу в пуле.
+
+        Аргументы:
+            password (str): Пароль в открытом виде.
+            hashed (str): Сохранённый хэш пароля.
+
+        Возвращает:
+            bool: True, если пароль совпадает с хэшем.
+        """
+        return await self._run(_verify, password, hashed)
+
+    def stats(self) -> dict:
+        """
+        Возвращает метрики пула.
+
+        Возвращает:
+            dict: Глубина очереди, число выполняемых, завершённых и отклонённых задач, задержки хэширования.
+        """
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": max(self._pending - self.workers, 0),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "latency_avg_seconds": self._total_seconds / self._timed_jobs if self._timed_jobs else 0.0,
+            "latency_max_seconds": self._max_seconds,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Останавливает пул, дожидаясь завершения начатых задач.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Экземпляр PasswordHasher для работы с паролями
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from app import crud
+from app.database import AsyncSessionLocal
+
+# Настройки отложенной записи времени последнего входа
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", 5))  # Интервал записи накопленных значений в БД.
+LAST_LOGIN_MAX_PENDING = int(os.getenv("LAST_LOGIN_MAX_PENDING", 1000))  # Количество пользователей, при котором запись выполняется досрочно.
+
+
+class LastLoginBuffer:
+    """
+    Буфер отложенной записи времени последнего входа.
+
+    Вход пользователя не изменяет таблицу users: время запоминается в памяти и периодически
+    записывается одним пакетным UPDATE для всех вошедших пользователей. Повторные входы одного
+    пользователя между записями объединяются. При остановке приложения буфер записывается
+    в последний раз.
+
+    Атрибуты:
+        interval (float): Интервал записи в секундах.
+        max_pending (int): Количество пользователей в буфере, при котором запись выполняется досрочно.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, login_time: datetime):
+        """
+        Запоминает время входа пользователя для последующей записи.
+
+        Аргументы:
+            user_id (int): ID пользователя.
+            login_time (datetime): Время входа.
+        """
+        previous = self._pending.get(user_id)
+        if previous is None or previous < login_time:
+            self._pending[user_id] = login_time
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные значения в БД. При ошибке значения возвращаются в буфер.
+
+        Возвращает:
+            int: Количество обновлённых пользователей.
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                updated = await crud.update_last_logins(db, pending)
+        except BaseException:
+            # Не теряем значения (в том числе при отмене задачи): более поздние входы,
+            # записанные за время запроса, остаются в приоритете
+            for user_id, login_time in pending.items():
+                self.record(user_id, login_time)
+            raise
+        return updated
+
+    async def _flush_loop(self):
+        """
+        Периодически записывает буфер в БД.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Ошибка записи времени последнего входа: {e}")
+
+    async def start(self):
+        """
+        Запускает периодическую запись. Вызывается один раз при старте воркера.
+        """
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """
+        Останавливает периодическую запись и записывает оставшиеся значения.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Ошибка записи времени последнего входа при остановке: {e}")
+
+
+# Экземпляр LastLoginBuffer для записи времени входа
+last_login_buffer = LastLoginBuffer(LAST_LOGIN_FLUSH_SECONDS, LAST_LOGIN_MAX_PENDING)
@@ -1,36 +1,75 @@
 import datetime
+import time
+import orjson
 import uvicorn
 import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI, Depends, Path, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, Path, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from app.exceptions import InvalidCredentialsException, BadRequestException, MethodNotAllowedException, \
-    ForbiddenException, UserNotFoundException, InternalServerErrorException
+    ForbiddenException, UserNotFoundException, ServiceUnavailableException
 from app.models import Base, User
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, schemas, auth, models
 from app.auth import oauth2_scheme, get_current_user, is_admin
-from app.database import engine, get_db
-from app.crud import pwd_context, create_user, save_message
+from app.database import engine, async_engine, get_db, AsyncSessionLocal, pool_stats
+from app.crud import create_user, save_message
+from app.hashing import pwd_context, password_hasher
 from datetime import timedelta
 from fastapi.middleware.cors import CORSMiddleware
 from app.schemas import UserCreate
+from app.deadline_scheduler import deadline_scheduler
+from app.last_login import last_login_buffer
+from app.read_receipts import read_receipt_batcher, receipt_ranges
+from app.user_cache import user_cache
 from app.websocket_manager import manager
+from app.metrics import MetricsMiddleware, instrument_engine, registry
+from app.query_inspector import QUERY_INSPECTOR_ENABLED, QueryInspectorMiddleware
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Управляет ресурсами приложения на время его работы.
+
+    При старте подписывает воркер на события pub/sub для WebSocket-рассылки, запускает
+    отложенную запись времени входа и выбор ведущего воркера для напоминаний о дедлайнах;
+    при остановке освобождает блокировку планировщика, записывает накопленное время входа
+    и отметки о прочтении, отключает pub/sub и завершает пул хэширования паролей.
+    """
+    await manager.start()
+    await last_login_buffer.start()
+    await deadline_scheduler.start()
+    yield
+    await deadline_scheduler.stop()
+    await last_login_buffer.stop()
+    await read_receipt_batcher.stop()
+    await manager.stop()
+    password_hasher.shutdown()
+
 app = FastAPI(
     title="Documentatition",
     version="0.1",
     openapi_url="/openapi.json",
     docs_url="/",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 origins = [
     "http://192.168.1.107:5173",
     "http://localhost:5173",
     "http://127.0.0.1:5173",
 ]
+app.add_middleware(MetricsMiddleware)
+if QUERY_INSPECTOR_ENABLED:
+    app.add_middleware(QueryInspectorMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -40,6 +79,9 @@ app.add_middleware(
 
 )
 
+# Подсчёт запросов к БД и их длительности для /metrics
+instrument_engine(async_engine.sync_engine)
+
 active_connections = []
 
 def create_admin():
@@ -72,38 +114,75 @@ def create_admin():
         db.commit()
         print("Администратор успешно создан.")
 
-@app.websocket("/items/{item_id}/ws")
-async def websocket_endpoint(websocket: WebSocket, item_id: int):
+@app.websocket("/ws")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    last_seq: Optional[int] = Query(None, ge=0),
+):
     """
-    Эндпоинт WebSocket для взаимодействия с клиентами в рамках конкретного item_id.
+    Эндпоинт WebSocket для доставки уведомлений текущему пользователю.
+
+    Токен проверяется при рукопожатии: передаётся в параметре token или в заголовке
+    Authorization: Bearer. Соединение привязывается к ID пользователя из токена,
+    поэтому клиент получает только свои уведомления.
+
+    События передаются JSON-кадрами вида {"v": 1, "type": "message.new", "seq": N, ...}
+    (схемы в app.schemas). Клиент может запросить подпротокол "msgpack" и получать те же
+    события бинарными кадрами MessagePack.
+
+    Каждое событие содержит номер seq; номера событий пользователя идут подряд и отправляются
+    по порядку. При переподключении клиент передаёт last_seq и получает только пропущенные события
+    (или событие {"type": "resync"}, если их восстановить нельзя). Клиент подтверждает получение
+    сообщением {"type": "ack", "seq": N}.
 
     Аргументы:
         websocket (WebSocket): Соединение WebSocket.
-        item_id (int): Идентификатор элемента.
+        token (Optional[str]): JWT токен доступа.
+        last_seq (Optional[int]): Номер последнего полученного события при переподключении.
     """
-    # Подключение клиента к WebSocket
-    await manager.connect(websocket, item_id)
-    print(f"Client connected to item {item_id}")
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and credentials:
+            token = credentials
+
+    # Короткая сессия только на время проверки токена, чтобы не удерживать соединение с БД
+    try:
+        if not token:
+            raise InvalidCredentialsException
+        async with AsyncSessionLocal() as db:
+            user = await auth.get_user_from_token(token, db)
+    except InvalidCredentialsException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Отправка начинается после replay: он определяет, с какого номера продолжать доставку
+    connection = await manager.connect(websocket, user.id, paused=True)
+    print(f"Client connected: user {user.id}")
 
     try:
+        await manager.replay(connection, last_seq)
+
         while True:
-            # Получаем сообщение от клиента
             data = await websocket.receive_text()
-            print(f"Received from item {item_id}: {data}")
-
-            # Рассылаем сообщение всем подключённым клиентам внутри группы item_id
-            await manager.broadcast(f"Item {item_id}: {data}", item_id)
+            try:
+                message = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "ack" and isinstance(message.get("seq"), int):
+                connection.ack(message["seq"])
     except WebSocketDisconnect:
-        manager.disconnect(websocket, item_id)
-        print(f"Client disconnected from item {item_id}")
+        print(f"Client disconnected: user {user.id}")
     except Exception as e:
         print(f"Error: {e}")
         await websocket.close()
+    finally:
+        manager.disconnect(websocket, user.id)
 
 
 @app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user_auth = auth.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user_auth = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user_auth:
         raise InvalidCredentialsException
 
@@ -113,14 +192,17 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 
 
-@app.post("/endpoint")
-async def receive_data(request: Request, db: Session = Depends(get_db)):
+@app.post("/endpoint", response_model=List[schemas.LoginResponse])
+async def receive_data(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Эндпоинт для аутентификации пользователя и возврата непрочитанных сообщений.
 
+    Если в теле запроса передано "unread": "summary", вместо списка непрочитанных сообщений
+    возвращается unread_summary: количество непрочитанных сообщений по каждому отправителю.
+
     Аргументы:
         request (Request): Объект запроса от клиента.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
 
     Возвращает:
         dict: Информация о пользователе, токене и непрочитанных сообщениях.
@@ -137,7 +219,7 @@ async def receive_data(request: Request, db: Session = Depends(get_db)):
         raise BadRequestException
 
     # Аутентификация пользователя
-    user_auth = auth.authenticate_user(db, data["login"], data["password"])
+    user_auth = await auth.authenticate_user(db, data["login"], data["password"])
     if not user_auth:
         raise InvalidCredentialsException
 
@@ -147,52 +229,132 @@ async def receive_data(request: Request, db: Session = Depends(get_db)):
         data={"sub": data["login"]}, expires_delta=access_token_expires
     )
 
-    # Получение непрочитанных сообщений с именами отправителей
-    unread_messages = crud.get_unread_messages_with_sender_name(db, user_auth.id)
+    # Клиент может запросить только количество непрочитанных сообщений вместо их содержимого
+    if data.get("unread") == "summary":
+        unread = {"unread_summary": await crud.get_unread_summary(db, user_auth.id)}
+    else:
+        # Получение непрочитанных сообщений с именами отправителей
+        unread = {"unread_messages": await crud.get_unread_messages_with_sender_name(db, user_auth.id)}
 
     # Логирование
     logger.info(f"Access token expires in: {access_token_expires}")
     logger.info(f"Login: {data['login']}")
 
     # Возвращаем данные
-    return [
+    return ORJSONResponse([
         {
         "id": user_auth.id,
         "name": user_auth.name,
         "token": access_token,
         "role": user_auth.role,
         "ttl": access_token_expires.total_seconds(),
-        "unread_messages": unread_messages,
+        **unread,
     }
-]
+])
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Эндпоинт метрик в текстовом формате Prometheus.
+
+    Возвращает:
+        PlainTextResponse: Длительность и количество HTTP-запросов по маршрутам, запросы к БД,
+        метрики WebSocket-соединений.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/db")
+async def db_health(db: AsyncSession = Depends(get_db)):
+    """
+    Эндпоинт для проверки доступности базы данных и получения метрик пула соединений.
+
+    Возвращает:
+        dict: Время ответа базы, количество свободных и выданных соединений, ожидание соединений из пула.
+
+    Исключения:
+        ServiceUnavailableException: База данных недоступна или свободное соединение не получено за DB_POOL_TIMEOUT.
+    """
+    started = time.perf_counter()
+    try:
+        await db.execute(text("SELECT 1"))
+    except (SQLAlchemyError, OSError) as e:
+        print(f"База данных недоступна: {e}")
+        raise ServiceUnavailableException
+    return {"ping_seconds": time.perf_counter() - started, **pool_stats()}
+
+
+@app.get("/health/password_hasher")
+async def password_hasher_health():
+    """
+    Эндпоинт для получения метрик пула хэширования паролей.
+
+    Возвращает:
+        dict: Глубина очереди, количество выполняемых и отклонённых задач, задержки хэширования.
+    """
+    return password_hasher.stats()
+
+
+@app.get("/health/user_cache")
+async def user_cache_health():
+    """
+    Эндпоинт для получения метрик кэша пользователей.
+
+    Возвращает:
+        dict: Размер кэша, количество попаданий, промахов и сбросов.
+    """
+    return user_cache.stats()
+
+
+@app.get("/health/task_scheduler")
+async def task_scheduler_health():
+    """
+    Эндпоинт для получения состояния планировщика напоминаний о дедлайнах.
+
+    Возвращает:
+        dict: Признак ведущего воркера, количество запланированных задач и отправленных напоминаний.
+    """
+    return deadline_scheduler.stats()
+
+
+@app.get("/health/websocket")
+async def websocket_health():
+    """
+    Эндпоинт для получения метрик WebSocket-соединений.
+
+    Возвращает:
+        dict: Количество соединений, глубина очередей отправки и число отброшенных сообщений.
+    """
+    return manager.stats()
 
 
 @app.post("/admin/register_user", response_model=schemas.User, status_code=201)
-def admin_register_user(
+async def admin_register_user(
     user_data: UserCreate,
     current_user: schemas.User = Depends(get_current_user),  # Текущий пользователь
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     # Проверяем, является ли текущий пользователь администратором
     is_admin(current_user)
 
     # Регистрируем нового пользователя
-    new_user = create_user(db, user_data)
+    new_user = await create_user(db, user_data)
 
     return new_user
 
 @app.delete("/users/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int = Path(..., title="ID пользователя для удаления"),
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     # Проверяем текущего пользователя
-    current_user = auth.get_current_user(token, db)
+    current_user = await auth.get_current_user(token, db)
     auth.is_admin(current_user)  # Проверяем, что это администратор
 
     # Удаляем пользователя
-    result = crud.delete_user(db, user_id)
+    result = await crud.delete_user(db, user_id)
     if not result:
         raise MethodNotAllowedException
 
@@ -202,15 +364,18 @@ def delete_user(
 @app.post("/message_row", response_model=dict)
 async def send_message(
     message_data: schemas.MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """
     Эндпоинт для отправки сообщения.
 
+    Уведомление через WebSocket публикуется после фиксации транзакции, не ожидая сети:
+    события только ставятся в очереди соединений (или бэкенда pub/sub) в цикле событий.
+
     Аргументы:
         message_data (MessageCreate): Данные сообщения.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         current_user (User): Текущий пользователь.
 
     Возвращает:
@@ -221,130 +386,342 @@ async def send_message(
         raise ForbiddenException
 
     # Сохраняем сообщение
-    db_message = await save_message(
-        db=db,
-        message_sender=message_data.message_sender,
-        message_receiver=message_data.message_receiver,
-        message=message_data.message,
-        message_status=message_data.message_status,
-    )
+    try:
+        message_id, events = await save_message(
+            db=db,
+            message_sender=message_data.message_sender,
+            message_receiver=message_data.message_receiver,
+            message=message_data.message,
+            message_status=message_data.message_status,
+        )
+    except (IntegrityError, DataError):
+        # Получатель не существует (нарушение внешнего ключа), как и в /messages/bulk
+        await db.rollback()
+        raise UserNotFoundException
+    manager.broadcast_many(events)
 
-    # Получаем имя отправителя
-    sender = db.query(models.User).filter(models.User.id == message_data.message_sender).first()
+    # Отправитель - текущий пользователь, повторно загружать его не нужно
+    return {
+        "message_id": message_id,
+        "name": current_user.name,
+    }
 
-    if sender:
-        return {
-            "message_id": db_message.id,
-            "name": sender.name,
-        }
-    else:
+
+@app.post("/messages/bulk", response_model=dict, status_code=201)
+async def send_messages_bulk(
+    bulk_data: schemas.MessageBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для пакетной отправки сообщений (например, объявлений на весь офис).
+
+    Все сообщения сохраняются одним запросом в одной транзакции, уведомления получателям
+    публикуются одним проходом после фиксации транзакции.
+
+    Аргументы:
+        bulk_data (MessageBulkCreate): Отправитель и сообщения для получателей.
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        dict: Имя отправителя и идентификаторы сообщений в порядке передачи.
+
+    Исключения:
+        ForbiddenException: Если сообщения отправляются не от имени текущего пользователя.
+        UserNotFoundException: Если один из получателей не существует.
+    """
+    if current_user.id != bulk_data.message_sender:
+        raise ForbiddenException
+
+    try:
+        message_ids, events = await crud.save_messages(
+            db,
+            message_sender=bulk_data.message_sender,
+            messages=[(item.message_receiver, item.message) for item in bulk_data.items()],
+            message_status=bulk_data.message_status,
+        )
+    except (IntegrityError, DataError):
+        # Получатель не существует (нарушение внешнего ключа) или его ID вне диапазона столбца
+        await db.rollback()
         raise UserNotFoundException
+    manager.broadcast_many(events)
+
+    return {
+        "message_ids": message_ids,
+        "name": current_user.name,
+    }
 
 
 @app.post("/message_status")
 async def update_all_messages_to_read(
-        request: Request,
+        message_data: schemas.MessageStatus,
         token: str = Depends(oauth2_scheme),  # Извлечение токена из заголовка
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
-    Обновляет статус всех непрочитанных входящих сообщений текущего пользователя на "read".
+    Обновляет статус всех непрочитанных входящих сообщений текущего пользователя от отправителя.
 
     Аргументы:
-        request (Request): Объект запроса с JSON-данными.
+        message_data (MessageStatus): Отправитель и новый статус сообщений.
         token (str): JWT токен текущего пользователя.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
 
     Возвращает:
-        JSONResponse: Сообщение об успехе и количество обновлённых сообщений.
+        ORJSONResponse: Сообщение об успехе.
     """
     # Аутентификация текущего пользователя
-    current_user = auth.get_current_user(token, db)
+    current_user = await auth.get_current_user(token, db)
 
-    try:
-        data = await request.json()
-        message_status = data.get("message_status")
-        message_receiver = data.get("message_receiver")
-        message_sender = data.get("message_sender")
+    # Обновляем статус всех сообщений, где текущий пользователь является получателем,
+    # вместе со счётчиком непрочитанных в одной транзакции
+    await crud.update_messages_status(
+        db, current_user.id, message_data.message_sender, message_data.message_status.value,
+    )
 
-        # Проверка входных данных
-        if not (message_receiver and message_sender and message_status):
-            raise BadRequestException
+    return ORJSONResponse(content={"detail": "Message status updated successfully."})
 
-        # Обновляем статус всех сообщений, где текущий пользователь является получателем
-        updated_rows = db.query(models.Message).filter(
-            models.Message.message_receiver == current_user.id,
-            models.Message.message_sender == message_sender,
-            models.Message.message_status == "unread"
-        ).update({"message_status": message_status})
 
-        db.commit()  # Сохраняем изменения в базе данных
+@app.post("/messages/read")
+async def mark_messages_read(
+    read_data: schemas.MessagesRead,
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для отметки входящих сообщений прочитанными.
 
-        return JSONResponse(content={"detail": "Message status updated successfully."})
-    except Exception:
-        raise InternalServerErrorException
+    Для каждой переписки передаются конкретные message_ids или up_to - ID последнего
+    прочитанного сообщения. Отметки от всех клиентов за короткое окно записываются одним
+    запросом, отправители получают событие message.read через WebSocket.
 
+    Аргументы:
+        read_data (MessagesRead): Отметки о прочтении по перепискам.
+        current_user (User): Текущий пользователь (получатель сообщений).
 
+    Возвращает:
+        dict: ID сообщений, отмеченных прочитанными этим запросом.
+    """
+    ranges = [r for receipt in read_data.receipts for r in receipt_ranges(current_user.id, receipt)]
+
+    message_ids = await read_receipt_batcher.submit(ranges)
+    return {"message_ids": message_ids}
+
+
+@app.get("/health/read_receipts")
+async def read_receipts_health():
+    """
+    Эндпоинт для получения метрик объединения отметок о прочтении.
 
-@app.post("/messages")
+    Возвращает:
+        dict: Количество принятых отметок и выполненных пакетных записей.
+    """
+    return read_receipt_batcher.stats()
+
+
+
+@app.get("/unread/summary", response_model=List[schemas.UnreadSummaryItem])
+async def get_unread_summary(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для получения количества непрочитанных сообщений по каждому отправителю.
+
+    Аргументы:
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        list: Отправители с именем, количеством непрочитанных сообщений и ID последнего сообщения.
+    """
+    return ORJSONResponse(await crud.get_unread_summary(db, current_user.id))
+
+
+@app.post("/messages", response_model=List[schemas.UserMessages])
 async def get_all_users_and_targeted_messages(
+    last: Optional[int] = Query(None, ge=1, description="Вернуть только последние N сообщений с каждым собеседником"),
     token: str = Depends(oauth2_scheme),  # Получение токена из заголовка Authorization
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Эндпоинт для получения информации обо всех пользователях (кроме текущего) и их сообщений,
     которые отправлены текущему пользователю или отправлены текущим пользователем.
 
     Аргументы:
+        last (Optional[int]): Если указан, для каждого собеседника возвращаются только последние N сообщений.
         token (str): JWT токен для аутентификации пользователя.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
 
     Возвращает:
         list: Список пользователей с их сообщениями.
     """
     # Аутентификация текущего пользователя
-    current_user = auth.get_current_user(token, db)
-
-    # Получаем всех пользователей, кроме текущего
-    other_users = db.query(models.User).filter(models.User.id != current_user.id).all()
-
-    # Формируем данные для ответа
-    users_with_messages = []
-    for user in other_users:
-        # Получаем только сообщения между текущим пользователем и этим пользователем
-        user_messages = db.query(models.Message).filter(
-            ((models.Message.message_sender == current_user.id) & (models.Message.message_receiver == user.id)) |
-            ((models.Message.message_sender == user.id) & (models.Message.message_receiver == current_user.id))
-        ).all()
-
-        # Форматируем сообщения
-        formatted_messages = [
-            {
-                "message_id": msg.id,
-                "message_sender": msg.message_sender,
-                "message_receiver": msg.message_receiver,
-                "message_time": msg.message_time.strftime('%d-%m-%Y %H:%M:%S'),
-                "message": msg.message,
-                "message_status": msg.message_status,
-            }
-            for msg in user_messages
-        ]
-
-        users_with_messages.append({
-            "id": user.id,
-            "name": user.name,
-            "office": user.office,
-            "last_login": user.last_login.strftime('%d-%m-%Y %H:%M:%S') if user.last_login else None,
-            "last_messages": formatted_messages
-        })
-
-    return users_with_messages
+    current_user = await auth.get_current_user(token, db)
+
+    # Пользователи и вся переписка с ними загружаются двумя запросами вместо запроса на каждого пользователя
+    users_with_messages = await crud.get_users_with_messages(db, current_user.id, last=last)
+
+    # Список сериализуется orjson напрямую: схема ответа нужна только для OpenAPI,
+    # повторная валидация и jsonable_encoder для многомегабайтных ответов не выполняются
+    return ORJSONResponse(users_with_messages)
+
+
+@app.get("/conversations/{user_id}/messages", response_model=schemas.ConversationPage)
+async def get_conversation_messages(
+    user_id: int = Path(..., gt=0, lt=schemas.MAX_ROW_ID, title="ID собеседника"),
+    before: Optional[int] = Query(None, ge=1, lt=schemas.MAX_ROW_ID, description="Курсор: вернуть сообщения с id меньше указанного"),
+    limit: int = Query(50, ge=1, le=200, description="Количество сообщений на странице"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для постраничного получения переписки с пользователем (от новых сообщений к старым).
+
+    Аргументы:
+        user_id (int): ID собеседника.
+        before (Optional[int]): Курсор из поля next_before предыдущей страницы.
+        limit (int): Количество сообщений на странице.
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        dict: Сообщения страницы в хронологическом порядке и курсор next_before (None, если страниц больше нет).
+    """
+    return ORJSONResponse(await crud.get_conversation_messages(db, current_user.id, user_id, before=before, limit=limit))
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос (поддерживаются кавычки, OR и минус)"),
+    scope: str = Query("messages", pattern="^(messages|tasks)$", description="Где искать: messages или tasks"),
+    cursor: Optional[str] = Query(None, description="Курсор next_cursor из предыдущего ответа"),
+    limit: int = Query(20, ge=1, le=100, description="Максимальное количество результатов"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт полнотекстового поиска по сообщениям и задачам текущего пользователя.
+
+    Результаты упорядочены по релевантности; следующая страница запрашивается по курсору.
+
+    Аргументы:
+        q (str): Поисковый запрос.
+        scope (str): "messages" - переписки пользователя, "tasks" - задачи, где он исполнитель или постановщик.
+        cursor (Optional[str]): Курсор вида "<ранг>:<id>" из предыдущего ответа.
+        limit (int): Максимальное количество результатов на странице.
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        dict: Результаты с рангом и курсор следующей страницы (next_cursor).
+    """
+    parsed_cursor = None
+    if cursor:
+        try:
+            rank, _, last_id = cursor.partition(":")
+            parsed_cursor = (float(rank), int(last_id))
+        except ValueError:
+            raise BadRequestException
+
+    if scope == "tasks":
+        return await crud.search_tasks(db, current_user.id, q, parsed_cursor, limit=limit)
+    return await crud.search_messages(db, current_user.id, q, parsed_cursor, limit=limit)
+
+
+@app.get("/sync", response_model=schemas.MessageChanges)
+async def sync_messages(
+    cursor: Optional[str] = Query(None, description="Курсор из предыдущего ответа; без курсора возвращается вся история"),
+    limit: int = Query(500, ge=1, le=1000, description="Максимальное количество сообщений в ответе"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для получения только новых и изменённых (например, прочитанных) сообщений с момента курсора.
+
+    Аргументы:
+        cursor (Optional[str]): Курсор вида "<change_xid>:<id>" из предыдущего ответа.
+        limit (int): Максимальное количество сообщений в ответе.
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        dict: Изменённые сообщения, следующий курсор и признак has_more (нужно повторить запрос сразу).
+    """
+    cursor_xid, cursor_id = 0, 0
+    if cursor:
+        try:
+            cursor_xid, cursor_id = (int(part) for part in cursor.split(":"))
+        except ValueError:
+            raise BadRequestException
+
+    return ORJSONResponse(await crud.get_message_changes(db, current_user.id, cursor_xid, cursor_id, limit=limit))
+
+
+@app.get("/tasks")
+async def list_tasks(
+    executor: Optional[int] = Query(None, gt=0, lt=schemas.MAX_ROW_ID, description="ID исполнителя"),
+    director: Optional[int] = Query(None, gt=0, lt=schemas.MAX_ROW_ID, description="ID постановщика"),
+    status: Optional[str] = Query(None, description="Статус задачи"),
+    priority: Optional[str] = Query(None, description="Приоритет задачи"),
+    deadline_from: Optional[datetime.datetime] = Query(None, description="Дедлайн не раньше"),
+    deadline_to: Optional[datetime.datetime] = Query(None, description="Дедлайн не позже"),
+    sort: str = Query("-date", pattern="^-?(date|deadline)$", description="date или deadline; с префиксом '-' - по убыванию"),
+    cursor: Optional[str] = Query(None, description="Курсор next_cursor из предыдущего ответа"),
+    limit: int = Query(50, ge=1, le=200, description="Максимальное количество задач"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Эндпоинт для получения списка задач с фильтрами, сортировкой и постраничной выдачей.
+
+    Пользователь видит задачи, где он исполнитель или постановщик; администратор - все задачи.
+
+    Аргументы:
+        executor (Optional[int]): ID исполнителя.
+        director (Optional[int]): ID постановщика.
+        status (Optional[str]): Статус задачи.
+        priority (Optional[str]): Приоритет задачи.
+        deadline_from (Optional[datetime]): Дедлайн не раньше указанного.
+        deadline_to (Optional[datetime]): Дедлайн не позже указанного.
+        sort (str): Поле сортировки.
+        cursor (Optional[str]): Курсор вида "<значение>:<id>" из предыдущего ответа.
+        limit (int): Максимальное количество задач на странице.
+        db (AsyncSession): Сессия базы данных.
+        current_user (User): Текущий пользователь.
+
+    Возвращает:
+        dict: Задачи страницы и курсор следующей страницы (next_cursor).
+    """
+    parsed_cursor = None
+    if cursor:
+        try:
+            value, _, last_id = cursor.rpartition(":")
+            parsed_cursor = (datetime.datetime.fromisoformat(value) if value else None, int(last_id))
+        except ValueError:
+            raise BadRequestException
+        # ID вне диапазона INTEGER вызвал бы ошибку базы данных
+        if not 0 < parsed_cursor[1] < schemas.MAX_ROW_ID:
+            raise BadRequestException
+
+    return await crud.get_tasks(
+        db,
+        user_id=None if current_user.role == "admin" else current_user.id,
+        executor=executor,
+        director=director,
+        status=status,
+        priority=priority,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+        sort=sort,
+        cursor=parsed_cursor,
+        limit=limit,
+    )
 
 
 @app.post("/tasks", response_model=schemas.TaskResponse)
-def create_task(
+async def create_task(
     task_data: schemas.TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)  # Используем модель User
 ):
     """
@@ -352,7 +729,7 @@ def create_task(
 
     Аргументы:
         task_data (TaskCreate): Данные новой задачи.
-        db (Session): Сессия базы данных.
+        db (AsyncSession): Сессия базы данных.
         current_user (models.User): Объект текущего пользователя.
 
     Возвращает:
@@ -374,8 +751,11 @@ def create_task(
     )
 
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await db.commit()
+    await db.refresh(new_task)
+
+    # Ведущий воркер планировщика добавит напоминания о дедлайне новой задачи
+    deadline_scheduler.task_changed(new_task.id, new_task.task_deadline)
 
     return new_task
 
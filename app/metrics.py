@@ -0,0 +1,375 @@
+import contextvars
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Границы корзин гистограмм длительности (в секундах)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин гистограммы количества запросов к БД на HTTP-запрос
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_value(value: float) -> str:
+    """
+    Форматирует значение метрики для текстового формата Prometheus.
+
+    Аргументы:
+        value (float): Значение.
+
+    Возвращает:
+        str: Значение в текстовом формате (включая +Inf).
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """
+    Форматирует набор меток метрики.
+
+    Аргументы:
+        names (Sequence[str]): Имена меток.
+        values (Sequence[str]): Значения меток.
+
+    Возвращает:
+        str: Строка вида {name="value",...} или пустая строка.
+    """
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric:
+    """
+    Базовый класс метрики с метками.
+
+    Атрибуты:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики (строка HELP).
+        labelnames (Tuple[str, ...]): Имена меток.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """
+        Возвращает текущие значения метрики.
+
+        Возвращает:
+            Iterable: Четвёрки (суффикс имени, имена меток, значения меток, значение).
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """
+        Возвращает метрику в текстовом формате Prometheus.
+
+        Возвращает:
+            List[str]: Строки HELP, TYPE и значения.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    Монотонно возрастающий счётчик.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        Увеличивает счётчик.
+
+        Аргументы:
+            labels (str): Значения меток в порядке labelnames.
+            amount (float): Величина увеличения.
+        """
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield "", self.labelnames, labels, value
+
+
+class Gauge(Metric):
+    """
+    Значение, которое может расти и уменьшаться. Если задана функция, значение
+    вычисляется при каждом сборе метрик.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        """
+        Устанавливает значение.
+
+        Аргументы:
+            value (float): Новое значение.
+            labels (str): Значения меток в порядке labelnames.
+        """
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        Увеличивает значение.
+
+        Аргументы:
+            labels (str): Значения меток в порядке labelnames.
+            amount (float): Величина увеличения.
+        """
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        """
+        Уменьшает значение.
+
+        Аргументы:
+            labels (str): Значения меток в порядке labelnames.
+            amount (float): Величина уменьшения.
+        """
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self.function is not None:
+            yield "", (), (), self.function()
+            return
+        for labels, value in self._values.items():
+            yield "", self.labelnames, labels, value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Для набора меток: количество наблюдений по корзинам, сумма и общее количество
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        """
+        Добавляет наблюдение.
+
+        Аргументы:
+            value (float): Наблюдаемое значение.
+            labels (str): Значения меток в порядке labelnames.
+        """
+        counts, total = self._values.setdefault(labels, ([0] * len(self.buckets), [0.0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        total[0] += value
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", names, labels + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, labels, total[0]
+            yield "_count", self.labelnames, labels, cumulative
+
+
+class Registry:
+    """
+    Набор метрик процесса для публикации на /metrics.
+
+    Метрики хранятся в памяти воркера: при нескольких воркерах каждый публикует свои значения.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Регистрирует метрику.
+
+        Аргументы:
+            metric (Metric): Метрика.
+
+        Возвращает:
+            Metric: Та же метрика (для присваивания при объявлении).
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+
+        Возвращает:
+            str: Текст для ответа /metrics.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Реестр метрик приложения
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Количество HTTP-запросов", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Длительность HTTP-запросов", ("method", "route"),
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "Количество выполняемых HTTP-запросов", ("method",),
+))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Количество запросов к БД на HTTP-запрос", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Время выполнения запросов к БД на HTTP-запрос", ("method", "route"),
+))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "Количество запросов к БД",
+))
+db_query_seconds_total = registry.register(Counter(
+    "db_query_seconds_total", "Суммарное время выполнения запросов к БД",
+))
+
+
+class RequestStats:
+    """
+    Статистика запросов к БД в рамках одного HTTP-запроса.
+
+    Атрибуты:
+        queries (int): Количество запросов.
+        db_seconds (float): Суммарное время запросов.
+    """
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Статистика текущего HTTP-запроса (None вне запроса, например в фоновых задачах воркера)
+current_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None,
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    db_queries_total.inc()
+    db_query_seconds_total.inc(amount=elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine):
+    """
+    Подключает подсчёт запросов и времени БД к движку SQLAlchemy.
+
+    Аргументы:
+        engine: Синхронный движок (для асинхронного - async_engine.sync_engine).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, собирающее метрики HTTP-запросов.
+
+    Маршрут берётся из шаблона пути FastAPI (например, /users/{user_id}), чтобы количество
+    рядов метрик не зависело от параметров. Длительность измеряется до отправки последней
+    части ответа, без фоновых задач запроса.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        result = {"status": 500, "elapsed": None, "queries": 0, "db_seconds": 0.0}
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                result["elapsed"] = time.perf_counter() - started
+                result["queries"] = stats.queries
+                result["db_seconds"] = stats.db_seconds
+
+        http_requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_requests_in_progress.dec(method)
+            current_request_stats.reset(token)
+            if result["elapsed"] is None:
+                result["elapsed"] = time.perf_counter() - started
+                result["queries"] = stats.queries
+                result["db_seconds"] = stats.db_seconds
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            http_requests_total.inc(method, path, str(result["status"]))
+            http_request_duration_seconds.observe(result["elapsed"], method, path)
+            http_request_db_queries.observe(result["queries"], method, path)
+            http_request_db_seconds.observe(result["db_seconds"], method, path)
@@ -1,7 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Computed, Integer, BigInteger, String, DateTime, ForeignKey, Index, Sequence, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
+# ID текущей транзакции PostgreSQL; используется как курсор изменений сообщений
+CURRENT_XID = text("(pg_current_xact_id()::text::bigint)")
+
+# Конфигурация полнотекстового поиска (для латиницы используется английский стеммер)
+SEARCH_CONFIG = "russian"
+
+# Последовательность идентификаторов событий WebSocket
+WS_EVENT_SEQ = Sequence("ws_events_id_seq")
+
 class User(Base):
     """
     Модель пользователя.
@@ -38,6 +49,8 @@ class Message(Base):
         message_sender (int): ID пользователя-отправителя.
         message_receiver (int): ID пользователя-получателя.
         message_status (str): Статус сообщения (например, "unread", "read").
+        change_xid (int): ID транзакции, в которой сообщение было создано или изменено последний раз.
+        search_vector (str): Вычисляемый tsvector текста сообщения для полнотекстового поиска.
     """
     __tablename__ = "messages"
 
@@ -47,6 +60,86 @@ class Message(Base):
     message_sender = Column(Integer, ForeignKey("users.id"), nullable=False)
     message_receiver = Column(Integer, ForeignKey("users.id"), nullable=False)
     message_status = Column(String, default="unread", nullable=False)
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID)
+    # Не загружается вместе с сообщением: используется только в условиях поиска
+    search_vector = deferred(Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_CONFIG}', message)", persisted=True)))
+
+    __table_args__ = (
+        # Переписка в обе стороны: фильтр по паре (отправитель, получатель) с сортировкой по id
+        Index("ix_messages_sender_receiver_id", "message_sender", "message_receiver", "id"),
+        Index("ix_messages_receiver_sender_id", "message_receiver", "message_sender", "id"),
+        # Частичный индекс только по непрочитанным сообщениям
+        Index(
+            "ix_messages_receiver_sender_unread",
+            "message_receiver",
+            "message_sender",
+            postgresql_where=text("message_status = 'unread'"),
+        ),
+        # Синхронизация изменений: выборка по участнику с сортировкой по транзакции изменения
+        Index("ix_messages_receiver_change_xid", "message_receiver", "change_xid", "id"),
+        Index("ix_messages_sender_change_xid", "message_sender", "change_xid", "id"),
+        # Полнотекстовый поиск
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class UnreadCounter(Base):
+    """
+    Модель счётчика непрочитанных сообщений (денормализованные данные, обновляются при записи сообщений).
+
+    Атрибуты:
+        receiver_id (int): ID получателя сообщений.
+        sender_id (int): ID отправителя сообщений.
+        count (int): Количество непрочитанных сообщений от отправителя.
+        last_message_id (int): ID последнего сообщения от отправителя.
+    """
+    __tablename__ = "unread_counters"
+
+    receiver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, server_default="0")
+    last_message_id = Column(Integer, nullable=False)
+
+class WsEventCounter(Base):
+    """
+    Модель счётчика событий WebSocket пользователя.
+
+    Номера событий выделяются из счётчика получателя в транзакции, создающей события. Строка
+    счётчика заблокирована до конца транзакции, поэтому номера событий одного пользователя идут
+    без пропусков и в порядке фиксации транзакций.
+
+    Атрибуты:
+        user_id (int): ID пользователя-получателя.
+        last_seq (int): Номер последнего события пользователя.
+    """
+    __tablename__ = "ws_event_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False)
+
+class WsEvent(Base):
+    """
+    Модель события, отправленного пользователю через WebSocket. Хранится ограниченное время
+    для повторной доставки после переподключения.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор события.
+        user_id (int): ID пользователя-получателя.
+        seq (int): Порядковый номер события пользователя (см. WsEventCounter).
+        payload (str): Сериализованное событие в том виде, в котором оно отправляется клиенту.
+        created_at (datetime): Время создания события.
+    """
+    __tablename__ = "ws_events"
+
+    id = Column(BigInteger, WS_EVENT_SEQ, primary_key=True, server_default=WS_EVENT_SEQ.next_value())
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    payload = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_ws_events_user_id_seq", "user_id", "seq", unique=True),
+        Index("ix_ws_events_created_at", "created_at"),
+    )
 
 class Task(Base):
     """
@@ -64,6 +157,7 @@ class Task(Base):
         task_status (str): Статус задачи.
         task_priority (str): Приоритет задачи.
         task_executor_role (int): Роль исполнителя задачи.
+        search_vector (str): Вычисляемый tsvector названия (с большим весом) и содержимого задачи.
     """
     __tablename__ = "tasks"
 
@@ -78,5 +172,21 @@ class Task(Base):
     task_status = Column(String(50), nullable=False)
     task_priority = Column(String(50))
     task_executor_role = Column(Integer, nullable=False)
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', task_name), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', task_content), 'B')",
+        persisted=True,
+    )))
+
+    __table_args__ = (
+        # Списки задач исполнителя с фильтром по статусу и сортировкой по дедлайну
+        Index("ix_tasks_executor_status_deadline", "task_executor", "task_status", "task_deadline"),
+        # Задачи, поставленные пользователем, по дате создания
+        Index("ix_tasks_director_date", "task_director", "task_date"),
+        # Список всех задач (для администратора) по дате создания или дедлайну
+        Index("ix_tasks_date_id", "task_date", "id"),
+        Index("ix_tasks_deadline_id", "task_deadline", "id"),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
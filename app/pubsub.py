@@ -0,0 +1,238 @@
+import abc
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.database import SQLALCHEMY_DATABASE_URL
+
+# Настройки публикации событий между воркерами
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")  # "memory" (один процесс) или "postgres" (LISTEN/NOTIFY).
+PUBSUB_DATABASE_URL = os.getenv("PUBSUB_DATABASE_URL", SQLALCHEMY_DATABASE_URL)  # Прямое подключение к PostgreSQL для LISTEN.
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", 10000))  # Максимум событий, ожидающих публикации.
+PUBSUB_RECONNECT_SECONDS = float(os.getenv("PUBSUB_RECONNECT_SECONDS", 1))  # Пауза перед переподключением слушателя.
+PUBSUB_DRAIN_SECONDS = float(os.getenv("PUBSUB_DRAIN_SECONDS", 5))  # Сколько ждать публикации очереди при остановке.
+
+# Максимальный размер полезной нагрузки NOTIFY в PostgreSQL (8000 байт за вычетом запаса)
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+Handler = Callable[[str], None]
+
+
+class PubSubBackend(abc.ABC):
+    """
+    Базовый класс бэкенда публикации/подписки.
+
+    Каждый воркер подписывается на каналы один раз при старте и получает все события,
+    опубликованные любым воркером, включая собственные. Обработчики вызываются в цикле
+    событий и не должны блокировать его.
+    """
+
+    # Максимальный размер полезной нагрузки события (None - без ограничения)
+    max_payload: Optional[int] = None
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """
+        Регистрирует обработчик событий канала.
+
+        Аргументы:
+            channel (str): Имя канала.
+            handler (Callable[[str], None]): Функция, получающая полезную нагрузку события.
+        """
+        self.handlers.setdefault(channel, []).append(handler)
+
+    @abc.abstractmethod
+    def publish(self, channel: str, payload: str) -> None:
+        """
+        Публикует событие в канал, не ожидая сети.
+
+        Аргументы:
+            channel (str): Имя канала.
+            payload (str): Полезная нагрузка события.
+        """
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        """
+        Передаёт событие всем обработчикам канала.
+
+        Аргументы:
+            channel (str): Имя канала.
+            payload (str): Полезная нагрузка события.
+        """
+        for handler in self.handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"Ошибка в обработчике канала {channel}: {e}")
+
+    async def start(self) -> None:
+        """
+        Запускает бэкенд (подключение и подписка на каналы).
+        """
+
+    async def stop(self) -> None:
+        """
+        Останавливает бэкенд.
+        """
+
+
+class InProcessBackend(PubSubBackend):
+    """
+    Бэкенд внутри одного процесса: используется при запуске с одним воркером и в тестах.
+    """
+
+    def publish(self, channel: str, payload: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._dispatch(channel, payload)
+            return
+        # Доставка в следующей итерации цикла, как и у сетевого бэкенда
+        loop.call_soon(self._dispatch, channel, payload)
+
+
+class PostgresBackend(PubSubBackend):
+    """
+    Бэкенд на PostgreSQL LISTEN/NOTIFY.
+
+    Для прослушивания используется отдельное соединение asyncpg (LISTEN требует сессионного
+    подключения, поэтому PUBSUB_DATABASE_URL должен указывать напрямую на PostgreSQL, а не на
+    пулер в режиме транзакций). Публикация выполняется фоновой задачей из ограниченной очереди.
+
+    Атрибуты:
+        dsn (str): Строка подключения к PostgreSQL.
+        queue_size (int): Размер очереди событий на публикацию.
+    """
+
+    max_payload = NOTIFY_PAYLOAD_LIMIT
+
+    def __init__(self, dsn: str, queue_size: int = PUBSUB_QUEUE_SIZE):
+        super().__init__()
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.dropped_events = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._listener = None
+        self._publisher = None
+        self._publisher_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def publish(self, channel: str, payload: str) -> None:
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            # NOTIFY не принимает такие сообщения: доставляем только подключённым к этому воркеру
+            print(f"Событие канала {channel} превышает лимит NOTIFY и доставлено только локально")
+            self._dispatch(channel, payload)
+            return
+        if self._queue is None:
+            self._dispatch(channel, payload)
+            return
+        if self._queue.full():
+            self.dropped_events += 1
+            print(f"Очередь публикации переполнена, событие канала {channel} отброшено")
+            return
+        self._queue.put_nowait((channel, payload))
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        await self._listen()
+        self._publisher_task = asyncio.create_task(self._publish_loop())
+
+    async def _listen(self) -> None:
+        """
+        Открывает соединение для прослушивания и подписывается на все каналы.
+        """
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_listener_lost)
+        for channel in self.handlers:
+            await self._listener.add_listener(channel, self._on_notification)
+
+    def _on_notification(self, connection, pid, channel: str, payload: str) -> None:
+        self._dispatch(channel, payload)
+
+    def _on_listener_lost(self, connection) -> None:
+        if not self._stopping:
+            print("Соединение LISTEN потеряно, переподключение")
+            asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """
+        Переподключает слушателя, пока соединение не будет восстановлено.
+        """
+        while not self._stopping:
+            try:
+                await self._listen()
+                return
+            except Exception as e:
+                print(f"Ошибка переподключения LISTEN: {e}")
+                await asyncio.sleep(PUBSUB_RECONNECT_SECONDS)
+
+    async def _publish_loop(self) -> None:
+        """
+        Публикует события из очереди через отдельное соединение.
+        """
+        while True:
+            channel, payload = await self._queue.get()
+            try:
+                while True:
+                    try:
+                        if self._publisher is None or self._publisher.is_closed():
+                            self._publisher = await asyncpg.connect(self.dsn)
+                        await self._publisher.execute("SELECT pg_notify($1, $2)", channel, payload)
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"Ошибка публикации в канал {channel}: {e}")
+                        self._publisher = None
+                        await asyncio.sleep(PUBSUB_RECONNECT_SECONDS)
+            finally:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._publisher_task is not None:
+            # События, уже поставленные в очередь, публикуются до закрытия соединений
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=PUBSUB_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                self.dropped_events += self._queue.qsize()
+                print(f"Не опубликовано при остановке событий: {self._queue.qsize()}")
+            self._publisher_task.cancel()
+        for connection in (self._listener, self._publisher):
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+
+def _to_asyncpg_dsn(url: str) -> str:
+    """
+    Преобразует URL SQLAlchemy в строку подключения asyncpg.
+
+    Аргументы:
+        url (str): URL подключения к базе данных.
+
+    Возвращает:
+        str: URL вида postgresql://...
+    """
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def create_backend(kind: str = PUBSUB_BACKEND) -> PubSubBackend:
+    """
+    Создаёт бэкенд публикации/подписки по имени.
+
+    Аргументы:
+        kind (str): "memory" или "postgres".
+
+    Возвращает:
+        PubSubBackend: Экземпляр бэкенда.
+    """
+    if kind == "memory":
+        return InProcessBackend()
+    if kind == "postgres":
+        return PostgresBackend(_to_asyncpg_dsn(PUBSUB_DATABASE_URL))
+    raise ValueError(f"Неизвестный бэкенд pub/sub: {kind}")
@@ -0,0 +1,222 @@
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event
+
+from app.exceptions import QueryBudgetExceededException
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_budgets(value: str) -> Dict[str, int]:
+    """
+    Разбирает бюджеты запросов к БД по эндпоинтам.
+
+    Аргументы:
+        value (str): Строка вида "GET /tasks=3;POST /messages=4".
+
+    Возвращает:
+        Dict[str, int]: Бюджет по ключу "МЕТОД /шаблон/пути".
+    """
+    budgets = {}
+    for item in value.split(";"):
+        if item.strip():
+            endpoint, limit = item.rsplit("=", 1)
+            budgets[" ".join(endpoint.split())] = int(limit)
+    return budgets
+
+
+# Отладка запросов к БД: только для разработки и staging
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR", "0") == "1"  # Включить поиск медленных запросов и N+1.
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", 200))  # Порог медленного запроса в миллисекундах.
+QUERY_EXPLAIN = os.getenv("QUERY_EXPLAIN", "1") == "1"  # Выводить план (EXPLAIN) медленных запросов.
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", 5))  # Сколько раз один запрос может выполниться за HTTP-запрос без предупреждения.
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 0))  # Бюджет запросов к БД на HTTP-запрос по умолчанию (0 - без ограничения).
+QUERY_BUDGETS = _parse_budgets(os.getenv("QUERY_BUDGETS", ""))  # Бюджеты эндпоинтов: "GET /tasks=3;POST /messages=4".
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"  # Завершать запрос ошибкой 500 при превышении бюджета (для тестов).
+
+# Параметры запросов (asyncpg, psycopg2), списки параметров IN (...) и строки VALUES разной длины
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\$\d+|%\(\w+\)s)(?:::[\w ]+)?\s*,?)+\)")
+_PARAMETER_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s")
+_WHITESPACE = re.compile(r"\s+")
+
+# Запросы, для которых выводится план
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Приводит SQL-запрос к форме, не зависящей от значений и количества параметров.
+
+    Аргументы:
+        statement (str): SQL-запрос в том виде, в котором он передан драйверу.
+
+    Возвращает:
+        str: Запрос с параметрами, заменёнными на "?", и списками IN (...) и VALUES - на "(...)".
+    """
+    shape = _PARAMETER_ROWS.sub("(...)", _PARAMETER_LIST.sub("(...)", statement))
+    shape = _PARAMETER.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueries:
+    """
+    Запросы к БД, выполненные в рамках одного HTTP-запроса.
+
+    Атрибуты:
+        scope (dict): ASGI scope запроса (маршрут появляется в нём после маршрутизации).
+        count (int): Количество запросов.
+        shapes (Counter): Количество выполнений каждой формы запроса.
+        repeated (Set[str]): Формы запросов, о повторении которых уже выведено предупреждение.
+        over_budget (bool): Бюджет запросов превышен.
+    """
+
+    __slots__ = ("scope", "count", "shapes", "repeated", "over_budget")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self.repeated: Set[str] = set()
+        self.over_budget = False
+
+    def endpoint(self) -> str:
+        """
+        Возвращает эндпоинт запроса.
+
+        Возвращает:
+            str: Метод и шаблон пути FastAPI (например, "GET /users/{user_id}").
+        """
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {route.path if route is not None else self.scope['path']}"
+
+
+# Запросы текущего HTTP-запроса (None вне запроса, например в фоновых задачах воркера)
+current_request_queries: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar(
+    "current_request_queries", default=None,
+)
+
+# Превышения бюджета с момента запуска: тесты могут проверять этот список
+budget_violations: List[str] = []
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """
+    Получает план медленного запроса на том же соединении, которое его выполнило.
+
+    Второе соединение из пула не берётся: при исчерпанном пуле запрос ждал бы сам себя.
+    Внутри транзакции EXPLAIN выполняется в точке сохранения, чтобы его ошибка не прервала
+    транзакцию запроса.
+
+    Аргументы:
+        conn: Соединение SQLAlchemy, выполнившее запрос.
+        statement (str): SQL-запрос.
+        parameters: Параметры запроса.
+
+    Возвращает:
+        str: Текст плана.
+    """
+    dbapi_connection = conn.connection.dbapi_connection
+    in_transaction = not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if in_transaction:
+            cursor.execute("SAVEPOINT query_inspector_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_inspector_explain")
+            raise
+        if in_transaction:
+            cursor.execute("RELEASE SAVEPOINT query_inspector_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._inspector_started = time.perf_counter()
+    queries = current_request_queries.get()
+    if queries is None:
+        return
+
+    queries.count += 1
+    budget = QUERY_BUDGETS.get(queries.endpoint(), QUERY_BUDGET)
+    if budget and queries.count > budget and not queries.over_budget:
+        queries.over_budget = True
+        violation = f"{queries.endpoint()}: больше {budget} запросов к БД"
+        budget_violations.append(violation)
+        logger.warning("Превышен бюджет запросов %s", violation)
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceededException(violation)
+
+    shape = statement_shape(statement)
+    queries.shapes[shape] += 1
+    if queries.shapes[shape] > QUERY_REPEAT_LIMIT and shape not in queries.repeated:
+        queries.repeated.add(shape)
+        logger.warning(
+            "Возможный N+1 в %s: запрос выполнен больше %d раз: %s",
+            queries.endpoint(), QUERY_REPEAT_LIMIT, shape,
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._inspector_started) * 1000
+    if elapsed_ms < QUERY_SLOW_MS:
+        return
+    queries = current_request_queries.get()
+    endpoint = queries.endpoint() if queries is not None else "вне HTTP-запроса"
+    message = f"Медленный запрос ({elapsed_ms:.1f} мс, {endpoint}): {statement_shape(statement)}"
+    if QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+        try:
+            message += "\n" + _explain(conn, statement, parameters)
+        except Exception as e:
+            message += f"\nНе удалось получить план: {e}"
+    logger.warning(message)
+
+
+def inspect_engine(engine):
+    """
+    Подключает поиск медленных запросов, N+1 и контроль бюджета запросов к движку SQLAlchemy.
+
+    Аргументы:
+        engine: Синхронный движок (для асинхронного - async_engine.sync_engine).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryInspectorMiddleware:
+    """
+    ASGI-middleware, собирающее запросы к БД каждого HTTP-запроса для поиска N+1
+    и контроля бюджета. Количество запросов возвращается в заголовке X-Query-Count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = current_request_queries.set(queries)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-query-count", str(queries.count).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            current_request_queries.reset(token)
@@ -0,0 +1,208 @@
+import asyncio
+import bisect
+import os
+from typing import Dict, List, Optional, Tuple
+
+from app import crud, schemas
+from app.database import AsyncSessionLocal
+from app.websocket_manager import manager
+
+# Настройки объединения отметок о прочтении
+READ_RECEIPT_BATCH_SECONDS = float(os.getenv("READ_RECEIPT_BATCH_SECONDS", 0.05))  # Окно, в течение которого отметки объединяются в один UPDATE.
+READ_RECEIPT_MAX_BATCH = int(os.getenv("READ_RECEIPT_MAX_BATCH", 5000))  # Количество диапазонов, при котором запись выполняется досрочно.
+
+# Диапазон сообщений: (ID получателя, ID отправителя, первый ID, последний ID)
+ReadRange = Tuple[int, int, int, int]
+
+
+def receipt_ranges(receiver_id: int, receipt: schemas.ReadReceipt) -> List[ReadRange]:
+    """
+    Преобразует отметку о прочтении в диапазоны сообщений.
+
+    ID, идущие подряд, объединяются в один диапазон, а ID не больше up_to уже покрыты
+    диапазоном up_to, поэтому отметка при прокрутке переписки занимает несколько строк VALUES.
+
+    Аргументы:
+        receiver_id (int): ID получателя (текущего пользователя).
+        receipt (ReadReceipt): Отметка о прочтении сообщений одного отправителя.
+
+    Возвращает:
+        List[ReadRange]: Диапазоны прочитанных сообщений.
+    """
+    sender_id = receipt.message_sender
+    ranges: List[ReadRange] = []
+    if receipt.up_to is not None:
+        ranges.append((receiver_id, sender_id, 0, receipt.up_to))
+    for message_id in sorted(set(receipt.message_ids)):
+        if receipt.up_to is not None and message_id <= receipt.up_to:
+            continue
+        if ranges and ranges[-1][3] + 1 == message_id:
+            ranges[-1] = (receiver_id, sender_id, ranges[-1][2], message_id)
+        else:
+            ranges.append((receiver_id, sender_id, message_id, message_id))
+    return ranges
+
+
+class ReadReceiptBatcher:
+    """
+    Объединяет отметки о прочтении, поступившие в течение короткого окна, в одну запись.
+
+    Клиенты, отмечающие сообщения по мере прокрутки, присылают много мелких запросов; все
+    отметки за окно READ_RECEIPT_BATCH_SECONDS записываются одним UPDATE в одной транзакции,
+    после чего каждый запрос получает свои прочитанные сообщения, а отправители - события
+    message.read через WebSocket.
+
+    Атрибуты:
+        window (float): Окно объединения в секундах.
+        max_batch (int): Количество диапазонов, при котором запись выполняется досрочно.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[List[ReadRange], asyncio.Future]] = []
+        self._pending_ranges = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._flushes: set = set()
+        self.batches = 0
+        self.failed_batches = 0
+        self.receipts = 0
+
+    async def submit(self, ranges: List[ReadRange]) -> List[int]:
+        """
+        Добавляет отметки в текущий пакет и ожидает его записи.
+
+        Аргументы:
+            ranges (List[ReadRange]): Диапазоны прочитанных сообщений.
+
+        Возвращает:
+            List[int]: ID сообщений из этих диапазонов, отмеченных прочитанными.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._pending and self._pending_ranges + len(ranges) > self.max_batch:
+            # Отметки не добавляются к полному пакету: он записывается без них
+            self._schedule_flush()
+        self._pending.append((ranges, future))
+        self._pending_ranges += len(ranges)
+        self.receipts += 1
+        if self._pending_ranges >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self):
+        """
+        Забирает текущий пакет и запускает его запись.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_ranges = self._pending, [], 0
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[List[ReadRange], asyncio.Future]]):
+        """
+        Записывает пакет отметок и передаёт результат ожидающим запросам.
+
+        Если запись пакета не удалась, запросы записываются по одному: ошибку получает
+        только запрос, который её вызвал, а не все запросы, попавшие в то же окно.
+
+        Аргументы:
+            batch (List[Tuple[List[ReadRange], asyncio.Future]]): Диапазоны и ожидающие их запросы.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Пакеты записываются по одному, чтобы параллельные UPDATE не блокировали одни и те же строки
+        async with self._lock:
+            error = await self._write(batch)
+            if error is None:
+                return
+            if len(batch) == 1:
+                self._fail(batch, error)
+                return
+            self.failed_batches += 1
+            for submission in batch:
+                error = await self._write([submission])
+                if error is not None:
+                    self._fail([submission], error)
+
+    async def _write(self, batch: List[Tuple[List[ReadRange], asyncio.Future]]) -> Optional[Exception]:
+        """
+        Записывает отметки одной транзакцией, публикует события и передаёт результат запросам.
+
+        Аргументы:
+            batch (List[Tuple[List[ReadRange], asyncio.Future]]): Диапазоны и ожидающие их запросы.
+
+        Возвращает:
+            Optional[Exception]: Ошибка записи или None, если отметки записаны.
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                read, events = await crud.mark_messages_read(db, [r for ranges, _ in batch for r in ranges])
+        except Exception as e:
+            return e
+        self.batches += 1
+        manager.broadcast_many(events)
+
+        # Прочитанные сообщения каждой переписки по возрастанию ID
+        conversations: Dict[Tuple[int, int], List[int]] = {}
+        for message_id, receiver_id, sender_id in read:
+            conversations.setdefault((receiver_id, sender_id), []).append(message_id)
+
+        for ranges, future in batch:
+            if future.done():
+                continue
+            message_ids = set()
+            for receiver_id, sender_id, first_id, last_id in ranges:
+                read_ids = conversations.get((receiver_id, sender_id))
+                if read_ids:
+                    message_ids.update(read_ids[bisect.bisect_left(read_ids, first_id):bisect.bisect_right(read_ids, last_id)])
+            future.set_result(sorted(message_ids))
+        return None
+
+    @staticmethod
+    def _fail(batch: List[Tuple[List[ReadRange], asyncio.Future]], error: Exception):
+        """
+        Передаёт ошибку записи ожидающим запросам.
+
+        Аргументы:
+            batch (List[Tuple[List[ReadRange], asyncio.Future]]): Диапазоны и ожидающие их запросы.
+            error (Exception): Ошибка записи.
+        """
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def stop(self):
+        """
+        Записывает оставшиеся отметки. Вызывается при остановке приложения.
+        """
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """
+        Возвращает метрики объединения отметок.
+
+        Возвращает:
+            dict: Количество принятых отметок, выполненных записей, пакетов, записанных
+                по одному запросу после ошибки, и ожидающих отметок.
+        """
+        return {
+            "receipts": self.receipts,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "pending": len(self._pending),
+        }
+
+
+# Экземпляр ReadReceiptBatcher для отметок о прочтении
+read_receipt_batcher = ReadReceiptBatcher(READ_RECEIPT_BATCH_SECONDS, READ_RECEIPT_MAX_BATCH)
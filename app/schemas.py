@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -10,6 +10,11 @@ class StatusEnum(str, Enum):
     UNREAD = "unread"
     READ = "read"
 
+# ID строки из запроса клиента: столбцы ID имеют тип INTEGER, значение вне его диапазона
+# отклоняется при проверке (422), а не ошибкой базы данных
+MAX_ROW_ID = 2**31
+RowId = Annotated[int, Field(gt=0, lt=MAX_ROW_ID)]
+
 class UserBase(BaseModel):
     """
     Базовая схема пользователя.
@@ -64,6 +69,16 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserSnapshot(UserBase):
+    """
+    Неизменяемый снимок пользователя без хэша пароля. Хранится в кэше пользователей
+    и используется как текущий пользователь в эндпоинтах.
+    """
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
 class MessageCreate(BaseModel):
     """
     Схема для создания нового сообщения.
@@ -75,23 +90,116 @@ class MessageCreate(BaseModel):
         message_status (str): Статус сообщения.
     """
     message: str
-    message_sender: int
-    message_receiver: int
+    message_sender: RowId
+    message_receiver: RowId
     message_status: StatusEnum = StatusEnum.UNREAD
 
+# Максимальное количество сообщений в одном пакетном запросе
+MAX_BULK_MESSAGES = 1000
+
+class BulkMessageItem(BaseModel):
+    """
+    Сообщение одному получателю в пакетной отправке.
+
+    Атрибуты:
+        message_receiver (int): ID получателя.
+        message (str): Текст сообщения.
+    """
+    message_receiver: RowId
+    message: str
+
+class MessageBulkCreate(BaseModel):
+    """
+    Схема для пакетной отправки сообщений от одного отправителя.
+
+    Передаётся либо общий текст message со списком получателей message_receivers,
+    либо список messages с отдельным текстом для каждого получателя.
+
+    Атрибуты:
+        message_sender (int): ID отправителя.
+        message (Optional[str]): Общий текст сообщения.
+        message_receivers (List[int]): ID получателей общего сообщения.
+        messages (List[BulkMessageItem]): Сообщения с отдельным текстом.
+        message_status (str): Статус сообщений.
+    """
+    message_sender: RowId
+    message: Optional[str] = None
+    message_receivers: List[RowId] = Field(default_factory=list, max_length=MAX_BULK_MESSAGES)
+    messages: List[BulkMessageItem] = Field(default_factory=list, max_length=MAX_BULK_MESSAGES)
+    message_status: StatusEnum = StatusEnum.UNREAD
+
+    @model_validator(mode="after")
+    def check_messages(self):
+        if self.message_receivers and self.message is None:
+            raise ValueError("message is required with message_receivers")
+        if not self.message_receivers and not self.messages:
+            raise ValueError("message_receivers or messages must not be empty")
+        if len(self.message_receivers) + len(self.messages) > MAX_BULK_MESSAGES:
+            raise ValueError(f"no more than {MAX_BULK_MESSAGES} messages per request")
+        return self
+
+    def items(self) -> List[BulkMessageItem]:
+        """
+        Возвращает все сообщения запроса по одному на получателя.
+
+        Возвращает:
+            List[BulkMessageItem]: Сообщения в порядке передачи.
+        """
+        return [
+            BulkMessageItem(message_receiver=receiver, message=self.message)
+            for receiver in self.message_receivers
+        ] + self.messages
+
 
 class MessageStatus(BaseModel):
     """
-    Схема для создания нового сообщения.
+    Схема для изменения статуса всех сообщений отправителя.
 
     Атрибуты:
         message_sender (int): ID отправителя.
         message_receiver (int): ID получателя.
-        message_status (str): Статус сообщения.
+        message_status (str): Новый статус сообщений.
     """
-    message_sender: int
-    message_receiver: int
-    message_status: StatusEnum = StatusEnum.UNREAD
+    message_sender: RowId
+    message_receiver: RowId
+    message_status: StatusEnum
+
+class ReadReceipt(BaseModel):
+    """
+    Отметка о прочтении сообщений одного отправителя.
+
+    Передаются либо конкретные message_ids, либо up_to - все сообщения отправителя
+    с ID не больше указанного.
+
+    Атрибуты:
+        message_sender (int): ID отправителя прочитанных сообщений.
+        message_ids (List[int]): ID прочитанных сообщений.
+        up_to (Optional[int]): ID последнего прочитанного сообщения в переписке.
+    """
+    message_sender: RowId
+    message_ids: List[RowId] = Field(default_factory=list, max_length=MAX_BULK_MESSAGES)
+    up_to: Optional[RowId] = None
+
+    @model_validator(mode="after")
+    def check_messages(self):
+        if not self.message_ids and self.up_to is None:
+            raise ValueError("message_ids or up_to is required")
+        return self
+
+class MessagesRead(BaseModel):
+    """
+    Схема для отметки сообщений прочитанными.
+
+    Атрибуты:
+        receipts (List[ReadReceipt]): Отметки о прочтении по перепискам.
+    """
+    receipts: List[ReadReceipt] = Field(min_length=1, max_length=MAX_BULK_MESSAGES)
+
+    @model_validator(mode="after")
+    def check_messages(self):
+        if sum(len(receipt.message_ids) for receipt in self.receipts) > MAX_BULK_MESSAGES:
+            raise ValueError(f"no more than {MAX_BULK_MESSAGES} message_ids per request")
+        return self
 
 
 # Схемы для сообщений
@@ -118,6 +226,123 @@ class Message(BaseModel):
         from_attributes = True
 
 
+# Схемы ответов со списками сообщений. Эндпоинты формируют словари этих схем и возвращают
+# ORJSONResponse напрямую, без повторной валидации и jsonable_encoder; схемы описывают ответ в OpenAPI.
+class MessageItem(BaseModel):
+    """
+    Сообщение в ответе API.
+
+    Атрибуты:
+        message_id (int): ID сообщения.
+        message_sender (int): ID отправителя.
+        message_receiver (int): ID получателя.
+        message_time (str): Время отправки в формате ДД-ММ-ГГГГ ЧЧ:ММ:СС.
+        message (str): Текст сообщения.
+        message_status (str): Статус сообщения.
+    """
+    message_id: int
+    message_sender: int
+    message_receiver: int
+    message_time: str
+    message: str
+    message_status: StatusEnum
+
+class UnreadMessage(BaseModel):
+    """
+    Непрочитанное сообщение с именем отправителя.
+
+    Атрибуты:
+        message_id (int): ID сообщения.
+        message_sender (int): ID отправителя.
+        name (str): Имя отправителя.
+        message_time (str): Время отправки в формате ДД-ММ-ГГГГ ЧЧ:ММ:СС.
+        message (str): Текст сообщения.
+    """
+    message_id: int
+    message_sender: int
+    name: str
+    message_time: str
+    message: str
+
+class UnreadSummaryItem(BaseModel):
+    """
+    Количество непрочитанных сообщений от одного отправителя.
+
+    Атрибуты:
+        sender_id (int): ID отправителя.
+        name (str): Имя отправителя.
+        count (int): Количество непрочитанных сообщений.
+        last_message_id (int): ID последнего сообщения.
+    """
+    sender_id: int
+    name: str
+    count: int
+    last_message_id: int
+
+class LoginResponse(BaseModel):
+    """
+    Ответ на вход пользователя.
+
+    Атрибуты:
+        id (int): ID пользователя.
+        name (str): Имя пользователя.
+        token (str): Токен доступа.
+        role (Optional[str]): Роль пользователя.
+        ttl (float): Время жизни токена в секундах.
+        unread_messages (Optional[List[UnreadMessage]]): Непрочитанные сообщения.
+        unread_summary (Optional[List[UnreadSummaryItem]]): Количество непрочитанных по отправителям
+            (вместо unread_messages, если запрошено "unread": "summary").
+    """
+    id: int
+    name: str
+    token: str
+    role: Optional[str] = None
+    ttl: float
+    unread_messages: Optional[List[UnreadMessage]] = None
+    unread_summary: Optional[List[UnreadSummaryItem]] = None
+
+class UserMessages(BaseModel):
+    """
+    Собеседник с перепиской.
+
+    Атрибуты:
+        id (int): ID пользователя.
+        name (str): Имя пользователя.
+        office (Optional[str]): Офис пользователя.
+        last_login (Optional[str]): Последний вход в формате ДД-ММ-ГГГГ ЧЧ:ММ:СС.
+        last_messages (List[MessageItem]): Сообщения переписки.
+    """
+    id: int
+    name: str
+    office: Optional[str] = None
+    last_login: Optional[str] = None
+    last_messages: List[MessageItem]
+
+class ConversationPage(BaseModel):
+    """
+    Страница переписки.
+
+    Атрибуты:
+        messages (List[MessageItem]): Сообщения в хронологическом порядке.
+        next_before (Optional[int]): Курсор следующей (более старой) страницы.
+    """
+    messages: List[MessageItem]
+    next_before: Optional[int] = None
+
+class MessageChanges(BaseModel):
+    """
+    Изменённые сообщения для синхронизации.
+
+    Атрибуты:
+        messages (List[MessageItem]): Новые и изменённые сообщения.
+        cursor (str): Курсор следующего запроса.
+        has_more (bool): Есть ещё не полученные изменения.
+    """
+    messages: List[MessageItem]
+    cursor: str
+    has_more: bool
+
+
 # Схемы для задач
 class TaskCreate(BaseModel):
     """
@@ -152,3 +377,82 @@ class TaskResponse(TaskCreate):
 
     class Config:
         from_attributes = True
+
+
+# Схемы событий WebSocket
+EVENT_SCHEMA_VERSION = 1
+
+class EventBase(BaseModel):
+    """
+    Базовая схема события WebSocket.
+
+    Атрибуты:
+        v (int): Версия схемы событий.
+        type (str): Тип события.
+        seq (Optional[int]): Порядковый номер события для повторной доставки.
+    """
+    v: int = EVENT_SCHEMA_VERSION
+    type: str
+    seq: Optional[int] = None
+
+class NewMessageEvent(EventBase):
+    """
+    Событие о новом сообщении.
+
+    Атрибуты:
+        detail (str): Описание события.
+        message_id (int): ID сообщения.
+        sender_id (int): ID отправителя.
+        receiver_id (int): ID получателя.
+        message (str): Текст сообщения.
+        time (datetime): Время отправки сообщения.
+    """
+    type: Literal["message.new"] = "message.new"
+    detail: str = "New message"
+    message_id: int
+    sender_id: int
+    receiver_id: int
+    message: str
+    time: datetime
+
+class MessagesReadEvent(EventBase):
+    """
+    Событие для отправителя о прочтении его сообщений получателем.
+
+    Атрибуты:
+        detail (str): Описание события.
+        reader_id (int): ID пользователя, прочитавшего сообщения.
+        message_ids (List[int]): ID прочитанных сообщений.
+    """
+    type: Literal["message.read"] = "message.read"
+    detail: str = "Messages read"
+    reader_id: int
+    message_ids: List[int]
+
+class TaskReminderEvent(EventBase):
+    """
+    Напоминание о приближающемся дедлайне задачи (для исполнителя и постановщика).
+
+    Атрибуты:
+        detail (str): Описание события.
+        task_id (int): ID задачи.
+        task_name (str): Название задачи.
+        task_deadline (datetime): Дедлайн задачи.
+        lead_minutes (int): За сколько минут до дедлайна отправлено напоминание.
+    """
+    type: Literal["task.reminder"] = "task.reminder"
+    detail: str = "Task deadline approaching"
+    task_id: int
+    task_name: str
+    task_deadline: datetime
+    lead_minutes: int
+
+class ResyncEvent(EventBase):
+    """
+    Событие о невозможности восстановить пропущенные события: клиенту нужно загрузить историю заново.
+
+    Атрибуты:
+        detail (str): Описание события.
+    """
+    type: Literal["resync"] = "resync"
+    detail: str = "Resync required"
@@ -0,0 +1,123 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app import schemas
+from app.websocket_manager import manager
+
+# Настройки кэша пользователей
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))  # Время жизни записи (0 - кэш отключён).
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))  # Максимальное количество пользователей в кэше.
+USER_CACHE_CHANNEL = os.getenv("USER_CACHE_CHANNEL", "user_cache")  # Канал pub/sub для сброса записей во всех воркерах.
+
+
+class UserCache:
+    """
+    Кэш пользователей по логину с ограничением по времени жизни и размеру (LRU).
+
+    Хранит неизменяемые снимки (UserSnapshot), не связанные с сессией базы данных, поэтому
+    их можно безопасно отдавать в любой запрос. При удалении пользователя или смене роли
+    запись сбрасывается во всех воркерах через pub/sub; TTL ограничивает устаревание,
+    если событие сброса было потеряно.
+
+    Атрибуты:
+        ttl (float): Время жизни записи в секундах.
+        max_size (int): Максимальное количество записей.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, schemas.UserSnapshot]]" = OrderedDict()
+        # Увеличивается при каждом сбросе: загруженный до сброса пользователь не попадёт в кэш
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, login: str) -> Optional[schemas.UserSnapshot]:
+        """
+        Возвращает снимок пользователя из кэша.
+
+        Аргументы:
+            login (str): Логин пользователя.
+
+        Возвращает:
+            Optional[UserSnapshot]: Снимок пользователя или None, если записи нет или она устарела.
+        """
+        entry = self._entries.get(login)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[login]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(login)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: Any, generation: int) -> schemas.UserSnapshot:
+        """
+        Создаёт снимок пользователя и сохраняет его в кэше.
+
+        Аргументы:
+            user (Any): Объект пользователя из базы данных.
+            generation (int): Значение generation до загрузки пользователя; если с тех пор
+                был сброс, снимок не сохраняется.
+
+        Возвращает:
+            UserSnapshot: Снимок пользователя.
+        """
+        snapshot = schemas.UserSnapshot.model_validate(user)
+        if self.ttl <= 0 or generation != self.generation:
+            return snapshot
+        self._entries[snapshot.login] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(snapshot.login)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, login: str):
+        """
+        Сбрасывает запись пользователя в этом и во всех остальных воркерах.
+        Вызывается при удалении пользователя и изменении его роли.
+
+        Аргументы:
+            login (str): Логин пользователя.
+        """
+        self.invalidations += 1
+        self._evict(login)
+        manager.pubsub.publish(USER_CACHE_CHANNEL, login)
+
+    def _evict(self, login: str):
+        """
+        Удаляет запись пользователя из кэша этого воркера.
+
+        Аргументы:
+            login (str): Логин пользователя.
+        """
+        self.generation += 1
+        self._entries.pop(login, None)
+
+    def stats(self) -> dict:
+        """
+        Возвращает метрики кэша.
+
+        Возвращает:
+            dict: Размер кэша, количество попаданий, промахов и сбросов.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+# Экземпляр UserCache для проверки токенов
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_SIZE)
+manager.pubsub.subscribe(USER_CACHE_CHANNEL, user_cache._evict)
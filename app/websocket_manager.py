@@ -1,58 +1,664 @@
-from fastapi import WebSocket
-from typing import List, Dict
+import asyncio
+import bisect
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+import orjson
+from fastapi import WebSocket, status
+from typing import Deque, Dict, List, Optional, Tuple
 
-class ConnectionManager:
+from app import metrics, schemas
+from app.pubsub import PubSubBackend, create_backend
+
+try:
+    import msgpack
+except ImportError:  # Бинарный формат необязателен: без msgpack клиентам доступен только JSON
+    msgpack = None
+
+# Настройки очередей исходящих сообщений
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))  # Максимум сообщений в очереди одного соединения.
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")  # "drop_oldest" или "disconnect" при переполнении.
+WS_PUBSUB_CHANNEL = os.getenv("WS_PUBSUB_CHANNEL", "ws_events")  # Канал pub/sub для доставки сообщений между воркерами.
+
+# Настройки повторной доставки событий после переподключения
+WS_REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", 200))  # Последних событий в памяти на пользователя.
+WS_REPLAY_USERS = int(os.getenv("WS_REPLAY_USERS", 10000))  # Максимум пользователей с буфером в памяти.
+WS_REPLAY_LIMIT = int(os.getenv("WS_REPLAY_LIMIT", 1000))  # Максимум событий, повторно доставляемых из БД.
+WS_EVENT_RETENTION_HOURS = float(os.getenv("WS_EVENT_RETENTION_HOURS", 24))  # Срок хранения событий в БД.
+WS_EVENT_PRUNE_SECONDS = float(os.getenv("WS_EVENT_PRUNE_SECONDS", 300))  # Интервал удаления устаревших событий.
+
+
+
+def serialize_event(event: schemas.EventBase) -> str:
+    """
+    Сериализует событие в JSON один раз для всех получателей.
+
+    Аргументы:
+        event (EventBase): Событие WebSocket.
+
+    Возвращает:
+        str: JSON-представление события.
+    """
+    return orjson.dumps(event.model_dump()).decode()
+
+
+def negotiate_format(subprotocols: List[str]) -> Optional[str]:
+    """
+    Выбирает формат кадров по подпротоколам, предложенным клиентом (Sec-WebSocket-Protocol).
+
+    Аргументы:
+        subprotocols (List[str]): Подпротоколы клиента в порядке предпочтения.
+
+    Возвращает:
+        Optional[str]: "msgpack" или "json", если клиент их предложил, иначе None (используется JSON).
+    """
+    for subprotocol in subprotocols:
+        if subprotocol == "json" or (subprotocol == "msgpack" and msgpack is not None):
+            return subprotocol
+    return None
+
+
+class Frame:
+    """
+    Сериализованное событие, общее для всех соединений-получателей.
+
+    JSON-представление создаётся один раз при публикации, бинарное msgpack-представление -
+    не более одного раза при первой отправке клиенту, выбравшему msgpack.
+
+    Атрибуты:
+        text (str): JSON-представление события.
+    """
+    __slots__ = ("text", "_binary")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._binary: Optional[bytes] = None
+
+    @property
+    def binary(self) -> bytes:
+        """
+        Возвращает msgpack-представление события.
+        """
+        if self._binary is None:
+            self._binary = msgpack.packb(orjson.loads(self.text))
+        return self._binary
+
+
+# Событие для клиента, пропущенные события которого восстановить нельзя: нужна полная загрузка истории
+RESYNC_FRAME = Frame(serialize_event(schemas.ResyncEvent()))
+
+
+class Connection:
+    """
+    WebSocket-соединение с собственной ограниченной очередью исходящих сообщений.
+
+    Сообщения отправляются отдельной задачей-писателем, поэтому медленный клиент
+    задерживает только свою очередь.
+
+    Номера событий пользователя идут без пропусков, и писатель отправляет их по порядку: уже
+    отправленные события пропускаются, а если событие пришло через pub/sub раньше предыдущего
+    (их опубликовали разные воркеры), недостающие события загружаются из ws_events. События,
+    отброшенные при переполнении очереди, не загружаются: клиент видит пропуск номеров.
+
+    Атрибуты:
+        websocket (WebSocket): WebSocket-соединение клиента.
+        user_id (int): ID пользователя.
+        queue (asyncio.Queue): Очередь исходящих сообщений в виде пар (seq, Frame).
+        acked_seq (int): Номер последнего события, получение которого подтвердил клиент.
+        sent_seq (Optional[int]): Номер последнего отправленного события (None - порядок не отслеживается).
+        start_seq (int): Номер последнего события пользователя на момент подключения; более ранние
+            события, пришедшие после подключения, отправляются без проверки порядка.
+        dropped_seq (int): Номер последнего события, отброшенного при переполнении очереди.
+        format (str): Формат кадров: "json" (текстовые) или "msgpack" (бинарные).
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int, paused: bool = False, format: str = "json"):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.format = format
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.acked_seq = 0
+        self.sent_seq: Optional[int] = None
+        self.start_seq = 0
+        self.dropped_seq = 0
+        self.writer_task: Optional[asyncio.Task] = None
+        if not paused:
+            self.writer_task = asyncio.create_task(self._writer())
+
+    async def resume(self, frames: List[Tuple[int, Frame]], sent_seq: int, start_seq: int = 0):
+        """
+        Отправляет пропущенные события и запускает отправку накопившихся в очереди.
+
+        Аргументы:
+            frames (List[Tuple[int, Frame]]): Пары (seq, событие) по возрастанию seq.
+            sent_seq (int): Номер последнего события, которое есть у клиента после отправки frames.
+            start_seq (int): Номер последнего события пользователя на момент подключения нового клиента
+                (0 при повторной доставке: события до sent_seq у клиента уже есть).
+        """
+        for _, frame in frames:
+            await self._send(frame)
+        self.sent_seq = sent_seq
+        self.start_seq = start_seq
+        self.writer_task = asyncio.create_task(self._writer())
+
+    async def _send(self, frame: Frame):
+        """
+        Отправляет событие в формате, согласованном с клиентом.
+
+        Аргументы:
+            frame (Frame): Событие.
+        """
+        if self.format == "msgpack":
+            await self.websocket.send_bytes(frame.binary)
+        else:
+            await self.websocket.send_text(frame.text)
+
+    async def _writer(self):
+        """
+        Отправляет сообщения из очереди клиенту по одному в порядке номеров.
+        """
+        try:
+            while True:
+                seq, frame = await self.queue.get()
+                ordered = seq is not None and self.sent_seq is not None
+                if ordered:
+                    if self.start_seq < seq <= self.sent_seq:
+                        # Уже отправлено при повторной доставке или восполнении пропуска
+                        continue
+                    after = max(self.sent_seq, self.dropped_seq)
+                    if seq > after + 1:
+                        await self._fill_gap(after, seq)
+                await self._send(frame)
+                if ordered:
+                    self.sent_seq = max(self.sent_seq, seq)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка при отправке сообщения: {e}")
+
+    async def _fill_gap(self, after: int, seq: int):
+        """
+        Отправляет из БД события, опубликованные раньше события seq, но ещё не полученные.
+
+        Событие seq зафиксировано после всех событий пользователя с меньшими номерами,
+        поэтому они уже есть в ws_events.
+
+        Аргументы:
+            after (int): Номер последнего отправленного события.
+            seq (int): Номер полученного события.
+        """
+        from app import crud
+        from app.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            events = await crud.get_events_after(db, self.user_id, after, WS_REPLAY_LIMIT, before=seq)
+        if events is None:
+            await self._send(RESYNC_FRAME)
+            return
+        for _, payload in events:
+            await self._send(Frame(payload))
+
+    def ack(self, seq: int):
+        """
+        Запоминает подтверждение клиентом получения событий до seq включительно.
+
+        Аргументы:
+            seq (int): Номер подтверждённого события.
+        """
+        self.acked_seq = max(self.acked_seq, seq)
+
+    def close(self):
+        """
+        Останавливает задачу-писателя.
+        """
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+
+
+class _UserEvents:
     """
-    Менеджер для управления WebSocket-соединениями, с поддержкой разделения по item_id.
+    Последние события одного пользователя в буфере повторной доставки.
 
     Атрибуты:
-        active_connections (Dict[int, List[WebSocket]]):
-            Словарь, где ключ - item_id, значение - список активных WebSocket-соединений для данного item_id.
+        floor (int): Номер последнего вытесненного события; более старые события в буфер не добавляются.
+        events (Deque[Tuple[int, Frame]]): Пары (seq, событие) по возрастанию seq.
     """
+    __slots__ = ("floor", "events")
 
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.floor = 0
+        self.events: Deque[Tuple[int, Frame]] = deque()
+
+
+class ReplayBuffer:
+    """
+    Кольцевой буфер последних событий каждого пользователя для повторной доставки из памяти.
+
+    Буфер заполняется всеми событиями, которые воркер получает через pub/sub. События могут
+    прийти не по порядку номеров, поэтому буфер отдаёт диапазон, только если в нём нет пропусков
+    (номера событий пользователя идут подряд). Иначе (воркер перезапущен, события вытеснены
+    или ещё не получены) события загружаются из таблицы ws_events.
+
+    Атрибуты:
+        size (int): Максимум событий на пользователя.
+        max_users (int): Максимум пользователей; давно не получавшие событий вытесняются первыми.
+    """
+
+    def __init__(self, size: int, max_users: int):
+        self.size = size
+        self.max_users = max_users
+        self._users: "OrderedDict[int, _UserEvents]" = OrderedDict()
+
+    def add(self, user_id: int, seq: int, frame: Frame):
+        """
+        Добавляет событие в буфер пользователя.
+
+        Аргументы:
+            user_id (int): ID пользователя.
+            seq (int): Номер события.
+            frame (Frame): Событие.
+        """
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _UserEvents()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+
+        if seq <= entry.floor:
+            return
+        # События разных воркеров могут прийти не по порядку номеров
+        position = bisect.bisect(entry.events, (seq,))
+        if position < len(entry.events) and entry.events[position][0] == seq:
+            return
+        entry.events.insert(position, (seq, frame))
+        if len(entry.events) > self.size:
+            evicted_seq, _ = entry.events.popleft()
+            entry.floor = evicted_seq
+
+    def get(self, user_id: int, last_seq: int) -> Optional[List[Tuple[int, Frame]]]:
+        """
+        Получает события пользователя с номером больше last_seq.
+
+        Аргументы:
+            user_id (int): ID пользователя.
+            last_seq (int): Номер последнего полученного клиентом события.
 
-    async def connect(self, websocket: WebSocket, item_id: int):
+        Возвращает:
+            Optional[List[Tuple[int, Frame]]]: Пары (seq, событие) или None, если буфер не покрывает диапазон.
         """
-        Подключает клиента к WebSocket и добавляет соединение в группу по item_id.
+        entry = self._users.get(user_id)
+        if entry is None or not entry.events or last_seq < entry.floor or last_seq > entry.events[-1][0]:
+            return None
+        frames = [(seq, frame) for seq, frame in entry.events if seq > last_seq]
+        for expected, (seq, _) in enumerate(frames, start=last_seq + 1):
+            if seq != expected:
+                # Пропуск: событие ещё не получено этим воркером или пришло до создания буфера
+                return None
+        return frames
+
+    def stats(self) -> dict:
+        """
+        Возвращает размер буфера.
+
+        Возвращает:
+            dict: Количество пользователей и событий в буфере.
+        """
+        return {
+            "replay_buffer_users": len(self._users),
+            "replay_buffer_events": sum(len(entry.events) for entry in self._users.values()),
+        }
+
+
+class ConnectionManager:
+    """
+    Менеджер для управления WebSocket-соединениями, сгруппированными по пользователю.
+
+    Один пользователь может быть подключён с нескольких устройств одновременно. Рассылка
+    публикуется через бэкенд pub/sub, и каждый воркер доставляет её своим соединениям,
+    поэтому сообщение доходит до клиента независимо от того, к какому воркеру он подключён.
+    Доставка не ожидает сети: сообщение кладётся в очередь каждого соединения. При переполнении
+    очереди применяется политика overflow_policy: "drop_oldest" отбрасывает самое старое
+    сообщение, "disconnect" отключает медленного клиента.
+
+    Каждое событие имеет номер seq: номера событий пользователя идут подряд в порядке фиксации
+    транзакций (см. crud.create_events). Клиент, переподключившийся с last_seq, получает только
+    пропущенные события: из буфера в памяти или, если его недостаточно, из таблицы ws_events.
+
+    Атрибуты:
+        active_connections (Dict[int, Dict[WebSocket, Connection]]):
+            Словарь, где ключ - ID пользователя, значение - его активные соединения.
+        queue_size (int): Размер очереди исходящих сообщений одного соединения.
+        overflow_policy (str): Политика при переполнении очереди.
+        pubsub (PubSubBackend): Бэкенд публикации событий между воркерами.
+        replay_buffer (ReplayBuffer): Буфер последних событий для повторной доставки.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = WS_OVERFLOW_POLICY,
+        pubsub: Optional[PubSubBackend] = None,
+    ):
+        if overflow_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Неизвестная политика переполнения: {overflow_policy}")
+        self.pubsub = pubsub if pubsub is not None else create_backend()
+        self.pubsub.subscribe(WS_PUBSUB_CHANNEL, self._on_pubsub_event)
+        self.active_connections: Dict[int, Dict[WebSocket, Connection]] = {}
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.enqueued_frames = 0
+        self.dropped_frames = 0
+        self.slow_consumer_disconnects = 0
+        self.replay_buffer = ReplayBuffer(WS_REPLAY_BUFFER_SIZE, WS_REPLAY_USERS)
+        self.replayed_from_buffer = 0
+        self.replayed_from_db = 0
+        self.resyncs = 0
+        self._prune_task: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, user_id: int, paused: bool = False) -> Connection:
+        """
+        Подключает клиента к WebSocket и регистрирует соединение за пользователем.
 
         Аргументы:
             websocket (WebSocket): WebSocket-соединение клиента.
-            item_id (int): Идентификатор группы.
+            user_id (int): ID аутентифицированного пользователя.
+            paused (bool): Не начинать отправку до вызова replay (события накапливаются в очереди).
+
+        Формат кадров согласуется через Sec-WebSocket-Protocol: "msgpack" (бинарные кадры,
+        если установлен пакет msgpack) или "json" (по умолчанию).
+
+        Возвращает:
+            Connection: Зарегистрированное соединение.
         """
-        await websocket.accept()
-        if item_id not in self.active_connections:
-            self.active_connections[item_id] = []
-        self.active_connections[item_id].append(websocket)
+        subprotocol = negotiate_format(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(websocket, user_id, self.queue_size, paused=paused, format=subprotocol or "json")
+        self.active_connections.setdefault(user_id, {})[websocket] = connection
+        return connection
 
-    def disconnect(self, websocket: WebSocket, item_id: int):
+    async def replay(self, connection: Connection, last_seq: Optional[int]):
         """
-        Отключает клиента от WebSocket и удаляет соединение из группы по item_id.
+        Доставляет клиенту события, пропущенные после last_seq, и запускает обычную отправку.
+
+        Если пропущенные события восстановить нельзя, клиенту отправляется RESYNC_FRAME. Для нового
+        клиента (last_seq не передан) запоминается номер последнего события пользователя: следующие
+        события отправляются по порядку с него.
+
+        Аргументы:
+            connection (Connection): Соединение, подключённое с paused=True.
+            last_seq (Optional[int]): Номер последнего полученного клиентом события.
+        """
+        from app import crud
+        from app.database import AsyncSessionLocal
+
+        if last_seq is not None:
+            frames = self.replay_buffer.get(connection.user_id, last_seq)
+            if frames is not None:
+                self.replayed_from_buffer += len(frames)
+                await connection.resume(frames, frames[-1][0] if frames else last_seq)
+                return
+
+        async with AsyncSessionLocal() as db:
+            events = None
+            if last_seq is not None:
+                events = await crud.get_events_after(db, connection.user_id, last_seq, WS_REPLAY_LIMIT)
+            if events is None:
+                start_seq = await crud.get_last_event_seq(db, connection.user_id)
+
+        if events is not None:
+            self.replayed_from_db += len(events)
+            frames = [(seq, Frame(payload)) for seq, payload in events]
+            await connection.resume(frames, frames[-1][0] if frames else last_seq)
+        elif last_seq is not None:
+            self.resyncs += 1
+            await connection.resume([(0, RESYNC_FRAME)], start_seq, start_seq)
+        else:
+            await connection.resume([], start_seq, start_seq)
+
+    def disconnect(self, websocket: WebSocket, user_id: int):
+        """
+        Удаляет соединение пользователя из реестра и останавливает его задачу-писателя.
 
         Аргументы:
             websocket (WebSocket): WebSocket-соединение клиента.
-            item_id (int): Идентификатор группы.
+            user_id (int): ID пользователя.
+        """
+        connections = self.active_connections.get(user_id)
+        if connections is None:
+            return
+        connection = connections.pop(websocket, None)
+        if connection is not None:
+            connection.close()
+        if not connections:
+            del self.active_connections[user_id]
+
+    async def start(self):
+        """
+        Запускает бэкенд pub/sub и периодическое удаление устаревших событий.
+        Вызывается один раз при старте воркера.
+        """
+        await self.pubsub.start()
+        self._prune_task = asyncio.create_task(self._prune_events())
+
+    async def stop(self):
+        """
+        Останавливает бэкенд pub/sub и удаление событий.
+        """
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+        await self.pubsub.stop()
+
+    async def _prune_events(self):
+        """
+        Периодически удаляет из БД события старше WS_EVENT_RETENTION_HOURS.
+        """
+        from app import crud
+        from app.database import AsyncSessionLocal
+
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await crud.prune_events(db, timedelta(hours=WS_EVENT_RETENTION_HOURS))
+            except Exception as e:
+                print(f"Ошибка при удалении устаревших событий: {e}")
+            await asyncio.sleep(WS_EVENT_PRUNE_SECONDS)
+
+    def broadcast(self, message: str, user_id: int, seq: Optional[int] = None):
         """
-        if item_id in self.active_connections:
-            self.active_connections[item_id].remove(websocket)
-            if not self.active_connections[item_id]:
-                del self.active_connections[item_id]
+        Публикует сообщение для всех устройств пользователя во всех воркерах, не ожидая отправки.
 
-    async def broadcast(self, message: str, item_id: int):
+        Аргументы:
+            message (str): Сериализованное событие (см. serialize_event).
+            user_id (int): ID пользователя-получателя.
+            seq (Optional[int]): Номер сохранённого события (для повторной доставки).
+        """
+        self.broadcast_many([(user_id, seq, message)])
+
+    def broadcast_many(self, events: List[Tuple[int, Optional[int], str]]):
+        """
+        Публикует несколько событий за один проход: события объединяются в пакеты
+        (по строке на событие) размером не больше допустимого для бэкенда pub/sub.
+
+        Вызывается только из цикла событий: очереди соединений и бэкенда pub/sub не потокобезопасны,
+        поэтому метод нельзя передавать в BackgroundTasks или run_in_threadpool.
+
+        Аргументы:
+            events (List[Tuple[int, Optional[int], str]]): Тройки (ID получателя, номер события, сериализованное событие).
+        """
+        max_payload = self.pubsub.max_payload
+        batch, size = [], 0
+        for user_id, seq, message in events:
+            line = self._envelope(user_id, seq, message)
+            length = len(line.encode()) + 1
+            if batch and max_payload is not None and size + length > max_payload:
+                self.pubsub.publish(WS_PUBSUB_CHANNEL, "\n".join(batch))
+                batch, size = [], 0
+            batch.append(line)
+            size += length
+        if batch:
+            self.pubsub.publish(WS_PUBSUB_CHANNEL, "\n".join(batch))
+
+    def _envelope(self, user_id: int, seq: Optional[int], message: str) -> str:
+        """
+        Формирует строку события для канала pub/sub.
+
+        Аргументы:
+            user_id (int): ID пользователя-получателя.
+            seq (Optional[int]): Номер события.
+            message (str): Сериализованное событие.
+
+        Возвращает:
+            str: Заголовок "<user_id> <seq>" и событие без повторной сериализации
+                 (или только заголовок, если событие слишком большое).
+        """
+        header = f"{user_id} {seq if seq is not None else '-'}"
+        payload = f"{header} {message}"
+        max_payload = self.pubsub.max_payload
+        if seq is not None and max_payload is not None and len(payload.encode()) > max_payload:
+            # Слишком большое событие передаётся ссылкой: воркеры загрузят его из ws_events
+            return header
+        return payload
+
+    def _on_pubsub_event(self, payload: str):
+        """
+        Обрабатывает пакет событий из канала pub/sub и доставляет их локальным соединениям.
+
+        Аргументы:
+            payload (str): События по одному на строку: заголовок "<user_id> <seq>" и сериализованное событие.
+        """
+        # Сериализованные события не содержат переводов строк (orjson экранирует их)
+        for line in payload.split("\n"):
+            user_id, seq, *message = line.split(" ", 2)
+            user_id = int(user_id)
+            seq = None if seq == "-" else int(seq)
+            if not message:
+                asyncio.create_task(self._load_and_deliver(user_id, seq))
+                continue
+            self.deliver_local(message[0], user_id, seq)
+
+    async def _load_and_deliver(self, user_id: int, seq: int):
+        """
+        Загружает событие, переданное ссылкой, из БД и доставляет его локальным соединениям.
+
+        Аргументы:
+            user_id (int): ID пользователя-получателя.
+            seq (int): Номер события.
+        """
+        from app import crud
+        from app.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            event = await crud.get_event(db, user_id, seq)
+        if event is not None:
+            self.deliver_local(event.payload, user_id, seq)
+
+    def deliver_local(self, message: str, user_id: int, seq: Optional[int] = None):
         """
-        Рассылает сообщение всем клиентам в группе по item_id.
+        Ставит сообщение в очередь на устройства пользователя, подключённые к этому воркеру.
 
         Аргументы:
-            message (str): Сообщение для отправки.
-            item_id (int): Идентификатор группы.
+            message (str): Сериализованное событие.
+            user_id (int): ID пользователя-получателя.
+            seq (Optional[int]): Номер события; события с номером попадают в буфер повторной доставки.
         """
-        if item_id in self.active_connections:
-            for connection in self.active_connections[item_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    print(f"Ошибка при отправке сообщения: {e}")
+        started = time.perf_counter()
+        # Один объект Frame на событие: все соединения используют одни и те же байты
+        frame = Frame(message)
+        if seq is not None:
+            self.replay_buffer.add(user_id, seq, frame)
+        # Копия: соединение может быть удалено при переполнении
+        for connection in list(self.active_connections.get(user_id, {}).values()):
+            self._enqueue(connection, seq, frame)
+        ws_broadcast_seconds.observe(time.perf_counter() - started)
+
+    def _enqueue(self, connection: Connection, seq: Optional[int], frame: Frame):
+        """
+        Кладёт событие в очередь соединения с учётом политики переполнения.
+
+        Аргументы:
+            connection (Connection): Соединение клиента.
+            seq (Optional[int]): Номер события.
+            frame (Frame): Событие.
+        """
+        if connection.queue.full():
+            if self.overflow_policy == "disconnect":
+                self.dropped_frames += connection.queue.qsize() + 1
+                self.slow_consumer_disconnects += 1
+                self.disconnect(connection.websocket, connection.user_id)
+                asyncio.create_task(self._close_slow_consumer(connection.websocket))
+                return
+            dropped_seq, _ = connection.queue.get_nowait()
+            if dropped_seq is not None:
+                connection.dropped_seq = max(connection.dropped_seq, dropped_seq)
+            self.dropped_frames += 1
+        connection.queue.put_nowait((seq, frame))
+        self.enqueued_frames += 1
+
+    async def _close_slow_consumer(self, websocket: WebSocket):
+        """
+        Закрывает соединение клиента, не успевающего получать сообщения.
+
+        Аргументы:
+            websocket (WebSocket): WebSocket-соединение клиента.
+        """
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception as e:
+            print(f"Ошибка при закрытии соединения: {e}")
+
+    def stats(self) -> dict:
+        """
+        Возвращает метрики WebSocket-соединений.
+
+        Возвращает:
+            dict: Количество соединений и пользователей, глубина очередей, поставленные в очередь и отброшенные
+            сообщения, статистика повторной доставки.
+        """
+        queue_depths = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
+        return {
+            "connections": len(queue_depths),
+            "users": len(self.active_connections),
+            "queued_frames": sum(queue_depths),
+            "max_queue_depth": max(queue_depths, default=0),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "enqueued_frames": self.enqueued_frames,
+            "dropped_frames": self.dropped_frames,
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "replayed_from_buffer": self.replayed_from_buffer,
+            "replayed_from_db": self.replayed_from_db,
+            "resyncs": self.resyncs,
+            **self.replay_buffer.stats(),
+        }
 
 # Экземпляр ConnectionManager для работы с WebSocket
 manager = ConnectionManager()
+
+# Метрики WebSocket для /metrics
+ws_broadcast_seconds = metrics.registry.register(metrics.Histogram(
+    "ws_broadcast_seconds", "Время постановки события в очереди соединений получателя",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+))
+metrics.registry.register(metrics.Gauge(
+    "ws_connections", "Количество открытых WebSocket-соединений",
+    function=lambda: sum(len(connections) for connections in manager.active_connections.values()),
+))
+metrics.registry.register(metrics.Gauge(
+    "ws_connected_users", "Количество пользователей (групп соединений) с открытыми WebSocket-соединениями",
+    function=lambda: len(manager.active_connections),
+))
+metrics.registry.register(metrics.Gauge(
+    "ws_queued_frames", "Количество событий в очередях отправки",
+    function=lambda: sum(
+        connection.queue.qsize()
+        for connections in manager.active_connections.values()
+        for connection in connections.values()
+    ),
+))
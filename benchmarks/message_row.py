@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal, async_engine
+from app.websocket_manager import manager
+from benchmarks.run import git_commit, percentile
+from benchmarks.seed import seed
+
+# Пути сохранения сообщения в порядке вывода
+PATHS = ("three_query", "returning")
+
+
+async def three_query_path(sender_id: int, receiver_id: int, message: str) -> dict:
+    """
+    Прежний путь POST /message_row: вставка через ORM с flush, фиксация, повторное чтение строки
+    (refresh) и загрузка отправителя ради имени.
+
+    Аргументы:
+        sender_id (int): ID отправителя.
+        receiver_id (int): ID получателя.
+        message (str): Текст сообщения.
+
+    Возвращает:
+        dict: Ответ эндпоинта.
+    """
+    async with AsyncSessionLocal() as db:
+        db_message = models.Message(
+            message_time=datetime.now(),
+            message=message,
+            message_sender=sender_id,
+            message_receiver=receiver_id,
+            message_status="unread",
+        )
+        db.add(db_message)
+        await db.flush()
+        await crud.increment_unread_counter(db, receiver_id, sender_id, db_message.id)
+        notification = schemas.NewMessageEvent(
+            message_id=db_message.id,
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            message=message,
+            time=db_message.message_time,
+        )
+        events = await crud.create_events(db, [(receiver_id, notification)])
+        await db.commit()
+        await db.refresh(db_message)
+        manager.broadcast_many(events)
+        sender = await crud.get_user(db, sender_id)
+        return {"message_id": db_message.id, "name": sender.name}
+
+
+async def returning_path(sender: models.User, receiver_id: int, message: str) -> dict:
+    """
+    Текущий путь POST /message_row: INSERT ... RETURNING через crud.save_message, имя отправителя
+    берётся из аутентифицированного пользователя.
+
+    Аргументы:
+        sender (User): Аутентифицированный отправитель.
+        receiver_id (int): ID получателя.
+        message (str): Текст сообщения.
+
+    Возвращает:
+        dict: Ответ эндпоинта.
+    """
+    async with AsyncSessionLocal() as db:
+        message_id, events = await crud.save_message(db, sender.id, receiver_id, message)
+    manager.broadcast_many(events)
+    return {"message_id": message_id, "name": sender.name}
+
+
+async def measure(requests: int, warmup: int) -> List[dict]:
+    """
+    Сохраняет сообщения обоими путями поочерёдно и измеряет количество SQL-запросов (без BEGIN и COMMIT) и задержку.
+
+    Пути чередуются, чтобы фоновая нагрузка на базу одинаково влияла на оба.
+
+    Аргументы:
+        requests (int): Количество сохранений каждым путём.
+        warmup (int): Количество сохранений каждым путём до начала измерений.
+
+    Возвращает:
+        List[dict]: SQL-запросы на сохранение и задержки в миллисекундах по путям.
+    """
+    async with AsyncSessionLocal() as db:
+        sender = await crud.get_user(db, 1)
+
+    statements = {path: 0 for path in PATHS}
+    latencies = {path: [] for path in PATHS}
+    current = None
+
+    def count(*args):
+        if current is not None:
+            statements[current] += 1
+
+    calls = {
+        "three_query": lambda number: three_query_path(sender.id, 2, f"Benchmark message {number}"),
+        "returning": lambda number: returning_path(sender, 2, f"Benchmark message {number}"),
+    }
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        for number in range(warmup):
+            for path in PATHS:
+                await calls[path](number)
+        for number in range(requests):
+            for path in PATHS:
+                current = path
+                started = time.perf_counter()
+                await calls[path](number)
+                latencies[path].append((time.perf_counter() - started) * 1000)
+                current = None
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    results = []
+    for path in PATHS:
+        values = sorted(latencies[path])
+        results.append({
+            "path": path,
+            "statements": statements[path] / requests,
+            "latency_ms": {
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+            },
+        })
+    return results
+
+
+async def run(requests: int, warmup: int) -> List[dict]:
+    """
+    Заполняет базу двумя пользователями и измеряет оба пути.
+
+    Аргументы:
+        requests (int): Количество сохранений каждым путём.
+        warmup (int): Количество сохранений каждым путём до начала измерений.
+
+    Возвращает:
+        List[dict]: Результаты по путям.
+    """
+    seed(2, 0, 0)
+    try:
+        return await measure(requests, warmup)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Количество SQL-запросов и задержка сохранения сообщения POST /message_row: прежний путь "
+                    "(flush, refresh и загрузка отправителя) и INSERT ... RETURNING. Данные базы DATABASE_URL удаляются.",
+    )
+    parser.add_argument("--requests", type=int, default=1000, help="Количество сохранений каждым путём")
+    parser.add_argument("--warmup", type=int, default=50, help="Сохранений каждым путём до начала измерений")
+    parser.add_argument("--output", default=None, help="Файл для результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": asyncio.run(run(args.requests, args.warmup)),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
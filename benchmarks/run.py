@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.seed import BENCH_PASSWORD, bench_login
+
+# Сценарии в порядке выполнения
+SCENARIOS = (
+    "login",
+    "messages",
+    "message_row",
+    "message_status",
+    "tasks_list",
+    "tasks_create",
+    "ws_connect",
+    "ws_delivery",
+)
+
+# Время ожидания события WebSocket, после которого доставка считается ошибкой (в секундах)
+WS_DELIVERY_TIMEOUT = 10.0
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """
+    Вычисляет перцентиль методом ближайшего ранга.
+
+    Аргументы:
+        values (List[float]): Отсортированные значения.
+        percent (float): Перцентиль от 0 до 100.
+
+    Возвращает:
+        Optional[float]: Значение перцентиля или None, если значений нет.
+    """
+    if not values:
+        return None
+    rank = max(int(-(-percent * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """
+    Формирует итоги сценария.
+
+    Аргументы:
+        latencies (List[float]): Длительности успешных операций в секундах.
+        errors (int): Количество неуспешных операций.
+        elapsed (float): Общая длительность сценария в секундах.
+
+    Возвращает:
+        dict: Количество операций и ошибок, пропускная способность и задержки в миллисекундах.
+    """
+    values = sorted(latency * 1000 for latency in latencies)
+
+    def rounded(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": rounded(percentile(values, 50)),
+            "p95": rounded(percentile(values, 95)),
+            "p99": rounded(percentile(values, 99)),
+            "mean": rounded(sum(values) / len(values) if values else None),
+            "max": rounded(values[-1] if values else None),
+        },
+    }
+
+
+async def run_scenario(total: int, concurrency: int, operation: Callable[[int], Awaitable[bool]]) -> dict:
+    """
+    Выполняет операцию total раз в concurrency параллельных клиентах.
+
+    Аргументы:
+        total (int): Количество операций.
+        concurrency (int): Количество параллельных клиентов.
+        operation (Callable[[int], Awaitable[bool]]): Операция по её номеру; возвращает признак успеха.
+
+    Возвращает:
+        dict: Итоги сценария (см. summarize).
+    """
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for number in numbers:
+            started = time.perf_counter()
+            try:
+                ok = await operation(number)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+class Session:
+    """
+    Авторизованный пользователь нагрузочного теста.
+
+    Атрибуты:
+        user_id (int): ID пользователя.
+        headers (dict): Заголовок Authorization с токеном доступа.
+        token (str): Токен доступа.
+    """
+
+    def __init__(self, user_id: int, token: str):
+        self.user_id = user_id
+        self.token = token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+async def login(client: httpx.AsyncClient, number: int, summary: bool = True) -> httpx.Response:
+    """
+    Выполняет вход пользователя нагрузочного теста через /endpoint.
+
+    Аргументы:
+        client (httpx.AsyncClient): HTTP-клиент.
+        number (int): Номер пользователя.
+        summary (bool): Запросить только количество непрочитанных сообщений.
+
+    Возвращает:
+        httpx.Response: Ответ сервера.
+    """
+    body = {"login": bench_login(number), "password": BENCH_PASSWORD}
+    if summary:
+        body["unread"] = "summary"
+    return await client.post("/endpoint", json=body)
+
+
+class Benchmark:
+    """
+    Нагрузочный тест HTTP API и WebSocket по заранее заполненной базе (см. benchmarks.seed).
+
+    Атрибуты:
+        base_url (str): Адрес сервера.
+        users (int): Количество пользователей в базе.
+        requests (int): Количество операций в каждом сценарии.
+        concurrency (int): Количество параллельных клиентов.
+        ws_clients (int): Количество WebSocket-клиентов.
+        messages_last (Optional[int]): Параметр last для /messages.
+        rng (random.Random): Генератор случайных чисел.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        users: int,
+        requests: int,
+        concurrency: int,
+        ws_clients: int,
+        messages_last: Optional[int],
+        random_seed: int,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.users = users
+        self.requests = requests
+        self.concurrency = concurrency
+        self.ws_clients = min(ws_clients, users - 1)
+        self.messages_last = messages_last
+        self.rng = random.Random(random_seed)
+        self.sessions: List[Session] = []
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _ws_url(self, token: str) -> str:
+        return "ws" + self.base_url[len("http"):] + f"/ws?token={token}"
+
+    def _session(self, number: int) -> Session:
+        return self.sessions[number % len(self.sessions)]
+
+    def _other_user(self, user_id: int) -> int:
+        other = self.rng.randint(1, self.users - 1)
+        return other + 1 if other >= user_id else other
+
+    async def _login_sessions(self):
+        """
+        Выполняет вход пользователей, от имени которых работают клиенты сценариев.
+        """
+        count = min(max(self.concurrency, self.ws_clients + 1), self.users)
+        for number in range(1, count + 1):
+            response = await login(self.client, number)
+            response.raise_for_status()
+            data = response.json()[0]
+            self.sessions.append(Session(data["id"], data["token"]))
+
+    async def _login(self, number: int) -> bool:
+        response = await login(self.client, self.rng.randint(1, self.users), summary=False)
+        return response.status_code == 200
+
+    async def _messages(self, number: int) -> bool:
+        params = {"last": self.messages_last} if self.messages_last else None
+        response = await self.client.post("/messages", params=params, headers=self._session(number).headers)
+        return response.status_code == 200
+
+    async def _message_row(self, number: int) -> bool:
+        session = self._session(number)
+        response = await self.client.post("/message_row", headers=session.headers, json={
+            "message": f"Benchmark message_row {number}",
+            "message_sender": session.user_id,
+            "message_receiver": self._other_user(session.user_id),
+        })
+        return response.status_code == 200
+
+    async def _message_status(self, number: int) -> bool:
+        session = self._session(number)
+        response = await self.client.post("/message_status", headers=session.headers, json={
+            "message_status": "read",
+            "message_receiver": session.user_id,
+            "message_sender": self._other_user(session.user_id),
+        })
+        return response.status_code == 200
+
+    async def _tasks_list(self, number: int) -> bool:
+        response = await self.client.get("/tasks", params={"sort": "deadline"}, headers=self._session(number).headers)
+        return response.status_code == 200
+
+    async def _tasks_create(self, number: int) -> bool:
+        session = self._session(number)
+        response = await self.client.post("/tasks", headers=session.headers, json={
+            "task_name": f"Benchmark task {number}",
+            "task_content": "Created by the load test",
+            "task_executor": self._other_user(session.user_id),
+            "task_director": session.user_id,
+            "task_deadline": (datetime.now() + timedelta(days=7)).isoformat(),
+            "task_status": "new",
+            "task_priority": "normal",
+            "task_executor_role": 1,
+        })
+        return response.status_code == 200
+
+    async def _ws_connect(self, number: int) -> bool:
+        async with connect(self._ws_url(self._session(number).token)):
+            return True
+
+    async def _ws_delivery(self) -> dict:
+        """
+        Измеряет время от отправки сообщения через /message_row до получения события
+        message.new получателем по WebSocket.
+
+        Возвращает:
+            dict: Итоги сценария (см. summarize).
+        """
+        receivers = self.sessions[:self.ws_clients]
+        senders = self.sessions[self.ws_clients:]
+        loop = asyncio.get_running_loop()
+        pending: Dict[str, asyncio.Future] = {}
+
+        async def listen(websocket):
+            async for frame in websocket:
+                event = json.loads(frame)
+                if event.get("seq") is not None:
+                    await websocket.send(json.dumps({"type": "ack", "seq": event["seq"]}))
+                future = pending.get(event.get("message"))
+                if event.get("type") == "message.new" and future is not None and not future.done():
+                    future.set_result(time.perf_counter())
+
+        websockets = [await connect(self._ws_url(session.token)) for session in receivers]
+        listeners = [asyncio.create_task(listen(websocket)) for websocket in websockets]
+
+        async def deliver(number: int) -> bool:
+            sender = senders[number % len(senders)]
+            receiver = receivers[number % len(receivers)]
+            text = f"Benchmark delivery {number}"
+            pending[text] = loop.create_future()
+            try:
+                response = await self.client.post("/message_row", headers=sender.headers, json={
+                    "message": text,
+                    "message_sender": sender.user_id,
+                    "message_receiver": receiver.user_id,
+                })
+                if response.status_code != 200:
+                    return False
+                await asyncio.wait_for(pending[text], WS_DELIVERY_TIMEOUT)
+                return True
+            finally:
+                pending.pop(text, None)
+
+        try:
+            return await run_scenario(self.requests, self.concurrency, deliver)
+        finally:
+            for listener in listeners:
+                listener.cancel()
+            for websocket in websockets:
+                await websocket.close()
+
+    async def run(self, scenarios: List[str]) -> Dict[str, dict]:
+        """
+        Выполняет сценарии по очереди.
+
+        Аргументы:
+            scenarios (List[str]): Имена сценариев из SCENARIOS.
+
+        Возвращает:
+            Dict[str, dict]: Итоги по каждому сценарию.
+        """
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30.0) as self.client:
+            await self._login_sessions()
+            results = {}
+            for name in scenarios:
+                if name == "ws_delivery":
+                    if self.ws_clients < 1:
+                        continue
+                    results[name] = await self._ws_delivery()
+                else:
+                    results[name] = await run_scenario(self.requests, self.concurrency, getattr(self, f"_{name}"))
+            return results
+
+
+def git_commit() -> Optional[str]:
+    """
+    Возвращает текущий коммит репозитория для сравнения результатов между коммитами.
+
+    Возвращает:
+        Optional[str]: Хэш коммита или None, если он недоступен.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP API и WebSocket")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Адрес запущенного сервера")
+    parser.add_argument("--users", type=int, default=100, help="Количество пользователей в базе")
+    parser.add_argument("--messages", type=int, default=10000, help="Количество сообщений в базе")
+    parser.add_argument("--tasks", type=int, default=1000, help="Количество задач в базе")
+    parser.add_argument("--seed", action="store_true", help="Заполнить базу DATABASE_URL перед тестом (данные удаляются)")
+    parser.add_argument("--random-seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--requests", type=int, default=500, help="Количество операций в каждом сценарии")
+    parser.add_argument("--concurrency", type=int, default=20, help="Количество параллельных клиентов")
+    parser.add_argument("--ws-clients", type=int, default=10, help="Количество WebSocket-получателей в ws_delivery")
+    parser.add_argument("--messages-last", type=int, default=None, help="Параметр last для /messages")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Сценарии через запятую")
+    parser.add_argument("--output", default=None, help="Файл для результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+    if args.users < 2:
+        parser.error("нужно не меньше двух пользователей")
+
+    if args.seed:
+        from benchmarks.seed import seed
+        seed(args.users, args.messages, args.tasks, args.random_seed)
+
+    benchmark = Benchmark(
+        args.base_url, args.users, args.requests, args.concurrency, args.ws_clients,
+        args.messages_last, args.random_seed,
+    )
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("output", "base_url")
+        },
+        "scenarios": asyncio.run(benchmark.run(scenarios)),
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app import models
+from app.database import Base, engine
+from app.hashing import pwd_context
+
+# Логины и пароль пользователей нагрузочного теста: bench1, bench2, ...
+BENCH_LOGIN_PREFIX = "bench"
+BENCH_PASSWORD = "bench-password"
+
+# Количество строк в одной пакетной вставке
+CHUNK_SIZE = 10000
+
+
+def bench_login(number: int) -> str:
+    """
+    Возвращает логин пользователя нагрузочного теста.
+
+    Аргументы:
+        number (int): Номер пользователя (с 1).
+
+    Возвращает:
+        str: Логин пользователя.
+    """
+    return f"{BENCH_LOGIN_PREFIX}{number}"
+
+
+def _insert_chunks(connection, table, rows):
+    """
+    Вставляет строки пакетами по CHUNK_SIZE.
+
+    Аргументы:
+        connection: Соединение SQLAlchemy.
+        table: Таблица.
+        rows: Итератор словарей со значениями столбцов.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            connection.execute(insert(table), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(table), chunk)
+
+
+def seed(users: int, messages: int, tasks: int, random_seed: int = 0) -> dict:
+    """
+    Заполняет базу данных DATABASE_URL данными для нагрузочного теста.
+
+    Все существующие данные удаляются. У всех пользователей один пароль BENCH_PASSWORD
+    (хэш вычисляется один раз); сообщения и задачи распределяются между пользователями
+    случайно, но воспроизводимо при одинаковом random_seed. Счётчики непрочитанных
+    сообщений пересчитываются по вставленным сообщениям.
+
+    Аргументы:
+        users (int): Количество пользователей.
+        messages (int): Количество сообщений.
+        tasks (int): Количество задач.
+        random_seed (int): Начальное значение генератора случайных чисел.
+
+    Возвращает:
+        dict: Количество созданных пользователей, сообщений и задач.
+    """
+    rng = random.Random(random_seed)
+    now = datetime.now()
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "TRUNCATE ws_events, ws_event_counters, unread_counters, tasks, messages, users RESTART IDENTITY CASCADE"
+        ))
+        _insert_chunks(connection, models.User.__table__, (
+            {
+                "name": f"Bench User {number}",
+                "login": bench_login(number),
+                "pas": hashed_password,
+                "office": f"office-{number % 10}",
+                "role": "user",
+                "last_login": now,
+            }
+            for number in range(1, users + 1)
+        ))
+
+        def random_pair():
+            sender = rng.randint(1, users)
+            receiver = rng.randint(1, users - 1) if users > 1 else sender
+            if users > 1 and receiver >= sender:
+                receiver += 1
+            return sender, receiver
+
+        def message_rows():
+            for number in range(messages):
+                sender, receiver = random_pair()
+                yield {
+                    "message_time": now - timedelta(seconds=messages - number),
+                    "message": f"Benchmark message {number}",
+                    "message_sender": sender,
+                    "message_receiver": receiver,
+                    "message_status": "unread" if rng.random() < 0.2 else "read",
+                }
+
+        def task_rows():
+            for number in range(tasks):
+                director, executor = random_pair()
+                yield {
+                    "task_name": f"Benchmark task {number}",
+                    "task_content": f"Benchmark task content {number}",
+                    "task_executor": executor,
+                    "task_director": director,
+                    "task_progress": "in_progress",
+                    "task_date": now - timedelta(minutes=tasks - number),
+                    "task_deadline": now + timedelta(days=rng.randint(-30, 60)),
+                    "task_status": rng.choice(("new", "in_progress", "done")),
+                    "task_priority": rng.choice(("low", "normal", "high")),
+                    "task_executor_role": 1,
+                }
+
+        _insert_chunks(connection, models.Message.__table__, message_rows())
+        _insert_chunks(connection, models.Task.__table__, task_rows())
+
+        # Счётчики непрочитанных сообщений ведутся при отправке, поэтому пересчитываются здесь
+        connection.execute(text(
+            "INSERT INTO unread_counters (receiver_id, sender_id, count, last_message_id) "
+            "SELECT message_receiver, message_sender, count(*), max(id) FROM messages "
+            "WHERE message_status = 'unread' GROUP BY message_receiver, message_sender"
+        ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users, messages, tasks, unread_counters"))
+
+    return {"users": users, "messages": messages, "tasks": tasks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение базы данных для нагрузочного теста")
+    parser.add_argument("--users", type=int, default=100, help="Количество пользователей")
+    parser.add_argument("--messages", type=int, default=10000, help="Количество сообщений")
+    parser.add_argument("--tasks", type=int, default=1000, help="Количество задач")
+    parser.add_argument("--random-seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+    args = parser.parse_args()
+    print(seed(args.users, args.messages, args.tasks, args.random_seed))
+
+
+if __name__ == "__main__":
+    main()
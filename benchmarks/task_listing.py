@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal, async_engine
+from benchmarks.run import git_commit
+from benchmarks.seed import seed
+
+# Сценарии: фильтры crud.get_tasks (user_id None - администратор) и сортировка
+SCENARIOS = {
+    "executor_status_by_deadline": ({"user_id": 1, "executor": 1, "status": "new"}, "deadline"),
+    "director_by_newest": ({"user_id": 1, "director": 1}, "-date"),
+    "own_tasks_by_newest": ({"user_id": 1}, "-date"),
+    "all_tasks_by_newest": ({"user_id": None}, "-date"),
+    "all_tasks_by_deadline": ({"user_id": None}, "deadline"),
+}
+
+
+def task_query(filters: dict, sort: Optional[str]):
+    """
+    Строит выборку задач с фильтрами crud.get_tasks без курсора.
+
+    Аргументы:
+        filters (dict): Фильтры crud.get_tasks.
+        sort (Optional[str]): Сортировка (None - без ORDER BY).
+
+    Возвращает:
+        Select: Запрос задач.
+    """
+    query = select(models.Task)
+    if filters.get("user_id") is not None:
+        user_id = filters["user_id"]
+        query = query.filter(or_(models.Task.task_executor == user_id, models.Task.task_director == user_id))
+    if filters.get("executor") is not None:
+        query = query.filter(models.Task.task_executor == filters["executor"])
+    if filters.get("director") is not None:
+        query = query.filter(models.Task.task_director == filters["director"])
+    if filters.get("status") is not None:
+        query = query.filter(models.Task.task_status == filters["status"])
+    if sort is not None:
+        column = crud.TASK_SORT_COLUMNS[sort.lstrip("-")]
+        if sort.startswith("-"):
+            query = query.order_by(column.desc(), models.Task.id.desc())
+        else:
+            query = query.order_by(column.asc(), models.Task.id.asc())
+    return query
+
+
+async def cursor_at(filters: dict, sort: str, offset: int) -> Optional[Tuple[Optional[datetime], int]]:
+    """
+    Получает курсор страницы, начинающейся после offset задач (вне измерений).
+
+    Аргументы:
+        filters (dict): Фильтры crud.get_tasks.
+        sort (str): Сортировка.
+        offset (int): Количество задач на предыдущих страницах.
+
+    Возвращает:
+        Optional[Tuple[Optional[datetime], int]]: Значение поля сортировки и ID последней задачи
+            предыдущей страницы или None, если задач меньше offset.
+    """
+    async with AsyncSessionLocal() as db:
+        task = (await db.execute(task_query(filters, sort).offset(offset - 1).limit(1))).scalars().first()
+    if task is None:
+        return None
+    return getattr(task, crud.TASK_SORT_COLUMNS[sort.lstrip("-")].key), task.id
+
+
+async def keyset_page(filters: dict, sort: str, cursor, limit: int) -> float:
+    """
+    Загружает страницу задач через crud.get_tasks по курсору и измеряет задержку.
+
+    Аргументы:
+        filters (dict): Фильтры crud.get_tasks.
+        sort (str): Сортировка.
+        cursor: Курсор предыдущей страницы (None - первая страница).
+        limit (int): Размер страницы.
+
+    Возвращает:
+        float: Задержка в миллисекундах.
+    """
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        await crud.get_tasks(db, cursor=cursor, limit=limit, sort=sort, **filters)
+        return (time.perf_counter() - started) * 1000
+
+
+async def offset_page(filters: dict, sort: Optional[str], offset: int, limit: int) -> float:
+    """
+    Загружает страницу задач через OFFSET, как при выборке без курсора, и измеряет задержку
+    вместе с сериализацией ответа, как в crud.get_tasks.
+
+    Аргументы:
+        filters (dict): Фильтры crud.get_tasks.
+        sort (Optional[str]): Сортировка (None - без ORDER BY).
+        offset (int): Количество пропускаемых задач.
+        limit (int): Размер страницы.
+
+    Возвращает:
+        float: Задержка в миллисекундах.
+    """
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        tasks = (await db.execute(task_query(filters, sort).offset(offset).limit(limit))).scalars().all()
+        [schemas.TaskResponse.model_validate(task).model_dump(mode="json") for task in tasks]
+        return (time.perf_counter() - started) * 1000
+
+
+async def measure(name: str, limit: int, depths: List[int], repeats: int) -> dict:
+    """
+    Сравнивает keyset-пагинацию crud.get_tasks с OFFSET (с сортировкой и без неё) на одинаковой глубине.
+
+    Курсор страницы depth берётся одним запросом вне измерений, как если бы клиент дошёл до неё
+    по next_cursor.
+
+    Аргументы:
+        name (str): Сценарий из SCENARIOS.
+        limit (int): Размер страницы.
+        depths (List[int]): Номера страниц (с 1).
+        repeats (int): Количество повторов; в отчёт попадает медиана.
+
+    Возвращает:
+        dict: Медианные задержки в миллисекундах по номеру страницы.
+    """
+    filters, sort = SCENARIOS[name]
+    pages = []
+    for depth in depths:
+        offset = (depth - 1) * limit
+        cursor = None
+        if offset:
+            cursor = await cursor_at(filters, sort, offset)
+            if cursor is None:
+                # Страниц меньше depth
+                break
+        keyset = [await keyset_page(filters, sort, cursor, limit) for _ in range(repeats)]
+        ordered = [await offset_page(filters, sort, offset, limit) for _ in range(repeats)]
+        unsorted = [await offset_page(filters, None, offset, limit) for _ in range(repeats)]
+        pages.append({
+            "page": depth,
+            "keyset_ms": round(statistics.median(keyset), 3),
+            "offset_ms": round(statistics.median(ordered), 3),
+            "unsorted_offset_ms": round(statistics.median(unsorted), 3),
+        })
+    return {"scenario": name, "filters": filters, "sort": sort, "pages": pages}
+
+
+async def run(users: int, tasks: int, limit: int, depths: List[int], repeats: int, random_seed: int, skip_seed: bool) -> List[dict]:
+    """
+    Заполняет базу задачами и измеряет все сценарии.
+
+    Аргументы:
+        users (int): Количество пользователей.
+        tasks (int): Количество задач.
+        limit (int): Размер страницы.
+        depths (List[int]): Номера страниц (с 1).
+        repeats (int): Количество повторов каждого измерения.
+        random_seed (int): Начальное значение генератора случайных чисел.
+        skip_seed (bool): Использовать уже заполненную базу.
+
+    Возвращает:
+        List[dict]: Результаты по сценариям.
+    """
+    if not skip_seed:
+        seed(users, 0, tasks, random_seed)
+    try:
+        return [await measure(name, limit, depths, repeats) for name in SCENARIOS]
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Задержка GET /tasks (crud.get_tasks) с keyset-пагинацией и с OFFSET на одинаковой глубине. "
+                    "Данные базы DATABASE_URL удаляются.",
+    )
+    parser.add_argument("--users", type=int, default=2000, help="Количество пользователей")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Количество задач")
+    parser.add_argument("--limit", type=int, default=50, help="Размер страницы")
+    parser.add_argument("--pages", default="1,10,100,1000,10000", help="Номера измеряемых страниц через запятую")
+    parser.add_argument("--repeats", type=int, default=5, help="Количество повторов каждого измерения")
+    parser.add_argument("--random-seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--skip-seed", action="store_true", help="Не заполнять базу заново (данные предыдущего прогона)")
+    parser.add_argument("--output", default=None, help="Файл для результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    depths = sorted({int(value) for value in args.pages.split(",") if value.strip()})
+    if min(depths, default=0) < 1:
+        parser.error("номера страниц начинаются с 1")
+    if args.users < 2:
+        parser.error("нужно не меньше двух пользователей")
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": asyncio.run(run(args.users, args.tasks, args.limit, depths, args.repeats, args.random_seed, args.skip_seed)),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
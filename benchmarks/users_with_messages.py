@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import event
+
+from app import crud
+from app.database import AsyncSessionLocal, async_engine
+from benchmarks.run import git_commit, percentile
+from benchmarks.seed import seed
+
+
+async def measure(user_id: int, repeats: int, last=None) -> dict:
+    """
+    Вызывает crud.get_users_with_messages repeats раз и измеряет обращения к БД и задержку.
+
+    Каждый вызов выполняется в новой сессии, как в обработчике /messages.
+
+    Аргументы:
+        user_id (int): ID текущего пользователя.
+        repeats (int): Количество вызовов.
+        last (Optional[int]): Параметр last (последние сообщения по каждому собеседнику).
+
+    Возвращает:
+        dict: Обращения к БД за вызов, размер ответа и задержки в миллисекундах.
+    """
+    round_trips = 0
+
+    def count(*args):
+        nonlocal round_trips
+        round_trips += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    latencies: List[float] = []
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                users = await crud.get_users_with_messages(db, user_id, last=last)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    latencies.sort()
+    return {
+        "last": last,
+        "round_trips": round_trips / repeats,
+        "users": len(users),
+        "messages": sum(len(user["last_messages"]) for user in users),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "max": round(latencies[-1], 3),
+        },
+    }
+
+
+async def run(sizes: List[int], messages_per_user: int, repeats: int, last, random_seed: int) -> List[dict]:
+    """
+    Заполняет базу для каждого количества пользователей и измеряет get_users_with_messages.
+
+    Аргументы:
+        sizes (List[int]): Количества пользователей.
+        messages_per_user (int): Среднее количество сообщений на пользователя.
+        repeats (int): Количество вызовов на каждый размер.
+        last (Optional[int]): Параметр last для второго прогона (None - только полная история).
+        random_seed (int): Начальное значение генератора случайных чисел.
+
+    Возвращает:
+        List[dict]: Результаты по размерам.
+    """
+    results = []
+    try:
+        for users in sizes:
+            seed(users, users * messages_per_user, 0, random_seed)
+            runs = [await measure(1, repeats)]
+            if last is not None:
+                runs.append(await measure(1, repeats, last))
+            results.append({"users_total": users, "messages_total": users * messages_per_user, "runs": runs})
+    finally:
+        await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Обращения к БД и задержка get_users_with_messages (/messages) при разном количестве пользователей. "
+                    "Данные базы DATABASE_URL удаляются.",
+    )
+    parser.add_argument("--sizes", default="100,1000,10000", help="Количества пользователей через запятую")
+    parser.add_argument("--messages-per-user", type=int, default=10, help="Среднее количество сообщений на пользователя")
+    parser.add_argument("--repeats", type=int, default=20, help="Количество вызовов на каждый размер")
+    parser.add_argument("--last", type=int, default=None, help="Дополнительно измерить с параметром last")
+    parser.add_argument("--random-seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--output", default=None, help="Файл для результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.sizes.split(",") if value.strip()]
+    if min(sizes, default=0) < 2:
+        parser.error("нужно не меньше двух пользователей")
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": asyncio.run(run(sizes, args.messages_per_user, args.repeats, args.last, args.random_seed)),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
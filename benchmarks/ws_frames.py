@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from app import schemas
+from app.pubsub import InProcessBackend
+from app.websocket_manager import Connection, ConnectionManager, msgpack, serialize_event
+from benchmarks.run import git_commit
+
+# Форматы кадров, доступные для сравнения
+FORMATS = ("json", "msgpack")
+
+# Текст сообщения в событиях теста
+MESSAGE_TEXT = "Добрый день! Документы по договору во вложении, проверьте, пожалуйста, до пятницы."
+
+
+def frame_header_size(length: int) -> int:
+    """
+    Возвращает размер заголовка кадра WebSocket, отправляемого сервером (без маски, RFC 6455).
+
+    Аргументы:
+        length (int): Размер полезной нагрузки кадра в байтах.
+
+    Возвращает:
+        int: Размер заголовка в байтах.
+    """
+    if length < 126:
+        return 2
+    if length < 65536:
+        return 4
+    return 10
+
+
+class CountingWebSocket:
+    """
+    WebSocket, который вместо отправки по сети считает кадры и их размер.
+
+    Атрибуты:
+        frames (int): Количество отправленных кадров.
+        payload_bytes (int): Размер полезной нагрузки кадров.
+        wire_bytes (int): Размер кадров вместе с заголовками WebSocket.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.payload_bytes = 0
+        self.wire_bytes = 0
+
+    def _count(self, length: int):
+        self.frames += 1
+        self.payload_bytes += length
+        self.wire_bytes += length + frame_header_size(length)
+
+    async def send_text(self, text: str):
+        self._count(len(text.encode()))
+
+    async def send_bytes(self, data: bytes):
+        self._count(len(data))
+
+
+async def fan_out(format: str, events: int, recipients: int, devices: int) -> dict:
+    """
+    Рассылает события через ConnectionManager.deliver_local и измеряет затраты CPU и трафик.
+
+    Каждое событие доставляется recipients пользователям, у каждого из которых devices
+    соединений в формате format. Измеряется процессорное время от постановки событий
+    в очереди до отправки последнего кадра, включая сериализацию в msgpack.
+
+    Аргументы:
+        format (str): Формат кадров ("json" или "msgpack").
+        events (int): Количество событий.
+        recipients (int): Количество получателей одного события.
+        devices (int): Количество соединений одного получателя.
+
+    Возвращает:
+        dict: Процессорное время на событие и на кадр, размер кадров и трафик.
+    """
+    manager = ConnectionManager(queue_size=events + 1, pubsub=InProcessBackend())
+    sockets = []
+    for user_id in range(1, recipients + 1):
+        for _ in range(devices):
+            websocket = CountingWebSocket()
+            sockets.append(websocket)
+            connection = Connection(websocket, user_id, manager.queue_size, format=format)
+            manager.active_connections.setdefault(user_id, {})[websocket] = connection
+
+    payloads = [
+        serialize_event(schemas.NewMessageEvent(
+            seq=number, message_id=number, sender_id=recipients + 1, receiver_id=1,
+            message=MESSAGE_TEXT, time=datetime.now(),
+        ))
+        for number in range(1, events + 1)
+    ]
+    expected_frames = events * recipients * devices
+
+    started = time.process_time()
+    for seq, payload in enumerate(payloads, start=1):
+        for user_id in range(1, recipients + 1):
+            manager.deliver_local(payload, user_id, seq)
+    while sum(websocket.frames for websocket in sockets) < expected_frames:
+        await asyncio.sleep(0)
+    cpu = time.process_time() - started
+
+    for connections in manager.active_connections.values():
+        for connection in connections.values():
+            connection.close()
+
+    payload_bytes = sum(websocket.payload_bytes for websocket in sockets)
+    wire_bytes = sum(websocket.wire_bytes for websocket in sockets)
+    return {
+        "format": format,
+        "events": events,
+        "recipients": recipients,
+        "devices": devices,
+        "cpu_per_event_us": round(cpu / events * 1e6, 2),
+        "cpu_per_frame_us": round(cpu / expected_frames * 1e6, 2),
+        "frame_payload_bytes": round(payload_bytes / expected_frames, 1),
+        "frame_wire_bytes": round(wire_bytes / expected_frames, 1),
+        "wire_bytes_total": wire_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Затраты CPU и трафик рассылки событий WebSocket в форматах JSON и msgpack")
+    parser.add_argument("--events", type=int, default=2000, help="Количество событий в каждом прогоне")
+    parser.add_argument("--recipients", default="1,100", help="Количество получателей события через запятую")
+    parser.add_argument("--devices", default="1,3", help="Количество соединений одного получателя через запятую")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Форматы кадров через запятую")
+    parser.add_argument("--output", default=None, help="Файл для результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    formats = [name.strip() for name in args.formats.split(",") if name.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"неизвестные форматы: {', '.join(sorted(unknown))}")
+    if "msgpack" in formats and msgpack is None:
+        parser.error("пакет msgpack не установлен")
+
+    results = []
+    for recipients in (int(value) for value in args.recipients.split(",")):
+        for devices in (int(value) for value in args.devices.split(",")):
+            for format in formats:
+                results.append(asyncio.run(fan_out(format, args.events, recipients, devices)))
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
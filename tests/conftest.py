@@ -0,0 +1,76 @@
+import itertools
+import os
+from typing import Callable, List
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import OperationalError
+
+# Тесты удаляют все данные, поэтому используют только отдельную базу TEST_DATABASE_URL.
+# Переменная подставляется в DATABASE_URL до импорта app.database.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from app import models  # noqa: E402
+from app.database import AsyncSessionLocal, Base, async_engine, engine  # noqa: E402
+
+# Номера для уникальных логинов тестовых пользователей
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Создаёт схему в тестовой базе. Без TEST_DATABASE_URL тесты, которым нужна база, пропускаются.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL не задан")
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Тестовая база недоступна: {e}")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def clean_database(database):
+    """
+    Очищает все таблицы перед тестом.
+    """
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with database.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    return database
+
+
+@pytest.fixture
+def create_users(clean_database) -> Callable[[int], List[int]]:
+    """
+    Возвращает функцию, создающую count пользователей и возвращающую их ID.
+    """
+    def create(count: int) -> List[int]:
+        with clean_database.begin() as connection:
+            numbers = [next(_user_numbers) for _ in range(count)]
+            result = connection.execute(
+                insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+                [{"name": f"User {number}", "login": f"user{number}", "pas": "-", "role": "user"} for number in numbers],
+            )
+            return result.scalars().all()
+    return create
+
+
+@pytest.fixture
+async def db(clean_database):
+    """
+    Асинхронная сессия тестовой базы.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+    # Соединения пула привязаны к циклу событий теста
+    await async_engine.dispose()
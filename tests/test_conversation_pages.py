@@ -0,0 +1,81 @@
+from app import crud
+
+
+async def send(db, sender: int, receiver: int, count: int) -> list:
+    message_ids, _ = await crud.save_messages(db, sender, [(receiver, f"{sender}->{receiver} {n}") for n in range(count)])
+    return message_ids
+
+
+async def all_pages(db, user_id: int, other_user_id: int, limit: int) -> list:
+    """
+    Проходит переписку постранично от новых сообщений к старым по курсору next_before.
+
+    Возвращает:
+        list: Страницы ответа get_conversation_messages.
+    """
+    pages = []
+    before = None
+    while True:
+        page = await crud.get_conversation_messages(db, user_id, other_user_id, before=before, limit=limit)
+        pages.append(page)
+        before = page["next_before"]
+        if before is None:
+            return pages
+
+
+async def test_pages_cover_conversation_without_gaps(db, create_users):
+    alice, bob, carol = create_users(3)
+    conversation = []
+    for _ in range(3):
+        conversation += await send(db, alice, bob, 4)
+        conversation += await send(db, bob, alice, 3)
+        # Сообщения других переписок не попадают в страницы
+        await send(db, alice, carol, 2)
+        await send(db, carol, bob, 2)
+
+    pages = await all_pages(db, alice, bob, limit=5)
+
+    assert [len(page["messages"]) for page in pages] == [5, 5, 5, 5, 1]
+    for page in pages:
+        ids = [message["message_id"] for message in page["messages"]]
+        assert ids == sorted(ids)
+    # Более старые страницы идут следом и не пересекаются с уже полученными
+    ids = [message["message_id"] for page in reversed(pages) for message in page["messages"]]
+    assert ids == sorted(conversation)
+    assert all({message["message_sender"], message["message_receiver"]} == {alice, bob}
+               for page in pages for message in page["messages"])
+
+
+async def test_page_boundary_at_exact_limit(db, create_users):
+    alice, bob = create_users(2)
+    conversation = await send(db, alice, bob, 6)
+
+    first = await crud.get_conversation_messages(db, bob, alice, limit=3)
+    second = await crud.get_conversation_messages(db, bob, alice, before=first["next_before"], limit=3)
+
+    assert [message["message_id"] for message in first["messages"]] == conversation[3:]
+    assert first["next_before"] == conversation[3]
+    assert [message["message_id"] for message in second["messages"]] == conversation[:3]
+    assert second["next_before"] is None
+
+
+async def test_new_messages_do_not_shift_older_pages(db, create_users):
+    alice, bob = create_users(2)
+    conversation = await send(db, alice, bob, 6)
+
+    first = await crud.get_conversation_messages(db, alice, bob, limit=3)
+    await send(db, bob, alice, 5)
+    second = await crud.get_conversation_messages(db, alice, bob, before=first["next_before"], limit=3)
+
+    assert [message["message_id"] for message in second["messages"]] == conversation[:3]
+
+
+async def test_conversation_with_self(db, create_users):
+    alice, bob = create_users(2)
+    notes = await send(db, alice, alice, 3)
+    await send(db, alice, bob, 2)
+
+    pages = await all_pages(db, alice, alice, limit=2)
+
+    ids = [message["message_id"] for page in reversed(pages) for message in page["messages"]]
+    assert ids == notes
@@ -0,0 +1,37 @@
+import pytest
+
+from app.deadline_scheduler import DeadlineScheduler
+from app.pubsub import InProcessBackend, PubSubBackend
+from app.websocket_manager import manager
+
+
+class SharedBackend(PubSubBackend):
+    """
+    Бэкенд, общий для нескольких процессов (публикация не используется).
+    """
+
+    def publish(self, channel: str, payload: str) -> None:
+        pass
+
+
+def test_in_process_backend_is_refused_with_several_workers(monkeypatch):
+    monkeypatch.setattr(manager, "pubsub", InProcessBackend())
+
+    with pytest.raises(RuntimeError, match="PUBSUB_BACKEND=postgres"):
+        DeadlineScheduler._check_pubsub(workers=4)
+
+
+def test_in_process_backend_warns_with_one_worker(monkeypatch, capsys):
+    monkeypatch.setattr(manager, "pubsub", InProcessBackend())
+
+    DeadlineScheduler._check_pubsub(workers=1)
+
+    assert "PUBSUB_BACKEND=memory" in capsys.readouterr().out
+
+
+def test_shared_backend_is_accepted(monkeypatch, capsys):
+    monkeypatch.setattr(manager, "pubsub", SharedBackend())
+
+    DeadlineScheduler._check_pubsub(workers=4)
+
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.exceptions import ServiceUnavailableException
+from app.hashing import PASSWORD_HASH_RETRY_AFTER, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    """
+    Пул из одного воркера с одним местом в очереди ожидания.
+    """
+    hasher = PasswordHasher("thread", workers=1, queue_limit=1)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture
+def gate():
+    """
+    Событие, до которого задачи пула не завершаются; открывается и после неудачного теста,
+    чтобы не зависнуть на остановке пула.
+    """
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+async def settle(hasher: PasswordHasher):
+    """
+    Ждёт, пока цикл событий учтёт завершение всех задач пула.
+    """
+    for _ in range(200):
+        if hasher._pending == 0:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("задачи пула не завершились")
+
+
+async def test_full_queue_is_rejected_with_retry_after(hasher, gate):
+    running = asyncio.create_task(hasher._run(gate.wait))
+    waiting = asyncio.create_task(hasher._run(gate.wait))
+    await asyncio.sleep(0.05)
+
+    assert hasher.stats()["in_flight"] == 1
+    assert hasher.stats()["queue_depth"] == 1
+    with pytest.raises(ServiceUnavailableException) as error:
+        await hasher._run(gate.wait)
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)}
+
+    gate.set()
+    assert await asyncio.gather(running, waiting) == [True, True]
+    await settle(hasher)
+    stats = hasher.stats()
+    assert (stats["in_flight"], stats["queue_depth"], stats["completed"], stats["rejected"]) == (0, 0, 2, 1)
+
+
+async def test_cancelled_request_holds_its_slot_until_the_job_ends(hasher, gate):
+    request = asyncio.create_task(hasher._run(gate.wait))
+    await asyncio.sleep(0.05)
+    request.cancel()
+    await asyncio.sleep(0.05)
+
+    # Воркер всё ещё занят задачей отключившегося клиента
+    assert hasher.stats()["in_flight"] == 1
+
+    gate.set()
+    await settle(hasher)
+    assert hasher.stats()["completed"] == 1
+
+
+async def test_failed_job_releases_its_slot(hasher):
+    def fail():
+        raise ValueError("hash failed")
+
+    with pytest.raises(ValueError):
+        await hasher._run(fail)
+    await settle(hasher)
+
+    stats = hasher.stats()
+    assert (stats["completed"], stats["latency_max_seconds"]) == (1, 0.0)
+    assert await hasher._run(lambda: "ok") == "ok"
+
+
+def test_unknown_executor_type_is_refused():
+    with pytest.raises(ValueError):
+        PasswordHasher("fiber", workers=1, queue_limit=1)
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import crud, last_login
+from app.last_login import LastLoginBuffer
+
+_LOGIN = datetime(2026, 1, 1, 12, 0)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """
+    Подменяет запись в БД: каждый вызов crud.update_last_logins выполняет очередной обработчик
+    из списка handlers (по умолчанию запоминает записанные значения).
+
+    Возвращает:
+        SimpleNamespace: Записанные словари (calls) и обработчики (handlers).
+    """
+    writes = SimpleNamespace(calls=[], handlers=[])
+
+    async def update_last_logins(db, pending):
+        writes.calls.append(dict(pending))
+        if writes.handlers:
+            await writes.handlers.pop(0)(pending)
+        return len(pending)
+
+    monkeypatch.setattr(last_login, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(crud, "update_last_logins", update_last_logins)
+    return writes
+
+
+async def test_repeated_logins_are_merged(writes):
+    buffer = LastLoginBuffer(interval=60, max_pending=100)
+
+    buffer.record(1, _LOGIN + timedelta(minutes=5))
+    buffer.record(1, _LOGIN)
+    buffer.record(2, _LOGIN)
+    buffer.record(1, _LOGIN + timedelta(minutes=1))
+
+    assert await buffer.flush() == 2
+    assert writes.calls == [{1: _LOGIN + timedelta(minutes=5), 2: _LOGIN}]
+    assert await buffer.flush() == 0
+    assert len(writes.calls) == 1
+
+
+async def test_failed_flush_restores_entries(writes):
+    buffer = LastLoginBuffer(interval=60, max_pending=100)
+    buffer.record(1, _LOGIN)
+    buffer.record(2, _LOGIN + timedelta(minutes=1))
+
+    async def fail(pending):
+        # Пока запрос выполнялся, пользователь 1 вошёл снова, а пользователь 3 - впервые
+        buffer.record(1, _LOGIN + timedelta(minutes=10))
+        buffer.record(3, _LOGIN)
+        raise ConnectionError("database is unavailable")
+
+    writes.handlers.append(fail)
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+
+    await buffer.flush()
+    assert writes.calls[-1] == {
+        1: _LOGIN + timedelta(minutes=10),
+        2: _LOGIN + timedelta(minutes=1),
+        3: _LOGIN,
+    }
+
+
+async def test_cancelled_flush_restores_entries(writes):
+    buffer = LastLoginBuffer(interval=60, max_pending=100)
+    buffer.record(1, _LOGIN)
+    started = asyncio.Event()
+
+    async def hang(pending):
+        started.set()
+        await asyncio.Event().wait()
+
+    writes.handlers.append(hang)
+    flush = asyncio.create_task(buffer.flush())
+    await started.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    assert await buffer.flush() == 1
+    assert writes.calls[-1] == {1: _LOGIN}
+
+
+async def test_full_buffer_is_flushed_early_and_rest_on_stop(writes):
+    buffer = LastLoginBuffer(interval=60, max_pending=2)
+    await buffer.start()
+    try:
+        buffer.record(1, _LOGIN)
+        buffer.record(2, _LOGIN)
+        for _ in range(100):
+            if writes.calls:
+                break
+            await asyncio.sleep(0.01)
+        assert writes.calls == [{1: _LOGIN, 2: _LOGIN}]
+
+        buffer.record(3, _LOGIN)
+    finally:
+        await buffer.stop()
+
+    assert writes.calls[-1] == {3: _LOGIN}
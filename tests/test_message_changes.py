@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import crud, models
+
+
+async def sync(db, user_id: int, cursor: str = "0:0", limit: int = 500):
+    """
+    Получает все изменения после курсора, проходя страницы, пока has_more истинно.
+
+    Возвращает:
+        Tuple[list, str]: Полученные сообщения и курсор для следующей синхронизации.
+    """
+    messages = []
+    while True:
+        cursor_xid, cursor_id = (int(part) for part in cursor.split(":"))
+        page = await crud.get_message_changes(db, user_id, cursor_xid, cursor_id, limit=limit)
+        messages += page["messages"]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return messages, cursor
+
+
+async def test_initial_sync_pages_through_all_messages(db, create_users):
+    alice, bob, carol = create_users(3)
+    sent, _ = await crud.save_messages(db, alice, [(bob, "a"), (carol, "b"), (bob, "c")])
+    received, _ = await crud.save_messages(db, bob, [(alice, "d"), (alice, "e")])
+    await crud.save_messages(db, bob, [(carol, "f")])
+
+    messages, _ = await sync(db, alice, limit=2)
+
+    assert sorted(message["message_id"] for message in messages) == sorted(sent + received)
+
+
+async def test_sync_after_cursor_returns_only_changes(db, create_users):
+    alice, bob = create_users(2)
+    old, _ = await crud.save_messages(db, bob, [(alice, "a"), (alice, "b")])
+    _, cursor = await sync(db, alice)
+
+    assert await sync(db, alice, cursor) == ([], cursor)
+
+    new, _ = await crud.save_messages(db, bob, [(alice, "c")])
+    await crud.update_messages_status(db, alice, bob, "read")
+    messages, cursor = await sync(db, alice, cursor)
+
+    # Прочитанные сообщения возвращаются повторно с новым статусом
+    assert sorted(message["message_id"] for message in messages) == sorted(old + new)
+    assert {message["message_status"] for message in messages} == {"read"}
+    assert await sync(db, alice, cursor) == ([], cursor)
+
+
+async def test_change_of_earlier_transaction_is_not_skipped(db, clean_database, create_users):
+    alice, bob = create_users(2)
+    _, cursor = await sync(db, alice)
+
+    # Транзакция получает ID раньше, но фиксируется позже следующего сообщения
+    with clean_database.connect() as slow:
+        slow.begin()
+        slow_id = slow.execute(
+            insert(models.Message).returning(models.Message.id),
+            {"message_time": datetime.now(), "message": "slow", "message_sender": bob, "message_receiver": alice, "message_status": "unread"},
+        ).scalar_one()
+        fast, _ = await crud.save_messages(db, bob, [(alice, "fast")])
+
+        # Пока ранняя транзакция не зафиксирована, курсор не проходит дальше неё
+        messages, cursor = await sync(db, alice, cursor)
+        assert messages == []
+        slow.commit()
+
+    messages, cursor = await sync(db, alice, cursor)
+    assert sorted(message["message_id"] for message in messages) == sorted([slow_id] + fast)
@@ -0,0 +1,92 @@
+import re
+
+import pytest
+from sqlalchemy import event, text
+
+from app import crud
+from app.database import async_engine
+from app.query_inspector import _explain
+
+# Запросы приложения к таблице сообщений
+_MESSAGES_QUERY = re.compile(r"\b(?:FROM|UPDATE) messages\b")
+
+
+@pytest.fixture
+def users(clean_database, create_users):
+    """
+    Заполняет таблицу сообщений данными, на которых полный просмотр таблицы заметно дороже
+    поиска по индексу, и обновляет статистику планировщика.
+
+    Возвращает:
+        List[int]: ID пользователей.
+    """
+    user_ids = create_users(200)
+    with clean_database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO messages (message_time, message, message_sender, message_receiver, message_status) "
+            "SELECT now() - n * interval '1 second', 'message ' || n, 1 + n % 200, 1 + (n * 7 + 1) % 200, "
+            "CASE WHEN n % 10 = 0 THEN 'unread' ELSE 'read' END "
+            "FROM generate_series(1, 50000) AS n"
+        ))
+    with clean_database.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE messages"))
+    return user_ids
+
+
+async def message_plans(call) -> list:
+    """
+    Выполняет функцию crud и возвращает планы её запросов к таблице сообщений.
+
+    Аргументы:
+        call: Корутина, выполняющая запросы.
+
+    Возвращает:
+        list: Текст плана каждого запроса к таблице messages.
+    """
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if _MESSAGES_QUERY.search(statement):
+            plans.append(_explain(conn, statement, parameters))
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", explain)
+    try:
+        await call
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", explain)
+    assert plans, "запросы к таблице messages не выполнялись"
+    return plans
+
+
+# Индексы пар (отправитель, получатель) в обоих направлениях
+_PAIR_INDEX = "ix_messages_(?:sender_receiver|receiver_sender)_id"
+
+
+def assert_uses_indexes(plan: str, *indexes: str):
+    assert "Seq Scan on messages" not in plan, plan
+    for index in indexes:
+        assert re.search(index, plan), plan
+
+
+async def test_unread_messages_use_partial_index(db, users):
+    plans = await message_plans(crud.get_unread_messages_with_sender_name(db, users[0]))
+
+    assert_uses_indexes(plans[0], "ix_messages_receiver_sender_unread")
+
+
+async def test_status_update_uses_partial_index(db, users):
+    plans = await message_plans(crud.update_messages_status(db, users[0], users[1], "read"))
+
+    assert_uses_indexes(plans[0], "ix_messages_receiver_sender_unread")
+
+
+async def test_conversation_uses_pair_indexes(db, users):
+    plans = await message_plans(crud.get_conversation_messages(db, users[0], users[1]))
+
+    assert_uses_indexes(plans[0], _PAIR_INDEX)
+
+
+async def test_sender_or_receiver_scan_uses_pair_indexes(db, users):
+    plans = await message_plans(crud.get_users_with_messages(db, users[0]))
+
+    assert_uses_indexes(plans[0], "ix_messages_sender_receiver_id", "ix_messages_receiver_sender_id")
@@ -0,0 +1,101 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app import query_inspector
+from app.exceptions import QueryBudgetExceededException
+from app.query_inspector import RequestQueries, _parse_budgets, statement_shape
+
+
+@pytest.mark.parametrize("statement, shape", [
+    # Параметры asyncpg и psycopg2
+    ("SELECT * FROM users WHERE id = $1", "SELECT * FROM users WHERE id = ?"),
+    ("SELECT * FROM users WHERE id = %(id_1)s", "SELECT * FROM users WHERE id = ?"),
+    # Списки IN (...) любой длины и с приведением типа
+    ("SELECT * FROM users WHERE id IN ($1, $2, $3)", "SELECT * FROM users WHERE id IN (...)"),
+    ("SELECT * FROM users WHERE id IN ($1::INTEGER)", "SELECT * FROM users WHERE id IN (...)"),
+    ("SELECT * FROM users WHERE id IN (%(id_1_1)s, %(id_1_2)s)", "SELECT * FROM users WHERE id IN (...)"),
+    # Строки VALUES любого количества
+    (
+        "INSERT INTO tasks (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)",
+        "INSERT INTO tasks (a, b) VALUES (...)",
+    ),
+    # Переносы строк и отступы
+    ("SELECT id\n    FROM users\n   WHERE login = $1  ", "SELECT id FROM users WHERE login = ?"),
+])
+def test_statement_shape(statement, shape):
+    assert statement_shape(statement) == shape
+
+
+def test_parse_budgets():
+    assert _parse_budgets("GET  /tasks=3; POST /messages=4;") == {"GET /tasks": 3, "POST /messages": 4}
+    assert _parse_budgets("") == {}
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """
+    Запросы HTTP-запроса GET /tasks с бюджетом в 3 запроса и пределом повторов в 2 запроса.
+    """
+    monkeypatch.setattr(query_inspector, "QUERY_BUDGETS", {"GET /tasks": 3})
+    monkeypatch.setattr(query_inspector, "QUERY_BUDGET", 0)
+    monkeypatch.setattr(query_inspector, "QUERY_REPEAT_LIMIT", 2)
+    monkeypatch.setattr(query_inspector, "budget_violations", [])
+    queries = RequestQueries({"method": "GET", "path": "/tasks", "route": SimpleNamespace(path="/tasks")})
+    token = query_inspector.current_request_queries.set(queries)
+    yield queries
+    query_inspector.current_request_queries.reset(token)
+
+
+def execute(statement: str):
+    # Как вызывает SQLAlchemy перед выполнением запроса
+    query_inspector._before_cursor_execute(None, None, statement, None, SimpleNamespace(), False)
+
+
+def test_repeated_statement_is_reported_once(queries, caplog):
+    with caplog.at_level(logging.WARNING, logger=query_inspector.__name__):
+        execute("SELECT * FROM users WHERE id = $1")
+        execute("SELECT * FROM users WHERE id IN ($1, $2)")
+        assert not caplog.records
+        # Третий запрос той же формы (с другими значениями) превышает предел повторов
+        execute("SELECT * FROM users WHERE id = $1")
+        execute("SELECT * FROM users WHERE id = $1")
+
+    assert [record.getMessage() for record in caplog.records if "N+1" in record.getMessage()] == [
+        "Возможный N+1 в GET /tasks: запрос выполнен больше 2 раз: SELECT * FROM users WHERE id = ?",
+    ]
+    assert queries.shapes["SELECT * FROM users WHERE id = ?"] == 3
+
+
+def test_budget_is_logged_once(queries):
+    for _ in range(5):
+        execute("SELECT 1")
+
+    assert queries.count == 5
+    assert query_inspector.budget_violations == ["GET /tasks: больше 3 запросов к БД"]
+
+
+def test_strict_budget_fails_request(queries, monkeypatch):
+    monkeypatch.setattr(query_inspector, "QUERY_BUDGET_STRICT", True)
+    for _ in range(3):
+        execute("SELECT 1")
+
+    with pytest.raises(QueryBudgetExceededException) as error:
+        execute("SELECT 1")
+    assert error.value.status_code == 500
+    assert queries.over_budget
+
+    # Ошибка возникает один раз: последующие запросы (например, откат) выполняются
+    execute("SELECT 1")
+    assert len(query_inspector.budget_violations) == 1
+
+
+def test_statements_outside_request_are_not_counted(monkeypatch):
+    monkeypatch.setattr(query_inspector, "QUERY_BUDGET", 1)
+    monkeypatch.setattr(query_inspector, "QUERY_BUDGET_STRICT", True)
+
+    for _ in range(3):
+        execute("SELECT 1")
+
+    assert query_inspector.current_request_queries.get() is None
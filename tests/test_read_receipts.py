@@ -0,0 +1,143 @@
+import asyncio
+
+import orjson
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from app import crud, schemas
+from app.read_receipts import ReadReceiptBatcher, receipt_ranges
+
+
+async def test_receipts_within_window_are_written_in_one_batch(db, create_users):
+    alice, bob, carol = create_users(3)
+    bob_ids, _ = await crud.save_messages(db, bob, [(alice, str(n)) for n in range(4)])
+    carol_ids, _ = await crud.save_messages(db, carol, [(alice, "a"), (bob, "b")])
+    batcher = ReadReceiptBatcher(window=0.05, max_batch=100)
+
+    results = await asyncio.gather(
+        batcher.submit([(alice, bob, bob_ids[0], bob_ids[0]), (alice, bob, bob_ids[2], bob_ids[2])]),
+        batcher.submit([(alice, bob, 0, bob_ids[1])]),
+        batcher.submit([(alice, carol, 0, carol_ids[-1]), (bob, carol, 0, carol_ids[-1])]),
+    )
+
+    # Каждый запрос получает прочитанные сообщения из своих диапазонов, в том числе общие с другим запросом
+    assert sorted(results[0]) == [bob_ids[0], bob_ids[2]]
+    assert sorted(results[1]) == bob_ids[:2]
+    assert sorted(results[2]) == carol_ids
+    assert batcher.stats() == {"receipts": 3, "batches": 1, "failed_batches": 0, "pending": 0}
+    assert {row["sender_id"]: row["count"] for row in await crud.get_unread_summary(db, alice)} == {bob: 1}
+
+    events = await crud.get_events_after(db, carol, 0, limit=10)
+    read_by = {(event["reader_id"], tuple(event["message_ids"])) for event in (orjson.loads(payload) for _, payload in events)}
+    assert read_by == {(alice, (carol_ids[0],)), (bob, (carol_ids[1],))}
+
+
+async def test_full_batch_is_written_before_window_ends(db, create_users):
+    alice, bob = create_users(2)
+    ids, _ = await crud.save_messages(db, bob, [(alice, "a"), (alice, "b")])
+    batcher = ReadReceiptBatcher(window=60, max_batch=2)
+
+    first = asyncio.create_task(batcher.submit([(alice, bob, ids[0], ids[0])]))
+    await asyncio.sleep(0.05)
+    assert not first.done()
+    second = await asyncio.wait_for(batcher.submit([(alice, bob, ids[1], ids[1])]), timeout=5)
+
+    assert (await first, second) == ([ids[0]], [ids[1]])
+    assert batcher.stats()["batches"] == 1
+
+
+async def test_stop_writes_pending_receipts(db, create_users):
+    alice, bob = create_users(2)
+    ids, _ = await crud.save_messages(db, bob, [(alice, "a")])
+    batcher = ReadReceiptBatcher(window=60, max_batch=100)
+
+    pending = asyncio.create_task(batcher.submit([(alice, bob, 0, ids[0])]))
+    await asyncio.sleep(0)
+    await batcher.stop()
+
+    assert await pending == ids
+
+
+async def test_failed_request_does_not_fail_its_batch(db, create_users):
+    alice, bob = create_users(2)
+    ids, _ = await crud.save_messages(db, bob, [(alice, "a"), (alice, "b")])
+    batcher = ReadReceiptBatcher(window=0.01, max_batch=100)
+
+    results = await asyncio.gather(
+        batcher.submit([(alice, bob, 0, ids[0])]),
+        # ID вне диапазона integer: запись пакета с этим запросом завершается ошибкой
+        batcher.submit([(alice, bob, 0, 2**31)]),
+        batcher.submit([(alice, bob, ids[1], ids[1])]),
+        return_exceptions=True,
+    )
+
+    assert results[0] == [ids[0]]
+    assert isinstance(results[1], Exception)
+    assert results[2] == [ids[1]]
+    assert batcher.stats()["failed_batches"] == 1
+    assert batcher.stats()["pending"] == 0
+
+
+async def test_oversized_batch_is_written(db, clean_database, create_users):
+    alice, bob = create_users(2)
+    with clean_database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO messages (message_time, message, message_sender, message_receiver, message_status) "
+            "SELECT now(), 'message ' || n, :bob, :alice, 'unread' FROM generate_series(1, 18000) AS n"
+        ), {"alice": alice, "bob": bob})
+    with clean_database.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE messages"))
+    batcher = ReadReceiptBatcher(window=0.05, max_batch=100000)
+
+    # 9000 несмежных диапазонов - больше 32767 параметров в одном UPDATE
+    results = await asyncio.gather(*(
+        batcher.submit([(alice, bob, message_id, message_id) for message_id in range(start, start + 2000, 2)])
+        for start in range(1, 18000, 2000)
+    ))
+
+    assert [len(result) for result in results] == [1000] * 9
+    assert sorted(message_id for result in results for message_id in result) == list(range(1, 18000, 2))
+    assert batcher.stats()["batches"] == 1
+
+
+async def test_full_batch_is_not_extended(db, create_users):
+    alice, bob = create_users(2)
+    ids, _ = await crud.save_messages(db, bob, [(alice, str(n)) for n in range(5)])
+    batcher = ReadReceiptBatcher(window=60, max_batch=4)
+
+    first = asyncio.create_task(batcher.submit([(alice, bob, message_id, message_id) for message_id in ids[:3]]))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(batcher.submit([(alice, bob, message_id, message_id) for message_id in ids[3:]]))
+    await asyncio.sleep(0)
+    await batcher.stop()
+
+    assert (await first, await second) == (ids[:3], ids[3:])
+    assert batcher.stats()["batches"] == 2
+
+
+def test_receipt_ranges_merge_contiguous_ids():
+    receipt = schemas.ReadReceipt(message_sender=2, message_ids=[9, 4, 5, 12, 6, 3, 10, 5], up_to=3)
+
+    assert receipt_ranges(1, receipt) == [(1, 2, 0, 6), (1, 2, 9, 10), (1, 2, 12, 12)]
+    assert receipt_ranges(1, schemas.ReadReceipt(message_sender=2, message_ids=[7, 8])) == [(1, 2, 7, 8)]
+
+
+def test_receipts_limit_total_message_ids():
+    receipts = [{"message_sender": sender, "message_ids": list(range(1, 1001))} for sender in range(1, 10)]
+
+    with pytest.raises(ValidationError):
+        schemas.MessagesRead(receipts=receipts)
+    schemas.MessagesRead(receipts=receipts[:1])
+
+
+@pytest.mark.parametrize("receipt", [
+    {"message_sender": 0, "up_to": 1},
+    {"message_sender": 2**31, "up_to": 1},
+    {"message_sender": 1, "message_ids": [1, 2**31]},
+    {"message_sender": 1, "up_to": -1},
+    {"message_sender": 1},
+])
+def test_receipt_rejects_invalid_ids(receipt):
+    with pytest.raises(ValidationError):
+        schemas.MessagesRead(receipts=[receipt])
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.auth import get_current_user
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    """
+    Клиент API без запуска фоновых задач приложения; запросы выполняются от имени пользователя 1.
+    """
+    app.dependency_overrides[get_current_user] = lambda: models.User(id=1, name="User", login="user", role="user")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+# ID вне диапазона INTEGER отклоняются проверкой запроса, не доходя до базы данных
+@pytest.mark.parametrize("url", [
+    "/conversations/0/messages",
+    "/conversations/2147483648/messages",
+    "/conversations/3000000000/messages",
+    "/conversations/2/messages?before=2147483648",
+    "/conversations/2/messages?before=0",
+])
+def test_out_of_range_ids_are_rejected(client, url):
+    assert client.get(url).status_code == 422
+
+
+@pytest.mark.parametrize("url", [
+    "/tasks?executor=0",
+    "/tasks?executor=2147483648",
+    "/tasks?director=3000000000",
+])
+def test_out_of_range_task_filters_are_rejected(client, url):
+    assert client.get(url).status_code == 422
+
+
+@pytest.mark.parametrize("cursor", [
+    "2026-01-01T00:00:00:2147483648",
+    ":3000000000",
+    ":0",
+    "2026-01-01T00:00:00:-1",
+    "not-a-date:1",
+])
+def test_invalid_task_cursor_is_bad_request(client, cursor):
+    assert client.get("/tasks", params={"cursor": cursor}).status_code == 400
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+from app.auth import get_current_user
+from app.main import app
+
+
+@pytest.fixture
+async def api(db, create_users):
+    """
+    Клиент API в цикле событий теста; запросы выполняются от имени первого из двух созданных пользователей.
+
+    Возвращает:
+        Tuple[httpx.AsyncClient, int, int]: Клиент, ID отправителя и ID получателя.
+    """
+    sender_id, receiver_id = create_users(2)
+    sender = await db.get(models.User, sender_id)
+    app.dependency_overrides[get_current_user] = lambda: sender
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client, sender_id, receiver_id
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+async def message_count(db) -> int:
+    return (await db.execute(select(func.count()).select_from(models.Message))).scalar_one()
+
+
+async def test_message_row_to_missing_receiver_is_not_found(db, api):
+    client, sender_id, receiver_id = api
+
+    response = await client.post("/message_row", json={
+        "message": "hi", "message_sender": sender_id, "message_receiver": receiver_id + 100,
+    })
+
+    assert response.status_code == 404
+    assert await message_count(db) == 0
+
+
+async def test_bulk_send_to_missing_receiver_is_not_found(db, api):
+    client, sender_id, receiver_id = api
+
+    response = await client.post("/messages/bulk", json={
+        "message_sender": sender_id, "message": "hi", "message_receivers": [receiver_id, receiver_id + 100],
+    })
+
+    assert response.status_code == 404
+    assert await message_count(db) == 0
+
+
+async def test_message_row_returns_sender_name(db, api):
+    client, sender_id, receiver_id = api
+
+    response = await client.post("/message_row", json={
+        "message": "hi", "message_sender": sender_id, "message_receiver": receiver_id,
+    })
+
+    assert response.status_code == 200
+    assert response.json()["name"] == (await db.get(models.User, sender_id)).name
+    assert await message_count(db) == 1
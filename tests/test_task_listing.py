@@ -0,0 +1,147 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from app import crud, models
+from app.database import async_engine
+from app.query_inspector import _explain
+
+# Дедлайны задач: повторяющиеся значения и пустые дедлайны проверяют курсор на границах
+_BASE = datetime(2026, 1, 1, 12, 0)
+_DEADLINES = [None, 3, 1, None, 3, 2, 1, None, 3, 0, 2, None, 1]
+
+
+@pytest.fixture
+def tasks(clean_database, create_users):
+    """
+    Создаёт задачи двух пользователей с повторяющимися датами и дедлайнами.
+
+    Возвращает:
+        Tuple[int, int, List[dict]]: ID пользователей и строки созданных задач.
+    """
+    alice, bob = create_users(2)
+    rows = [
+        {
+            "task_name": f"Task {number}",
+            "task_content": "content",
+            "task_executor": alice if number % 3 else bob,
+            "task_director": bob if number % 3 else alice,
+            "task_progress": "in_progress",
+            "task_date": _BASE + timedelta(hours=number // 2),
+            "task_deadline": _BASE + timedelta(days=days) if days is not None else None,
+            "task_status": "done" if number % 4 == 0 else "new",
+            "task_priority": "normal",
+            "task_executor_role": 1,
+        }
+        for number, days in enumerate(_DEADLINES)
+    ]
+    with clean_database.begin() as connection:
+        ids = connection.execute(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True), rows,
+        ).scalars().all()
+    for task_id, row in zip(ids, rows):
+        row["id"] = task_id
+    return alice, bob, rows
+
+
+def parse_cursor(cursor: str):
+    # Как в обработчике GET /tasks
+    value, _, last_id = cursor.rpartition(":")
+    return datetime.fromisoformat(value) if value else None, int(last_id)
+
+
+async def all_pages(db, limit: int, **filters) -> list:
+    """
+    Проходит список задач постранично по курсору next_cursor.
+
+    Возвращает:
+        list: ID задач в порядке выдачи.
+    """
+    ids = []
+    cursor = None
+    while True:
+        page = await crud.get_tasks(db, cursor=cursor, limit=limit, **filters)
+        assert len(page["tasks"]) <= limit
+        ids += [task["id"] for task in page["tasks"]]
+        if page["next_cursor"] is None:
+            return ids
+        cursor = parse_cursor(page["next_cursor"])
+
+
+def expected_order(rows: list, sort: str) -> list:
+    """
+    Порядок задач как в PostgreSQL: пустые значения последними по возрастанию и первыми по убыванию.
+    """
+    column = {"date": "task_date", "deadline": "task_deadline"}[sort.lstrip("-")]
+    ordered = sorted(rows, key=lambda row: (row[column] is None, row[column] or _BASE, row["id"]))
+    ids = [row["id"] for row in ordered]
+    return ids[::-1] if sort.startswith("-") else ids
+
+
+@pytest.mark.parametrize("sort", ["date", "-date", "deadline", "-deadline"])
+@pytest.mark.parametrize("limit", [1, 3, 50])
+async def test_pages_follow_sort_order(db, tasks, sort, limit):
+    _, _, rows = tasks
+
+    assert await all_pages(db, limit, user_id=None, sort=sort) == expected_order(rows, sort)
+
+
+@pytest.mark.parametrize("sort", ["deadline", "-deadline"])
+async def test_pages_apply_visibility_and_filters(db, tasks, sort):
+    alice, bob, rows = tasks
+
+    visible = [row for row in rows if row["task_executor"] == bob and row["task_status"] == "new"]
+    assert await all_pages(db, 2, user_id=bob, executor=bob, status="new", sort=sort) == expected_order(visible, sort)
+
+    window = [row for row in rows if row["task_deadline"] is not None and row["task_deadline"] >= _BASE + timedelta(days=1)]
+    assert await all_pages(db, 2, user_id=alice, deadline_from=_BASE + timedelta(days=1), sort=sort) == expected_order(window, sort)
+
+
+@pytest.fixture
+def many_tasks(clean_database, create_users):
+    """
+    Заполняет таблицу задач данными, на которых полный просмотр таблицы заметно дороже
+    чтения по индексу, и обновляет статистику планировщика.
+    """
+    create_users(2)
+    with clean_database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO tasks (task_name, task_content, task_executor, task_director, task_progress, "
+            "task_date, task_deadline, task_status, task_priority, task_executor_role) "
+            "SELECT 'Task ' || n, 'content', 1 + n % 2, 2 - n % 2, 'in_progress', "
+            "timestamp '2026-01-01' + n * interval '1 minute', "
+            "CASE WHEN n % 10 = 0 THEN NULL ELSE timestamp '2026-01-01' + (n % 97) * interval '1 day' END, "
+            "'new', 'normal', 1 "
+            "FROM generate_series(1, 50000) AS n"
+        ))
+    with clean_database.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE tasks"))
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("deadline", (datetime(2026, 3, 1), 25000)),
+    ("deadline", (None, 25000)),
+    ("-deadline", (datetime(2026, 3, 1), 25000)),
+    ("-deadline", (None, 25000)),
+    ("-date", (datetime(2026, 1, 20), 25000)),
+])
+async def test_admin_pages_seek_by_index(db, many_tasks, sort, cursor):
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\bFROM tasks\b", statement):
+            plans.append(_explain(conn, statement, parameters))
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", explain)
+    try:
+        await crud.get_tasks(db, user_id=None, sort=sort, cursor=cursor, limit=50)
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", explain)
+
+    assert plans
+    for plan in plans:
+        # Продолжение после курсора читается диапазоном индекса, а не фильтром по всем предыдущим строкам
+        assert re.search(r"Index Scan(?: Backward)? using ix_tasks_(?:date|deadline)_id", plan), plan
+        assert "Filter" not in plan and "Sort" not in plan, plan
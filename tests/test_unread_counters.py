@@ -0,0 +1,80 @@
+from sqlalchemy import text
+
+from app import crud
+
+
+def unread_counts(engine, receiver_id: int) -> dict:
+    """
+    Считает непрочитанные сообщения получателя по таблице сообщений.
+
+    Возвращает:
+        dict: Количество непрочитанных сообщений по ID отправителя.
+    """
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT message_sender, count(*) FROM messages "
+                 "WHERE message_receiver = :receiver AND message_status = 'unread' GROUP BY message_sender"),
+            {"receiver": receiver_id},
+        )
+        return dict(rows.all())
+
+
+async def summary_counts(db, receiver_id: int) -> dict:
+    return {row["sender_id"]: row["count"] for row in await crud.get_unread_summary(db, receiver_id)}
+
+
+async def test_sent_messages_increment_counters(db, create_users):
+    alice, bob, carol = create_users(3)
+    await crud.save_messages(db, bob, [(alice, "a"), (alice, "b"), (carol, "c")])
+    carol_ids, _ = await crud.save_messages(db, carol, [(alice, "d")])
+    # Сообщения, сохранённые прочитанными, счётчик не меняют
+    await crud.save_messages(db, bob, [(alice, "e")], message_status="read")
+
+    summary = await crud.get_unread_summary(db, alice)
+
+    assert [(row["sender_id"], row["count"]) for row in summary] == [(carol, 1), (bob, 2)]
+    assert summary[0]["last_message_id"] == carol_ids[0]
+    assert await summary_counts(db, carol) == {bob: 1}
+
+
+async def test_status_update_resets_counter(db, clean_database, create_users):
+    alice, bob, carol = create_users(3)
+    await crud.save_messages(db, bob, [(alice, "a"), (alice, "b")])
+    await crud.save_messages(db, carol, [(alice, "c")])
+
+    assert await crud.update_messages_status(db, alice, bob, "read") == 2
+    assert await crud.update_messages_status(db, alice, bob, "read") == 0
+
+    assert await summary_counts(db, alice) == {carol: 1} == unread_counts(clean_database, alice)
+
+
+async def test_read_ranges_decrement_only_unread_messages(db, clean_database, create_users):
+    alice, bob, carol = create_users(3)
+    bob_ids, _ = await crud.save_messages(db, bob, [(alice, str(n)) for n in range(5)])
+    carol_ids, _ = await crud.save_messages(db, carol, [(alice, str(n)) for n in range(3)])
+
+    read, events = await crud.mark_messages_read(db, [
+        (alice, bob, bob_ids[1], bob_ids[1]),
+        (alice, bob, 0, bob_ids[2]),
+        (alice, carol, carol_ids[2], carol_ids[2]),
+    ])
+
+    assert [message_id for message_id, _, _ in read] == sorted(bob_ids[:3] + carol_ids[2:])
+    assert sorted(user_id for user_id, _, _ in events) == sorted([bob, carol])
+    assert await summary_counts(db, alice) == {bob: 2, carol: 2} == unread_counts(clean_database, alice)
+
+    # Повторная отметка уже прочитанных сообщений счётчики не уменьшает
+    assert await crud.mark_messages_read(db, [(alice, bob, 0, bob_ids[2])]) == ([], [])
+    assert await summary_counts(db, alice) == {bob: 2, carol: 2}
+
+
+async def test_counters_match_messages_after_mixed_operations(db, clean_database, create_users):
+    alice, bob, carol = create_users(3)
+    ids, _ = await crud.save_messages(db, bob, [(alice, "a"), (carol, "b"), (alice, "c")])
+    await crud.mark_messages_read(db, [(alice, bob, ids[0], ids[0])])
+    await crud.save_messages(db, carol, [(alice, "d"), (bob, "e")])
+    await crud.update_messages_status(db, bob, carol, "read")
+    await crud.save_messages(db, bob, [(alice, "f")])
+
+    for user_id in (alice, bob, carol):
+        assert await summary_counts(db, user_id) == unread_counts(clean_database, user_id)
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import user_cache as user_cache_module
+from app.pubsub import PubSubBackend
+from app.user_cache import USER_CACHE_CHANNEL, UserCache
+from app.websocket_manager import manager
+
+
+class RecordingBackend(PubSubBackend):
+    """
+    Бэкенд, запоминающий опубликованные сообщения.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, channel: str, payload: str) -> None:
+        self.published.append((channel, payload))
+
+
+@pytest.fixture
+def pubsub(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(manager, "pubsub", backend)
+    return backend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Управляемые часы модуля кэша.
+    """
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: now.value)
+    return now
+
+
+def db_user(login: str, role: str = "user"):
+    # Объект пользователя, как его возвращает запрос к базе данных
+    return SimpleNamespace(id=1, name="User", login=login, office=None, birthdate=None, role=role, token=None, last_login=None)
+
+
+def test_loaded_user_is_cached(clock):
+    cache = UserCache(ttl=30, max_size=10)
+
+    assert cache.get("alice") is None
+    snapshot = cache.put(db_user("alice"), cache.generation)
+
+    assert cache.get("alice") == snapshot
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_user_loaded_before_invalidation_is_not_cached(clock, pubsub):
+    cache = UserCache(ttl=30, max_size=10)
+
+    # Запрос начал загрузку пользователя, и пока он ждал базу, роль пользователя изменилась
+    generation = cache.generation
+    stale = db_user("alice", role="admin")
+    cache.invalidate("alice")
+    snapshot = cache.put(stale, generation)
+
+    # Ответ запроса строится из загруженного снимка, но в кэш он не попадает
+    assert snapshot.role == "admin"
+    assert cache.get("alice") is None
+    assert pubsub.published == [(USER_CACHE_CHANNEL, "alice")]
+
+    cache.put(db_user("alice"), cache.generation)
+    assert cache.get("alice").role == "user"
+
+
+def test_invalidation_from_another_worker_discards_load(clock):
+    cache = UserCache(ttl=30, max_size=10)
+    cache.put(db_user("alice"), cache.generation)
+
+    generation = cache.generation
+    # Сброс, полученный через pub/sub от другого воркера
+    cache._evict("alice")
+    cache.put(db_user("alice", role="admin"), generation)
+
+    assert cache.get("alice") is None
+
+
+def test_expired_entry_is_a_miss(clock):
+    cache = UserCache(ttl=30, max_size=10)
+    cache.put(db_user("alice"), cache.generation)
+
+    clock.value += 31
+
+    assert cache.get("alice") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = UserCache(ttl=30, max_size=2)
+    cache.put(db_user("alice"), cache.generation)
+    cache.put(db_user("bob"), cache.generation)
+
+    cache.get("alice")
+    cache.put(db_user("carol"), cache.generation)
+
+    assert cache.get("bob") is None
+    assert cache.get("alice") is not None and cache.get("carol") is not None
+
+
+def test_zero_ttl_disables_cache(clock):
+    cache = UserCache(ttl=0, max_size=10)
+
+    assert cache.put(db_user("alice"), cache.generation).login == "alice"
+    assert cache.get("alice") is None
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from app.pubsub import InProcessBackend
+from app.websocket_manager import ConnectionManager, Frame
+
+
+class FakeWebSocket:
+    """
+    WebSocket без сети: запоминает код закрытия соединения.
+    """
+
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.close_code = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code: int):
+        self.close_code = code
+
+
+async def paused_connection(manager: ConnectionManager, user_id: int = 1):
+    """
+    Подключает клиента без задачи-писателя, чтобы события оставались в очереди.
+    """
+    websocket = FakeWebSocket()
+    return websocket, await manager.connect(websocket, user_id, paused=True)
+
+
+def fill(manager: ConnectionManager, connection, seqs):
+    for seq in seqs:
+        manager._enqueue(connection, seq, Frame(f'{{"seq": {seq}}}'))
+
+
+def queued_seqs(connection) -> list:
+    return [seq for seq, _ in connection.queue._queue]
+
+
+async def test_drop_oldest_keeps_newest_events():
+    manager = ConnectionManager(queue_size=3, overflow_policy="drop_oldest", pubsub=InProcessBackend())
+    _, connection = await paused_connection(manager)
+
+    fill(manager, connection, [1, 2, 3, 4, 5])
+
+    assert queued_seqs(connection) == [3, 4, 5]
+    # Писатель запросит из БД только события после отброшенных
+    assert connection.dropped_seq == 2
+    assert (manager.enqueued_frames, manager.dropped_frames) == (5, 2)
+    assert 1 in manager.active_connections
+
+
+async def test_drop_oldest_without_seq_keeps_dropped_seq():
+    manager = ConnectionManager(queue_size=1, overflow_policy="drop_oldest", pubsub=InProcessBackend())
+    _, connection = await paused_connection(manager)
+
+    fill(manager, connection, [None, None])
+
+    assert queued_seqs(connection) == [None]
+    assert connection.dropped_seq == 0
+
+
+async def test_disconnect_closes_slow_consumer():
+    manager = ConnectionManager(queue_size=2, overflow_policy="disconnect", pubsub=InProcessBackend())
+    websocket, connection = await paused_connection(manager)
+    _, other = await paused_connection(manager)
+
+    fill(manager, connection, [1, 2, 3])
+    await asyncio.sleep(0)
+
+    # Отключается только переполненное соединение; его очередь и новое событие считаются отброшенными
+    assert list(manager.active_connections[1].values()) == [other]
+    assert websocket.close_code == status.WS_1013_TRY_AGAIN_LATER
+    assert (manager.enqueued_frames, manager.dropped_frames, manager.slow_consumer_disconnects) == (2, 3, 1)
+
+
+async def test_disconnect_removes_last_connection_of_user():
+    manager = ConnectionManager(queue_size=1, overflow_policy="disconnect", pubsub=InProcessBackend())
+    _, connection = await paused_connection(manager)
+
+    fill(manager, connection, [1, 2])
+    await asyncio.sleep(0)
+
+    assert manager.active_connections == {}
+
+
+def test_unknown_overflow_policy_is_refused():
+    with pytest.raises(ValueError):
+        ConnectionManager(overflow_policy="block", pubsub=InProcessBackend())
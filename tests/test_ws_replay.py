@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from app import crud, schemas
+from app.database import AsyncSessionLocal
+from app.pubsub import InProcessBackend
+from app.websocket_manager import RESYNC_FRAME, Connection, ConnectionManager, Frame, ReplayBuffer
+
+
+def read_event(reader_id: int, message_id: int) -> schemas.MessagesReadEvent:
+    return schemas.MessagesReadEvent(reader_id=reader_id, message_ids=[message_id])
+
+
+def seqs(frames) -> list:
+    return [seq for seq, _ in frames]
+
+
+class RecordingWebSocket:
+    """
+    WebSocket, который вместо отправки по сети запоминает отправленные кадры.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def connect(manager: ConnectionManager, user_id: int) -> Connection:
+    """
+    Регистрирует в менеджере приостановленное соединение пользователя (как /ws до replay).
+    """
+    websocket = RecordingWebSocket()
+    connection = Connection(websocket, user_id, manager.queue_size, paused=True)
+    manager.active_connections.setdefault(user_id, {})[websocket] = connection
+    return connection
+
+
+async def wait_sent(connection: Connection, count: int) -> list:
+    """
+    Ожидает отправки count кадров и возвращает отправленные кадры.
+    """
+    for _ in range(200):
+        if len(connection.websocket.sent) >= count:
+            break
+        await asyncio.sleep(0.01)
+    # Лишние кадры успели бы отправиться за это время
+    await asyncio.sleep(0.05)
+    connection.close()
+    return connection.websocket.sent
+
+
+# Буфер повторной доставки
+def test_buffer_returns_only_contiguous_ranges():
+    buffer = ReplayBuffer(size=10, max_users=10)
+    buffer.add(1, 2, Frame("2"))
+
+    # Событие 1 ещё не получено этим воркером
+    assert buffer.get(1, 0) is None
+    assert seqs(buffer.get(1, 1)) == [2]
+
+    buffer.add(1, 1, Frame("1"))
+    buffer.add(1, 1, Frame("duplicate"))
+
+    assert [frame.text for _, frame in buffer.get(1, 0)] == ["1", "2"]
+    assert buffer.get(1, 2) == []
+    # Клиент опережает буфер: события могли прийти другому воркеру
+    assert buffer.get(1, 3) is None
+    assert buffer.get(2, 0) is None
+
+
+def test_buffer_eviction_raises_floor():
+    buffer = ReplayBuffer(size=3, max_users=10)
+    for seq in range(1, 6):
+        buffer.add(1, seq, Frame(str(seq)))
+    # Опоздавшее событие ниже вытесненных в буфер не попадает
+    buffer.add(1, 1, Frame("1"))
+
+    assert buffer.get(1, 1) is None
+    assert seqs(buffer.get(1, 2)) == [3, 4, 5]
+
+
+def test_buffer_evicts_least_recent_user():
+    buffer = ReplayBuffer(size=3, max_users=2)
+    buffer.add(1, 1, Frame("1"))
+    buffer.add(2, 1, Frame("1"))
+    buffer.add(1, 2, Frame("2"))
+    buffer.add(3, 1, Frame("1"))
+
+    assert buffer.get(2, 0) is None
+    assert seqs(buffer.get(1, 0)) == [1, 2]
+    assert buffer.stats() == {"replay_buffer_users": 2, "replay_buffer_events": 3}
+
+
+# Номера событий в БД
+async def test_events_are_numbered_per_user_without_gaps(db, create_users):
+    alice, bob = create_users(2)
+    first = await crud.create_events(db, [(alice, read_event(bob, 1)), (bob, read_event(alice, 2)), (alice, read_event(bob, 3))])
+    second = await crud.create_events(db, [(bob, read_event(alice, 4)), (alice, read_event(bob, 5))])
+    await db.commit()
+
+    assert [(user_id, seq) for user_id, seq, _ in first + second] == [(alice, 1), (bob, 1), (alice, 2), (bob, 2), (alice, 3)]
+    assert all(f'"seq":{seq}' in frame for _, seq, frame in first + second)
+    assert await crud.get_last_event_seq(db, alice) == 3
+    assert seqs(await crud.get_events_after(db, alice, 0, limit=10)) == [1, 2, 3]
+
+
+async def test_concurrent_transaction_waits_for_earlier_numbers(db, create_users):
+    alice, bob = create_users(2)
+    await crud.create_events(db, [(alice, read_event(bob, 1))])
+
+    async with AsyncSessionLocal() as other:
+        pending = asyncio.create_task(crud.create_events(other, [(alice, read_event(bob, 2))]))
+        # Номер выдаётся только после фиксации транзакции, получившей предыдущий
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(pending), timeout=0.3)
+        await db.commit()
+        [(_, seq, _)] = await pending
+        await other.commit()
+
+    assert seq == 2
+
+
+async def test_events_after_detects_missing_events(db, clean_database, create_users):
+    alice, bob = create_users(2)
+    await crud.create_events(db, [(alice, read_event(bob, n)) for n in range(1, 6)])
+    await db.commit()
+
+    assert seqs(await crud.get_events_after(db, alice, 2, limit=10)) == [3, 4, 5]
+    assert seqs(await crud.get_events_after(db, alice, 1, limit=10, before=4)) == [2, 3]
+    assert await crud.get_events_after(db, alice, 5, limit=10) == []
+    assert await crud.get_events_after(db, alice, 3, limit=10, before=4) == []
+    # Пропущенных событий больше limit
+    assert await crud.get_events_after(db, alice, 0, limit=4) is None
+    # Номер клиента больше номера последнего события пользователя
+    assert await crud.get_events_after(db, alice, 6, limit=10) is None
+    assert await crud.get_events_after(db, bob, 1, limit=10) is None
+
+    with clean_database.begin() as connection:
+        connection.execute(text("DELETE FROM ws_events WHERE seq <= 2"))
+    assert await crud.get_events_after(db, alice, 1, limit=10) is None
+    assert seqs(await crud.get_events_after(db, alice, 2, limit=10)) == [3, 4, 5]
+
+
+# Доставка через ConnectionManager
+async def test_writer_restores_order_of_late_events(db, create_users):
+    alice, bob = create_users(2)
+    manager = ConnectionManager(pubsub=InProcessBackend())
+    connection = connect(manager, alice)
+    await manager.replay(connection, None)
+
+    events = await crud.create_events(db, [(alice, read_event(bob, n)) for n in range(1, 4)])
+    await db.commit()
+    # Событие 3 опубликовано раньше событий 1 и 2
+    manager.broadcast_many([events[2], events[0], events[1]])
+
+    sent = await wait_sent(connection, 3)
+    assert sent == [frame for _, _, frame in events]
+
+
+async def test_replay_from_database_and_resync(db, clean_database, create_users):
+    alice, bob = create_users(2)
+    events = await crud.create_events(db, [(alice, read_event(bob, n)) for n in range(1, 4)])
+    await db.commit()
+    # Новый воркер: буфер пуст, события загружаются из ws_events
+    manager = ConnectionManager(pubsub=InProcessBackend())
+
+    connection = connect(manager, alice)
+    await manager.replay(connection, 1)
+    assert await wait_sent(connection, 2) == [frame for _, _, frame in events[1:]]
+
+    with clean_database.begin() as connection_db:
+        connection_db.execute(text("DELETE FROM ws_events WHERE seq = 2"))
+    connection = connect(manager, alice)
+    await manager.replay(connection, 1)
+    assert await wait_sent(connection, 1) == [RESYNC_FRAME.text]
+    assert (manager.replayed_from_db, manager.resyncs) == (2, 1)